@@ -3,52 +3,15 @@ import sys
 import subprocess
 import shutil
 import time
-import importlib.util
 from pathlib import Path
 from typing import Tuple
 
-# === AUTO-INYECCIÓN DE DENO EN EL PATH (Vital para WSL2) ===
-USER_HOME = Path.home()
-deno_path = str(USER_HOME / ".deno" / "bin")
-if deno_path not in os.environ.get("PATH", ""):
-    os.environ["PATH"] = f"{deno_path}:{os.environ.get('PATH', '')}"
-
-def install_missing_requirements():
-    # 🚀 FIX: Mapeo exacto entre el nombre en pip y el módulo interno del plugin
-    requirements = [
-        ("yt-dlp", "yt_dlp"),
-        ("curl-cffi", "curl_cffi"),
-        ("numpy", "numpy"),
-        ("opencv-python", "cv2"),
-        ("websockets", "websockets"),
-        ("playwright", "playwright"),
-        ("yt-dlp-ejs", "yt_dlp_plugins.extractor.ejs"),
-        ("bgutil-ytdlp-pot-provider", "yt_dlp_plugins.extractor.getpot_bgutil")
-    ]
-
-    missing = []
-    for pkg, imp in requirements:
-        try:
-            if importlib.util.find_spec(imp) is None:
-                missing.append(pkg)
-        except ModuleNotFoundError:
-            missing.append(pkg)
-
-    if missing:
-        print(f"📥 ComfyUI-Ytdpl: Instalando dependencias faltantes: {missing}")
-        try:
-            # 🚀 FIX: Pasamos el array limpio 'missing' sin forzar sufijos problemáticos
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet", *missing])
-            print("✅ Dependencias instaladas correctamente.")
-            if "playwright" in missing:
-                print("📥 Instalando navegadores de Playwright...")
-                subprocess.check_call([sys.executable, "-m", "playwright", "install", "chromium"])
-                print("✅ Navegadores de Playwright instalados.")
-        except Exception as e:
-            print(f"❌ Error al instalar dependencias: {e}")
-
-# Ejecutar verificación de requisitos al importar el nodo
-install_missing_requirements()
+# Los submódulos de ytdpl se cargan en el primer acceso: importar el nodo no
+# instala nada, no toca el PATH y no carga yt-dlp ni playwright
+try:
+    from . import ytdpl
+except ImportError:
+    import ytdpl
 
 def get_cookies_interactively(url, save_path):
     from playwright.sync_api import sync_playwright
@@ -112,13 +75,16 @@ class YTDLPVideoDownloader:
     def INPUT_TYPES(cls):
         cookies_folder = Path(__file__).parent.parent.parent / "input" / "cookies"
         cookies_folder.mkdir(parents=True, exist_ok=True)
-        cookie_files = [f.name for f in cookies_folder.glob("*.txt")]
-        if not cookie_files: cookie_files = ["Ninguno"]
+        # Auto: el jar válido más reciente para el dominio de la URL. La lista sale del
+        # almacén de cookies, que sólo relee la carpeta si ha cambiado
+        cookie_files = [ytdpl.cookies.AUTO, ytdpl.cookies.NONE, *ytdpl.cookies.get_store(cookies_folder).names()]
 
         # Contenedores 100% compatibles con --merge-output-format y --audio-format
         formats = [
             "mp4", "mkv", "webm", "mov", "avi", "flv",
-            "mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka"
+            "mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka",
+            # Mejor pista de audio tal cual (sin -x ni transcodificar), para el nodo de forma de onda
+            "audio"
         ]
 
         return {
@@ -130,18 +96,52 @@ class YTDLPVideoDownloader:
                 "update_yt_dlp": ("BOOLEAN", {"default": False}),
                 "quality": (["best", "1080p", "720p", "480p", "360p"], {"default": "best"}),
                 "format": (formats, {"default": "mp4"}),
+            },
+            "optional": {
+                # auto: API en proceso si yt_dlp es importable; subprocess: motor clásico por CLI
+                "engine": (["auto", "api", "subprocess"], {"default": "auto"}),
+                # Reutiliza descargas previas del mismo vídeo/calidad/contenedor sin tocar la red
+                "use_cache": ("BOOLEAN", {"default": True}),
+                # update_yt_dlp comprueba como mucho una vez por intervalo; rollback vuelve a la versión fijada
+                "update_interval_hours": ("INT", {"default": 24, "min": 0, "max": 720}),
+                "rollback_yt_dlp": ("BOOLEAN", {"default": False}),
+                # Transferencia: 0 / "auto" = predeterminado por extractor o download_settings.json
+                "concurrent_fragments": ("INT", {"default": 0, "min": 0, "max": 64}),
+                "http_chunk_size": ("STRING", {"default": "auto"}),
+                "throttled_rate": ("STRING", {"default": "auto"}),
+                "external_downloader": (ytdpl.transfer.EXTERNAL_DOWNLOADERS, {"default": "auto"}),
+                # Clip: sólo se descargan los rangos pedidos (0 = sin límite). "sections" admite
+                # varios rangos "inicio-fin" separados por comas y tiene prioridad
+                "start_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "end_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "sections": ("STRING", {"multiline": False, "default": ""}),
+                # keyframe: corte rápido sin recodificar; exact: fuerza keyframes en los bordes
+                "cut_mode": (["keyframe", "exact"], {"default": "keyframe"}),
+                # Cuotas de output/ytdpl (0 = YTDPL_STORAGE_QUOTA_GB / YTDPL_MAX_AGE_DAYS o sin límite):
+                # se desalojan las descargas menos usadas recientemente en segundo plano
+                "storage_quota_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.5}),
+                "max_age_days": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 1.0}),
             }
         }
 
-    RETURN_TYPES = ("*", "STRING", "STRING", "STRING", "STRING", "STRING")
-    RETURN_NAMES = ("video_path", "info", "title", "description", "thumbnail_url", "channel")
+    RETURN_TYPES = ("*", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("video_path", "info", "title", "description", "thumbnail_url", "channel", "media_info")
     FUNCTION = "download_video"
     CATEGORY = "video/download"
 
     @classmethod
-    def IS_CHANGED(cls, url, cookies_text, cookies_file, browser_source, update_yt_dlp, quality, format):
+    def IS_CHANGED(cls, url, cookies_text, cookies_file, browser_source, update_yt_dlp, quality, format, engine="auto", use_cache=True,
+                   start_time=0.0, end_time=0.0, sections="", cut_mode="keyframe", **download_options):
         import hashlib
+        # Enlaces equivalentes (youtu.be, /shorts/, parámetros de seguimiento...) no fuerzan otra ejecución
+        url = ytdpl.canonical.request_url(url)
         state_string = f"{url}_{cookies_text}_{cookies_file}_{browser_source}_{quality}_{format}"
+        try:
+            clip = ytdpl.sections.describe(ytdpl.sections.parse_sections(sections, start_time, end_time))
+        except Exception:
+            clip = f"{sections}_{start_time}_{end_time}"
+        if clip:
+            state_string += f"_{clip}_{cut_mode}"
         m = hashlib.sha256()
         m.update(state_string.encode('utf-8'))
         return m.digest().hex()
@@ -182,85 +182,200 @@ class YTDLPVideoDownloader:
 
         return f_str
 
-    def download_video(self, url, cookies_text, cookies_file, browser_source, update_yt_dlp, quality, format):
-        if update_yt_dlp:
-            print("🔄 ComfyUI-Ytdpl: Iniciando actualización forzada a NIGHTLY y motor EJS...")
+    def download_video(self, url, cookies_text, cookies_file, browser_source, update_yt_dlp, quality, format, engine="auto", use_cache=True,
+                       update_interval_hours=24, rollback_yt_dlp=False, storage_quota_gb=0.0, max_age_days=0.0,
+                       **download_options):
+        # Verificación de dependencias en el primer uso (no al importar el nodo)
+        ytdpl.deps.ensure_requirements()
+
+        # La actualización se comprueba en segundo plano y se instala entre trabajos
+        updater = ytdpl.updater.get_updater()
+        if rollback_yt_dlp:
+            updater.request_rollback()
+        elif update_yt_dlp:
+            updater.request_update(update_interval_hours)
+
+        request_key, video_key = self._job_keys(url, quality, format, use_cache, download_options)
+
+        # Descarga adelantada por el nodo de prefetch o la ruta HTTP: si ya terminó se devuelve
+        # al instante y si sigue en curso se espera a su futuro en lugar de descargar otra vez
+        job = ytdpl.jobs.get_service().claim(request_key)
+        if job is not None:
+            if not job.future.done():
+                print("⏳ [PREFETCH] Esta descarga ya está en curso en segundo plano. Esperando su resultado...")
             try:
-                subprocess.check_call([
-                    sys.executable, "-m", "pip", "install",
-                    "--no-cache-dir", "-U", "--pre",
-                    "yt-dlp[default]", "yt-dlp-ejs", "curl_cffi", "websockets", "--break-system-packages"
-                ])
-                print("✅ ComfyUI-Ytdpl: Actualización completada.")
-            except subprocess.CalledProcessError as e:
-                raise Exception(f"❌ Error crítico al actualizar yt-dlp: {str(e)}\nRevisa tu conexión a internet.")
+                result = job.future.result()
             except Exception as e:
-                raise Exception(f"❌ Error inesperado al actualizar: {str(e)}")
+                print(f"⚠️ [PREFETCH] La descarga adelantada falló ({e}). Reintentando ahora...")
+            else:
+                print(f"⚡ [PREFETCH] Reutilizando la descarga adelantada: {Path(result[0]).name}")
+                return result
+
+        return self._download(url, cookies_text, cookies_file, browser_source, quality, format, request_key, video_key,
+                              engine=engine, use_cache=use_cache, storage_quota_gb=storage_quota_gb,
+                              max_age_days=max_age_days, **download_options)
+
+    def prefetch(self, url, cookies_text, cookies_file, browser_source, quality, format, engine="auto", use_cache=True,
+                 update_interval_hours=24, rollback_yt_dlp=False, storage_quota_gb=0.0, max_age_days=0.0,
+                 **download_options):
+        """Encola la descarga en segundo plano. Devuelve `(trabajo, nuevo)` (ver ytdpl.jobs).
+
+        Las opciones del actualizador se aceptan pero no cuentan: no forman parte
+        de la petición y sólo las aplica el nodo descargador.
+        """
+        ytdpl.deps.ensure_requirements()
+        request_key, video_key = self._job_keys(url, quality, format, use_cache, download_options)
+
+        def run():
+            return self._download(url, cookies_text, cookies_file, browser_source, quality, format, request_key, video_key,
+                                  engine=engine, use_cache=use_cache, storage_quota_gb=storage_quota_gb,
+                                  max_age_days=max_age_days, **download_options)
+
+        return ytdpl.jobs.get_service().submit(request_key, url.strip(), run)
 
+    def _job_keys(self, url, quality, format, use_cache, download_options):
+        """`(clave de petición, clave de vídeo)` para single-flight, bloqueos y trabajos adelantados."""
+        import inspect
+        request_url, identity = ytdpl.canonical.identify(url, self.output_dir)
+        identity = identity or request_url
+        # Los valores por defecto no cuentan: la ruta HTTP sólo envía lo que cambia
+        defaults = {name: p.default for name, p in inspect.signature(YTDLPVideoDownloader._run_download).parameters.items()}
+        options = {k: v for k, v in download_options.items() if defaults.get(k, inspect.Parameter.empty) != v}
+        return (ytdpl.flight.flight_key(identity, quality, format, use_cache, options),
+                ytdpl.flight.flight_key(identity))
+
+    def _download(self, url, cookies_text, cookies_file, browser_source, quality, format, request_key, video_key,
+                  engine="auto", use_cache=True, storage_quota_gb=0.0, max_age_days=0.0, **download_options):
+        updater = ytdpl.updater.get_updater()
+        # Tramos por etapa, bytes y throughput de esta ejecución (output/ytdpl/_metrics)
+        metrics = ytdpl.metrics.RunMetrics(url, engine)
+
+        # Single-flight: la misma petición en curso en este proceso se comparte, y el mismo
+        # vídeo en otra instancia (mismo output/ytdpl) se espera con un bloqueo de archivo
+        def run():
+            with ytdpl.flight.file_lock(self.output_dir, video_key):
+                return self._run_download(url, cookies_text, cookies_file, browser_source, quality, format,
+                                          engine=engine, use_cache=use_cache, metrics=metrics, **download_options)
+
+        try:
+            with updater.job(), ytdpl.metrics.maybe_profile(self.output_dir):
+                result, shared = ytdpl.flight.single_flight(request_key, run)
+        except Exception as e:
+            metrics.finish(self.output_dir, "error", error=e)
+            raise
+        finally:
+            # Cuotas y limpieza de parciales huérfanos, en segundo plano y como mucho cada pocos minutos
+            ytdpl.storage.schedule_maintenance(self.output_dir, *ytdpl.storage.quotas(storage_quota_gb, max_age_days))
+        if shared:
+            status = "shared"
+        else:
+            status = "cache" if result[1].startswith("✅ Caché") else "ok"
+        metrics.finish(self.output_dir, status)
+        updater.mark_good()
+        return result
+
+    def _run_download(self, url, cookies_text, cookies_file, browser_source, quality, format, engine="auto", use_cache=True,
+                      concurrent_fragments=0, http_chunk_size="auto", throttled_rate="auto", external_downloader="auto",
+                      start_time=0.0, end_time=0.0, sections="", cut_mode="keyframe", metrics=None):
+        metrics = metrics or ytdpl.metrics.RunMetrics(url, engine)
         if not url.strip():
             raise Exception("❌ La URL está vacía.")
 
-        # 🚀 FIX: Bypass para Carruseles de Fotos de TikTok
-        # yt-dlp no reconoce las URLs con "/photo/". Si la cambiamos a "/video/",
-        # la API de TikTok entrega el mismo medio y yt-dlp lo extrae perfectamente.
-        url_lower = url.lower()
-        if "tiktok.com" in url_lower and "/photo/" in url_lower:
-            print("🔄 [TIKTOK BYPASS]: Detectada URL de galería de fotos. Adaptando enlace para yt-dlp...")
-            # Reemplazamos solo la primera aparición por seguridad
-            import re
-            url = re.sub(r'/photo/', '/video/', url, count=1, flags=re.IGNORECASE)
-            print(f"🔗 Nueva URL inyectada: {url}")
+        # URL canónica e identidad (extractor, id) sin red: reglas por sitio e índice de alias.
+        # Incluye el bypass de carruseles de TikTok: yt-dlp no reconoce "/photo/" y con
+        # "/video/" la API entrega el mismo medio
+        original_url = url.strip()
+        # Sólo los sitios con regla se descargan (y se indexan) por su forma canónica; el resto, tal cual
+        url, matched = ytdpl.canonical.identify(original_url, self.output_dir)
+        if url != original_url:
+            print(f"🔗 [URL] Canónica: {url}")
 
         dest_path = self.output_dir
 
         # === AÑADIDO 'mka' QUE FALTABA EN LA VALIDACIÓN ===
-        is_audio = format in ["mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka"]
+        is_audio = format in ["mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka", "audio"]
 
-        # === LÓGICA DE COOKIES ===
-        cookie_path_to_use = None
+        # === CLIPS / RANGOS DE TIEMPO ===
+        clip_ranges = ytdpl.sections.parse_sections(sections, start_time, end_time)
+        section_args = ytdpl.sections.build_args(clip_ranges, exact_cuts=(cut_mode == "exact"))
+        # La clave de caché distingue el vídeo completo de cada clip
+        cache_format = quality
+        if clip_ranges:
+            cache_format = f"{quality}|{ytdpl.sections.describe(clip_ranges)}|{cut_mode}"
+            print(f"✂️ [CLIP] Descargando sólo: {ytdpl.sections.describe(clip_ranges)} ({cut_mode})")
 
-        if cookies_text and cookies_text.strip():
-            cookie_path_to_use = self.cookies_dir / "cookies_pegadas.txt"
-            try:
-                with open(cookie_path_to_use, 'w', encoding='utf-8') as f:
-                    f.write(cookies_text)
-                print(f"🍪 Cookies creadas y guardadas permanentemente en: {cookie_path_to_use.name}")
-            except Exception as e:
-                raise Exception(f"❌ Error al guardar las cookies en input/cookies: {e}")
+        # === CACHÉ LOCAL DE DESCARGAS ===
+        download_cache = ytdpl.cache.DownloadCache(self.output_dir)
+        cache_keys = []
+        hit = None
+        with metrics.span("cache_lookup"):
+            if matched:
+                metrics.extractor = matched[0]
+            if use_cache and matched:
+                cache_keys.append(ytdpl.cache.cache_key(*matched, cache_format, format))
+                hit = download_cache.get(cache_keys[0])
+        if hit:
+            hit_path = Path(hit["path"])
+            print(f"⚡ [CACHÉ] {matched[0]}:{matched[1]} ya descargado -> {hit_path.name}")
+            if hit["meta"].get("id"):
+                # Uso reciente: el gestor de almacenamiento desaloja primero lo menos usado
+                ytdpl.index.OutputIndex(self.output_dir).touch(hit["meta"].get("extractor_key"), hit["meta"]["id"],
+                                                               hit_path)
+            with metrics.span("probe"):
+                media_info = self._probe_media(hit_path)
+            return self._build_outputs(hit_path, hit["meta"], "✅ Caché", media_info)
 
-        elif cookies_file != "Ninguno":
-            c_path = self.cookies_dir / cookies_file
-            if c_path.exists():
-                cookie_path_to_use = c_path
-                print(f"🍪 Usando archivo de cookies existente: {c_path.name}")
-            else:
-                print(f"⚠️ El archivo {cookies_file} no existe. Continuando sin cookies.")
+        # === LÓGICA DE COOKIES ===
+        cookie_path_to_use = self._resolve_cookies(url, cookies_text, cookies_file)
 
         auto_cookie_path = self.cookies_dir / "auto_cookies.txt"
 
-        for attempt in range(2):
+        use_api = self._resolve_engine(engine)
+        metrics.engine = "api" if use_api else "subprocess"
+
+        transfer_settings = ytdpl.transfer.resolve(matched[0] if matched else None, {
+            "concurrent_fragments": concurrent_fragments,
+            "http_chunk_size": http_chunk_size,
+            "throttled_rate": throttled_rate,
+            "external_downloader": external_downloader,
+        })
+        transfer_args = ytdpl.transfer.build_args(transfer_settings)
+        js_runtime_args = ytdpl.deps.js_runtime_args()
+        if transfer_args:
+            print(f"🚄 [TRANSFERENCIA] {' '.join(transfer_args)}")
+
+        # Reintentos según la categoría del error y cortacircuitos por host (ytdpl.errors)
+        breaker = ytdpl.errors.get_breaker()
+        host = ytdpl.batch.host_of(url)
+        retries = {}
+        cookie_retry_done = False
+        while True:
+            breaker.before(host)
             try:
-                def build_cmd(q_val, get_filename=False):
-                    f_str = self.get_format_string(q_val, format, is_audio)
-                    cmd = [
-                        sys.executable, "-m", "yt_dlp",
-                        "-f", f_str,
+                def build_args(q_val, get_filename=False, write_info_json=True):
+                    args = [
                         "--restrict-filenames",
                         "-P", str(dest_path),
                         "--no-overwrites",
                         "--yes-playlist",
                         "--ignore-errors",
-                        "--remote-components", "ejs:github"
+                        "--remote-components", "ejs:github",
+                        *js_runtime_args,
+                        *transfer_args,
+                        *section_args
                     ]
+                    # En proceso elige ytdpl.formats sobre la lista extraída; la cadena `-f` es sólo para el CLI
+                    if not use_api:
+                        args[:0] = ["-f", self.get_format_string(q_val, format, is_audio)]
 
-                    if is_audio and not get_filename:
-                        cmd.extend(["-x", "--audio-format", format])
+                    if is_audio and not get_filename and format != "audio":
+                        args.extend(["-x", "--audio-format", format])
 
                     if cookie_path_to_use:
-                        cmd.extend(["--cookies", str(cookie_path_to_use)])
-                        cmd.extend(["--extractor-args", "youtube:player_client=tv_downgraded,web;po_token=web+bgutil"])
+                        args.extend(["--cookies", str(cookie_path_to_use)])
+                        args.extend(["--extractor-args", "youtube:player_client=tv_downgraded,web;po_token=web+bgutil"])
                     else:
-                        cmd.extend(["--extractor-args", "youtube:player_client=android,tv;po_token=web+bgutil"])
+                        args.extend(["--extractor-args", "youtube:player_client=android,tv;po_token=web+bgutil"])
 
                     # === CAMBIO: USAR NOMBRES GENÉRICOS DE NAVEGADOR PARA CURL-CFFI ===
                     if browser_source != "Ninguno":
@@ -272,145 +387,829 @@ class YTDLPVideoDownloader:
                         }
                         target = browser_map.get(browser_source)
                         if target:
-                            cmd.extend(["--impersonate", target])
+                            args.extend(["--impersonate", target])
 
                     if get_filename:
-                        cmd.append("--get-filename")
+                        args.append("--get-filename")
 
                     if not is_audio:
-                        cmd.extend(["--merge-output-format", format])
+                        args.extend(["--merge-output-format", format])
 
                     # Pedir a yt-dlp que genere un archivo con todos los metadatos
-                    cmd.append("--write-info-json")
+                    # (el motor en proceso los lee directamente del info dict)
+                    if write_info_json:
+                        args.append("--write-info-json")
 
-                    cmd.append(url)
-                    return cmd
+                    return args
 
-                print(f"🔍 Calculando nombre de archivo para: {url}")
+                def build_cmd(q_val, get_filename=False, extra_args=()):
+                    return [sys.executable, "-m", "yt_dlp", *build_args(q_val, get_filename=get_filename), *extra_args, url]
 
-                cmd_filename = build_cmd(quality, get_filename=True)
-                filename_res = subprocess.run(cmd_filename, capture_output=True, text=True, timeout=1800)
+                if use_api:
+                    # Selección por puntuación sobre la lista de formatos de la única extracción
+                    selector = ytdpl.formats.selector(quality, format, is_audio)
+                    final_path, meta = self._download_in_process(build_args, url, quality, metrics, format_selector=selector)
+                else:
+                    final_path, meta = self._download_with_subprocess(build_cmd, dest_path, quality, cookies_file, metrics)
+                if meta.get("extractor_key"):
+                    metrics.extractor = meta["extractor_key"]
+
+                if is_audio and format != "audio":
+                    actual_ext = final_path.suffix.lower().lstrip(".")
+                    audio_formats = ["mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka"]
+                    if actual_ext not in audio_formats:
+                        raise Exception("❌ El vídeo se descargó correctamente pero no se encontró ninguna pista de audio para extraer. (Posible vídeo mudo de TikTok/YouTube).")
+
+                # 🔍 SISTEMA DE VERIFICACIÓN DE CÓDECS (un único ffprobe, cacheado junto al archivo)
+                with metrics.span("probe"):
+                    media_info = self._probe_media(final_path, audit_audio=not is_audio)
+
+                # Registro en el índice de salida, en el de alias y en la caché
+                with metrics.span("bookkeeping"):
+                    if meta.get("extractor_key") and meta.get("id") and not meta.get("playlist_id") \
+                            and tuple(matched or ()) != (meta["extractor_key"], str(meta["id"])):
+                        # Enlaces cortos o genéricos: la próxima vez se reconocen sin red
+                        try:
+                            ytdpl.canonical.AliasIndex(self.output_dir).record(
+                                [original_url, url], meta["extractor_key"], meta["id"], url)
+                        except Exception as e:
+                            print(f"⚠️ [ALIAS] No se pudo registrar la URL: {e}")
+                    if meta.get("id"):
+                        try:
+                            ytdpl.index.OutputIndex(self.output_dir).record(meta.get("extractor_key"), meta["id"], final_path)
+                        except Exception as e:
+                            print(f"⚠️ [ÍNDICE] No se pudo registrar la descarga: {e}")
+
+                    if use_cache:
+                        keys = list(cache_keys)
+                        if meta.get("extractor_key") and meta.get("id"):
+                            keys.append(ytdpl.cache.cache_key(meta["extractor_key"], meta["id"], cache_format, format))
+                        if keys:
+                            try:
+                                download_cache.put(keys, final_path, meta)
+                            except Exception as e:
+                                print(f"⚠️ [CACHÉ] No se pudo registrar la descarga: {e}")
+
+                breaker.record_success(host)
+                return self._build_outputs(final_path, meta, "✅ Éxito", media_info)
+
+            except Exception as e:
+                category = ytdpl.errors.classify(e)
+                breaker.record_failure(host, category)
+                if "yt_dlp_error:" not in str(e).lower():
+                    raise e
+                error_tail = str(e)[-200:]
+
+                if category in ytdpl.errors.NEEDS_COOKIES:
+                    if cookie_retry_done:
+                        raise ytdpl.errors.DownloadFailed(f"🛑 Error final de descarga:\n{error_tail}", category)
+                    cookie_retry_done = True
+                    print("🛑 Bloqueo detectado. Lanzando Auto-Cookie...")
+                    with metrics.span("cookie_retry"):
+                        success = get_cookies_interactively(url, auto_cookie_path)
+                    if success:
+                        cookie_path_to_use = str(auto_cookie_path)
+                        continue
+                    raise ytdpl.errors.DownloadFailed("🛑 YouTube/TikTok bloqueó la descarga (Requiere Sesión/Captcha) y la interfaz gráfica falló. Pega tu texto de cookies actualizado en el nodo de forma manual.", category)
+
+                policy = ytdpl.errors.POLICIES[category]
+                attempt = retries.get(category, 0)
+                if attempt < policy.retries:
+                    retries[category] = attempt + 1
+                    delay = ytdpl.errors.backoff_delay(category, attempt)
+                    print(f"🔁 [REINTENTO] Error '{category}' ({attempt + 1}/{policy.retries}). Reintentando en {delay:.1f} s...")
+                    time.sleep(delay)
+                    metrics.add("retry_backoff", delay)
+                    continue
+                raise ytdpl.errors.DownloadFailed(f"🛑 Error en yt-dlp ({category}):\n{error_tail}", category)
+
+    def _resolve_cookies(self, url, cookies_text="", cookies_file="Ninguno"):
+        """Jar de cookies para `url`, validado (dominio y caducidad) antes de lanzar yt-dlp."""
+        store = ytdpl.cookies.get_store(self.cookies_dir)
+
+        if cookies_text and cookies_text.strip():
+            try:
+                _, written = store.save_pasted(cookies_text)
+            except Exception as e:
+                raise Exception(f"❌ Error al guardar las cookies en input/cookies: {e}")
+            if written:
+                print(f"🍪 Cookies creadas y guardadas permanentemente en: {ytdpl.cookies.PASTED_NAME}")
+            chosen = ytdpl.cookies.PASTED_NAME
+        elif cookies_file == ytdpl.cookies.AUTO:
+            path = store.select(url)
+            if path:
+                print(f"🍪 [COOKIES] Seleccionado automáticamente: {Path(path).name}")
+            return path
+        elif cookies_file and cookies_file != ytdpl.cookies.NONE:
+            chosen = cookies_file
+        else:
+            return None
+
+        reason = store.check(chosen, url)
+        if reason is None:
+            print(f"🍪 Usando archivo de cookies: {chosen}")
+            return str(self.cookies_dir / chosen)
+
+        # Un jar caducado o de otro sitio haría fallar la extracción: se descarta antes
+        print(f"⚠️ [COOKIES] Se descarta {chosen}: {reason}.")
+        fallback = store.select(url)
+        if fallback:
+            print(f"🍪 [COOKIES] Usando en su lugar: {Path(fallback).name}")
+        else:
+            print("⚠️ [COOKIES] Ningún jar válido para este sitio. Continuando sin cookies.")
+        return fallback
+
+    def _build_outputs(self, final_path, meta, status, media_info=None):
+        """Tupla de salidas del nodo a partir de la ruta final y sus metadatos."""
+        import json
+        title = meta.get("title") or ""
+        description = meta.get("description") or ""
+        thumbnail_url = meta.get("thumbnail") or ""
+        channel = meta.get("uploader") or ""
+        return (str(final_path), f"{status}: {final_path.name}", title, description, thumbnail_url, channel,
+                json.dumps(media_info or {}, ensure_ascii=False))
+
+    def _probe_media(self, final_path, audit_audio=False):
+        """Sondea el archivo una sola vez (resultado cacheado) y, si se pide, audita su audio."""
+        try:
+            media_info = ytdpl.probe.probe(final_path)
+        except Exception as e:
+            print(f"⚠️ [AUDITORÍA DE AUDIO]: No se pudo ejecutar ffprobe: {e}")
+            return {}
 
-                selected_quality = quality
+        if audit_audio:
+            if not media_info["has_audio"] or not media_info["audio_codec"]:
+                print(f"\n⚠️ [AUDITORÍA DE AUDIO]: No se detectó un códec de audio válido en {final_path.name}.")
+                print("👉 Posibles causas:")
+                print("   1. El video original NO tiene sonido (es mudo en la fuente).")
+                print("   2. Faltan librerías de códecs. Para asegurarte, ejecuta en tu terminal WSL/Linux:")
+                print("      sudo apt update && sudo apt install ffmpeg libavcodec-extra -y\n")
+            else:
+                print(f"🎵 [AUDITORÍA DE AUDIO]: Códec detectado correctamente -> {media_info['audio_codec'].upper()}")
+        return media_info
+
+    def _resolve_engine(self, engine_name):
+        """Decide si la descarga se hace con la API en proceso o con el CLI."""
+        if engine_name == "subprocess":
+            return False
+        if ytdpl.engine.is_available():
+            return True
+        if engine_name == "api":
+            raise Exception("❌ El motor 'api' requiere yt-dlp instalado en el intérprete de ComfyUI.")
+        print("⚠️ yt_dlp no es importable en proceso. Usando el motor por subprocess.")
+        return False
+
+    def _download_in_process(self, build_args, url, quality, metrics=None, format_selector=None):
+        """Descarga con la API de yt-dlp: una sola extracción por URL."""
+        metrics = metrics or ytdpl.metrics.RunMetrics(url)
+        print(f"📥 Iniciando descarga en proceso ({quality}) para: {url}")
+        fallback_format = None
+        if quality != "best" and format_selector is None:
+            best_args = build_args("best", write_info_json=False)
+            fallback_format = best_args[best_args.index("-f") + 1] if "-f" in best_args else None
 
-                if filename_res.returncode != 0 and quality != "best":
-                    print(f"⚠️ No se pudo calcular nombre para '{quality}'. Probando con 'best'...")
-                    selected_quality = "best"
-                    cmd_filename = build_cmd("best", get_filename=True)
-                    filename_res = subprocess.run(cmd_filename, capture_output=True, text=True, timeout=1800)
+        print("--- Registro de yt-dlp (ComfyUI) ---")
+        tracker = ytdpl.progress.ProgressTracker()
+        started = time.monotonic()
+        try:
+            filepath, meta = ytdpl.engine.download(build_args(quality, write_info_json=False), url,
+                                                   fallback_format=fallback_format, tracker=tracker,
+                                                   format_selector=format_selector)
+        finally:
+            metrics.record_transfer(tracker, started, time.monotonic())
+        print("------------------------------------\n")
+
+        final_path = Path(filepath)
+        joined = self._join_sections([d.get("filepath") for d in meta.get("requested_downloads") or []], metrics)
+        if joined is not None:
+            final_path = joined
+        print(f"🎯 Archivo final: {final_path.name}")
+        return final_path, meta
 
-                if filename_res.returncode != 0:
-                    error_stderr = filename_res.stderr or ""
-                    error_stderr_lower = error_stderr.lower()
-                    if "permission denied" in error_stderr_lower:
-                        raise Exception(f"🛑 Error de permisos con el archivo de cookies seleccionado ({cookies_file}). SOLUCIÓN: Abre ese archivo en texto plano, copia todo, pégalo en el cajón 'cookies_text' de ComfyUI y borra el archivo original problemático.")
-                    raise Exception(f"YT_DLP_ERROR: {error_stderr}")
+    def _download_with_subprocess(self, build_cmd, dest_path, quality, cookies_file, metrics=None):
+        """Motor de respaldo: `python -m yt_dlp` en un intérprete aparte."""
+        metrics = metrics or ytdpl.metrics.RunMetrics(None)
+        print(f"🔍 Calculando nombre de archivo para: {build_cmd(quality, get_filename=True)[-1]}")
 
-                expected_filename = filename_res.stdout.strip().splitlines()[-1]
-                expected_path = Path(expected_filename)
-                print(f"🎯 Archivo esperado: {expected_path.name}")
+        with metrics.span("filename_prediction"):
+            cmd_filename = build_cmd(quality, get_filename=True)
+            filename_res = subprocess.run(cmd_filename, capture_output=True, text=True, timeout=1800)
 
-                print(f"📥 Iniciando descarga ({selected_quality})...")
-                cmd_dl = build_cmd(selected_quality, get_filename=False)
+            selected_quality = quality
+
+            if filename_res.returncode != 0 and quality != "best":
+                print(f"⚠️ No se pudo calcular nombre para '{quality}'. Probando con 'best'...")
+                selected_quality = "best"
+                cmd_filename = build_cmd("best", get_filename=True)
+                filename_res = subprocess.run(cmd_filename, capture_output=True, text=True, timeout=1800)
 
-                # 🚀 NUEVO LOG: Imprimir el comando exacto para debug
-                print(f"⚙️ [YT-DLP] Ejecutando comando final en el sistema:")
-                print(f"   -> {' '.join(cmd_dl)}\n")
+        if filename_res.returncode != 0:
+            error_stderr = filename_res.stderr or ""
+            error_stderr_lower = error_stderr.lower()
+            if "permission denied" in error_stderr_lower:
+                raise Exception(f"🛑 Error de permisos con el archivo de cookies seleccionado ({cookies_file}). SOLUCIÓN: Abre ese archivo en texto plano, copia todo, pégalo en el cajón 'cookies_text' de ComfyUI y borra el archivo original problemático.")
+            raise Exception(f"YT_DLP_ERROR: {error_stderr}")
 
-                print("--- Registro de yt-dlp (ComfyUI) ---")
-                proc = subprocess.Popen(cmd_dl, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        expected_filename = filename_res.stdout.strip().splitlines()[-1]
+        expected_path = Path(expected_filename)
+        print(f"🎯 Archivo esperado: {expected_path.name}")
 
-                output_lines = []
-                for line in proc.stdout:
+        print(f"📥 Iniciando descarga ({selected_quality})...")
+        # yt-dlp escribe aquí la ruta final de cada vídeo tras moverlo; un archivo por trabajo,
+        # así varias descargas simultáneas nunca se confunden de archivo
+        import tempfile
+        report_fd, report_path = tempfile.mkstemp(prefix="ytdpl-final-", suffix=".jsonl")
+        os.close(report_fd)
+        cmd_dl = build_cmd(selected_quality, get_filename=False, extra_args=[
+            *ytdpl.progress.PROGRESS_ARGS,
+            "--print-to-file", ytdpl.index.FINAL_PATH_TEMPLATE, report_path,
+        ])
+
+        # 🚀 NUEVO LOG: Imprimir el comando exacto para debug
+        print(f"⚙️ [YT-DLP] Ejecutando comando final en el sistema:")
+        print(f"   -> {' '.join(cmd_dl)}\n")
+
+        print("--- Registro de yt-dlp (ComfyUI) ---")
+        # Sólo se guarda un registro acotado; el progreso se parsea como eventos estructurados
+        tracker = ytdpl.progress.ProgressTracker()
+        started = time.monotonic()
+        try:
+            proc = subprocess.Popen(cmd_dl, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+            for line in proc.stdout:
+                if not tracker.feed_line(line):
                     sys.stdout.write(line)
                     sys.stdout.flush()
-                    output_lines.append(line)
 
-                proc.wait()
-                output = "".join(output_lines)
-                print("------------------------------------\n")
+            proc.wait()
+            final_records = ytdpl.index.read_final_paths(report_path)
+        finally:
+            metrics.record_transfer(tracker, started, time.monotonic())
+            try:
+                os.remove(report_path)
+            except OSError:
+                pass
+        print("------------------------------------\n")
 
-                if proc.returncode == 0:
-                    final_path = None
-                    if expected_path.exists():
-                        final_path = expected_path
-                    else:
-                        print("⚠️ Archivo predicho no encontrado, buscando el más reciente...")
-                        # Filtramos los .json para no seleccionar el archivo de metadatos por error
-                        files = [f for f in dest_path.glob("*.*") if not f.name.endswith(".json")]
-                        if not files: raise Exception("Archivo de video no encontrado tras descarga exitosa.")
-                        final_path = max(files, key=lambda f: f.stat().st_mtime)
-
-                    if is_audio:
-                        actual_ext = final_path.suffix.lower().lstrip(".")
-                        audio_formats = ["mp3", "m4a", "wav", "flac", "ogg", "opus", "aac", "mka"]
-                        if actual_ext not in audio_formats:
-                            raise Exception("❌ El vídeo se descargó correctamente pero no se encontró ninguna pista de audio para extraer. (Posible vídeo mudo de TikTok/YouTube).")
+        if proc.returncode != 0:
+            raise Exception(f"YT_DLP_ERROR: {tracker.tail()}")
 
-                    if not is_audio:
-                        # 🔍 SISTEMA DE VERIFICACIÓN DE CÓDECS
-                        try:
-                            probe_cmd = [
-                                "ffprobe", "-v", "error",
-                                "-select_streams", "a:0",
-                                "-show_entries", "stream=codec_name",
-                                "-of", "default=noprint_wrappers=1:nokey=1",
-                                str(final_path)
-                            ]
-                            probe_res = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=15)
-                            audio_codec = probe_res.stdout.strip()
-
-                            if not audio_codec or "unable to obtain" in probe_res.stderr.lower():
-                                print(f"\n⚠️ [AUDITORÍA DE AUDIO]: No se detectó un códec de audio válido en {final_path.name}.")
-                                print("👉 Posibles causas:")
-                                print("   1. El video original NO tiene sonido (es mudo en la fuente).")
-                                print("   2. Faltan librerías de códecs. Para asegurarte, ejecuta en tu terminal WSL/Linux:")
-                                print("      sudo apt update && sudo apt install ffmpeg libavcodec-extra -y\n")
-                            else:
-                                print(f"🎵 [AUDITORÍA DE AUDIO]: Códec detectado correctamente -> {audio_codec.upper()}")
-                        except Exception as e:
-                            print(f"⚠️ [AUDITORÍA DE AUDIO]: No se pudo ejecutar ffprobe: {e}")
+        final_path = None
+        pieces = []
+        if final_records:
+            # En listas se toma el último vídeo descargado, igual que el motor en proceso
+            record = final_records[-1]
+            # Con varios rangos hay una línea (un archivo) por rango del mismo vídeo
+            pieces = [r.get("filepath") for r in final_records if r.get("id") == record.get("id")]
+            final_path = Path(record["filepath"])
+            if not final_path.exists():
+                entry = ytdpl.index.OutputIndex(dest_path).lookup(record.get("extractor_key"), record.get("id"))
+                final_path = Path(entry["path"]) if entry else None
+        elif expected_path.exists():
+            final_path = expected_path
 
-                    # --- Leer metadatos del JSON ---
-                    title, description, thumbnail_url, channel = "", "", "", ""
-                    import json
-                    json_path = final_path.with_suffix('.info.json')
+        if final_path is None:
+            raise Exception("Archivo de video no encontrado tras descarga exitosa.")
+        print(f"🎯 Archivo final: {final_path.name}")
 
-                    if json_path.exists():
-                        try:
-                            with open(json_path, 'r', encoding='utf-8') as f:
-                                meta = json.load(f)
-                                title = meta.get("title", "")
-                                description = meta.get("description", "")
-                                thumbnail_url = meta.get("thumbnail", "")
-                                channel = meta.get("uploader", "")
-                            os.remove(json_path)
-                        except Exception as e:
-                            print(f"⚠️ Error leyendo metadatos JSON: {e}")
+        # --- Leer metadatos del JSON ---
+        meta = {}
+        import json
+        json_path = final_path.with_suffix('.info.json')
 
-                    return (str(final_path), f"✅ Éxito: {final_path.name}", title, description, thumbnail_url, channel)
-                else:
-                    raise Exception(f"YT_DLP_ERROR: {output}")
+        with metrics.span("metadata"):
+            if json_path.exists():
+                try:
+                    with open(json_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    os.remove(json_path)
+                except Exception as e:
+                    print(f"⚠️ Error leyendo metadatos JSON: {e}")
+
+        joined = self._join_sections(pieces, metrics)
+        if joined is not None:
+            for piece in pieces:
+                try:
+                    os.remove(Path(piece).with_suffix('.info.json'))
+                except OSError:
+                    pass
+            final_path = joined
+        return final_path, meta
+
+    def _join_sections(self, pieces, metrics=None):
+        """Con varios rangos yt-dlp deja un archivo por rango: se unen en uno solo (None si hay uno)."""
+        pieces = list(dict.fromkeys(str(p) for p in pieces if p))
+        if len(pieces) < 2:
+            return None
+        metrics = metrics or ytdpl.metrics.RunMetrics(None)
+        print(f"✂️ [CLIP] Uniendo {len(pieces)} rangos en un solo archivo (sin recodificar)...")
+        with metrics.span("join_sections"):
+            return Path(ytdpl.sections.join_clips(pieces))
+
+class YTDLPBatchDownloader:
+    def __init__(self):
+        self.downloader = YTDLPVideoDownloader()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = YTDLPVideoDownloader.INPUT_TYPES()
+        required = {"urls": ("STRING", {"multiline": True, "default": ""})}
+        required.update({k: v for k, v in base["required"].items() if k not in ("url", "update_yt_dlp")})
+        required.update({
+            "expand_playlists": ("BOOLEAN", {"default": True}),
+            # thread: API en proceso en paralelo; process: cada elemento en su propio proceso yt-dlp
+            "pool": (["thread", "process"], {"default": "thread"}),
+            "max_workers": ("INT", {"default": 4, "min": 1, "max": 32}),
+            "per_host_limit": ("INT", {"default": 2, "min": 1, "max": 16}),
+        })
+        return {"required": required, "optional": dict(base["optional"])}
+
+    RETURN_TYPES = ("*", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("video_paths", "titles", "statuses", "report")
+    OUTPUT_IS_LIST = (True, True, True, False)
+    FUNCTION = "download_batch"
+    CATEGORY = "video/download"
+
+    @classmethod
+    def IS_CHANGED(cls, urls, cookies_text, cookies_file, browser_source, quality, format, expand_playlists, pool, max_workers, per_host_limit, engine="auto", **download_options):
+        import hashlib
+        state_string = f"{urls}_{cookies_text}_{cookies_file}_{browser_source}_{quality}_{format}_{expand_playlists}"
+        m = hashlib.sha256()
+        m.update(state_string.encode('utf-8'))
+        return m.digest().hex()
+
+    def download_batch(self, urls, cookies_text, cookies_file, browser_source, quality, format, expand_playlists, pool, max_workers, per_host_limit, engine="auto", **download_options):
+        import json
+
+        ytdpl.deps.ensure_requirements()
+        url_list = ytdpl.batch.parse_url_list(urls)
+        if not url_list:
+            raise Exception("❌ La lista de URLs está vacía.")
+
+        if expand_playlists:
+            def expand(url):
+                return ytdpl.engine.expand_playlist(url, self.downloader._resolve_cookies(url, cookies_text, cookies_file))
+
+            url_list = ytdpl.batch.expand_urls(url_list, expand, self._may_be_playlist,
+                                               max_workers=max_workers, per_host_limit=per_host_limit)
+
+        # En modo 'process' cada elemento corre en su propio intérprete yt-dlp
+        item_engine = "subprocess" if pool == "process" else engine
+        print(f"📦 [LOTE] {len(url_list)} elementos | workers: {max_workers} | por host: {per_host_limit} | pool: {pool}")
+
+        def worker(url):
+            return self.downloader.download_video(
+                url, cookies_text, cookies_file, browser_source, False, quality, format,
+                engine=item_engine, **download_options)
+
+        results = ytdpl.batch.run_batch(url_list, worker, max_workers=max_workers, per_host_limit=per_host_limit)
+
+        paths, titles, statuses, report = [], [], [], []
+        for item in results:
+            if item["ok"]:
+                path, status, title, description, thumbnail_url, channel, media_info = item["result"]
+                report.append({
+                    "index": item["index"], "url": item["url"], "status": "ok", "path": path,
+                    "title": title, "description": description, "thumbnail_url": thumbnail_url, "channel": channel,
+                    "media_info": json.loads(media_info),
+                })
+            else:
+                path, title, status = "", "", f"❌ Error: {item['error']}"
+                report.append({"index": item["index"], "url": item["url"], "status": "error", "error": item["error"]})
+            paths.append(path)
+            titles.append(title)
+            statuses.append(status)
+
+        ok_count = sum(1 for item in results if item["ok"])
+        print(f"✅ [LOTE] Completado: {ok_count}/{len(results)} elementos descargados.")
+        return (paths, titles, statuses, json.dumps(report, ensure_ascii=False, indent=2))
+
+    def _may_be_playlist(self, url):
+        """Sin red: sólo las URLs que no se identifican como un vídeo suelto se listan como playlist."""
+        _, identity = ytdpl.canonical.identify(url, self.downloader.output_dir)
+        return identity is None or not ytdpl.engine.returns_single_video(identity[0])
+
+class YTDLPPrefetch:
+    def __init__(self):
+        self.downloader = YTDLPVideoDownloader()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = YTDLPVideoDownloader.INPUT_TYPES()
+        # Mismas opciones que el descargador: el trabajo sólo se reutiliza si la petición coincide
+        required = {"urls": ("STRING", {"multiline": True, "default": ""})}
+        required.update({k: v for k, v in base["required"].items() if k not in ("url", "update_yt_dlp")})
+        # El actualizador lo gobierna el nodo descargador, no el prefetch
+        optional = {k: v for k, v in base["optional"].items() if k not in ("update_interval_hours", "rollback_yt_dlp")}
+        return {"required": required, "optional": optional}
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("report",)
+    FUNCTION = "prefetch"
+    CATEGORY = "video/download"
+    # Se ejecuta aunque nada consuma su salida
+    OUTPUT_NODE = True
+
+    def prefetch(self, urls, cookies_text, cookies_file, browser_source, quality, format, **download_options):
+        import json
+
+        url_list = ytdpl.batch.parse_url_list(urls)
+        if not url_list:
+            raise Exception("❌ La lista de URLs está vacía.")
+        report = []
+        for url in url_list:
+            job, created = self.downloader.prefetch(url, cookies_text, cookies_file, browser_source, quality, format,
+                                                    **download_options)
+            print(f"⏭️ [PREFETCH] {'Encolado' if created else 'Ya en cola'} ({job.state}): {url}")
+            report.append({"url": url, "state": job.state, "queued": created})
+        # Vuelve al instante: las descargas siguen en segundo plano mientras corre el resto del grafo
+        return (json.dumps(report, ensure_ascii=False, indent=2),)
+
+class YTDLPVideoFrames:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "video_path": ("STRING", {"forceInput": True}),
+                "frame_stride": ("INT", {"default": 1, "min": 1, "max": 1000}),
+                "max_frames": ("INT", {"default": 0, "min": 0, "max": 100000}),
+                "start_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "end_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "width": ("INT", {"default": 0, "min": 0, "max": 8192}),
+                "height": ("INT", {"default": 0, "min": 0, "max": 8192}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "INT", "FLOAT")
+    RETURN_NAMES = ("frames", "frame_count", "fps")
+    FUNCTION = "load_frames"
+    CATEGORY = "video/download"
+
+    def load_frames(self, video_path, frame_stride, max_frames, start_time, end_time, width, height):
+        import torch
+
+        ytdpl.deps.ensure_requirements()
+        if not video_path or not Path(video_path).is_file():
+            raise Exception(f"❌ No existe el vídeo: {video_path}")
+
+        # El vídeo no se desaloja de output/ytdpl mientras se decodifica
+        with ytdpl.storage.pin(video_path):
+            batch_array, timestamps, fps = ytdpl.frames.load_frames(
+                video_path, stride=frame_stride, max_frames=max_frames,
+                start_time=start_time, end_time=end_time, width=width, height=height)
+        print(f"🎞️ [FRAMES] {len(timestamps)} frames {batch_array.shape[2]}x{batch_array.shape[1]} "
+              f"({timestamps[0]:.2f}s -> {timestamps[-1]:.2f}s) de {Path(video_path).name}")
+        return (torch.from_numpy(batch_array), len(timestamps), fps)
+
+class YTDLPAudioWaveform:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "audio_path": ("STRING", {"forceInput": True}),
+                # 0 conserva la frecuencia original del archivo
+                "sample_rate": ("INT", {"default": 44100, "min": 0, "max": 192000}),
+                "channels": (list(ytdpl.audio.CHANNEL_MODES), {"default": "original"}),
+                "start_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "end_time": ("FLOAT", {"default": 0.0, "min": 0.0, "step": 0.1}),
+                "normalize": ("BOOLEAN", {"default": False}),
+                "peak": ("FLOAT", {"default": 0.99, "min": 0.01, "max": 1.0, "step": 0.01}),
+            }
+        }
+
+    RETURN_TYPES = ("AUDIO", "INT", "FLOAT")
+    RETURN_NAMES = ("audio", "sample_rate", "duration")
+    FUNCTION = "load_audio"
+    CATEGORY = "video/download"
+
+    def load_audio(self, audio_path, sample_rate, channels, start_time, end_time, normalize, peak):
+        import torch
+
+        ytdpl.deps.ensure_requirements()
+        if not audio_path or not Path(audio_path).is_file():
+            raise Exception(f"❌ No existe el archivo de audio: {audio_path}")
+        if end_time and end_time <= start_time:
+            raise Exception("❌ end_time debe ser mayor que start_time.")
+
+        # El archivo no se desaloja de output/ytdpl mientras se decodifica
+        with ytdpl.storage.pin(audio_path):
+            waveform, rate = ytdpl.audio.load_waveform(
+                audio_path, sample_rate=sample_rate, channels=ytdpl.audio.CHANNEL_MODES[channels],
+                start_time=start_time, end_time=end_time, normalize=normalize, peak=peak)
+        duration = waveform.shape[1] / rate
+        print(f"🔊 [AUDIO] {waveform.shape[0]} canal(es) a {rate} Hz, {duration:.2f}s de {Path(audio_path).name}")
+        return ({"waveform": torch.from_numpy(waveform).unsqueeze(0), "sample_rate": rate}, rate, duration)
+
+class YTDLPKeyframes:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "video_path": ("STRING", {"forceInput": True}),
+                # keyframes: sólo I-frames (ffmpeg); scenes: cortes detectados sobre un proxy reducido
+                "mode": (list(ytdpl.keyframes.MODES), {"default": "keyframes"}),
+                "max_frames": ("INT", {"default": 32, "min": 0, "max": 10000}),
+                "min_interval": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 3600.0, "step": 0.1}),
+                "scene_threshold": ("FLOAT", {"default": 0.1, "min": 0.01, "max": 1.0, "step": 0.01}),
+                "analysis_fps": ("FLOAT", {"default": 4.0, "min": 0.5, "max": 60.0, "step": 0.5}),
+                "width": ("INT", {"default": 0, "min": 0, "max": 8192}),
+                "height": ("INT", {"default": 0, "min": 0, "max": 8192}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "INT")
+    RETURN_NAMES = ("frames", "timestamps", "count")
+    FUNCTION = "extract"
+    CATEGORY = "video/download"
+
+    def extract(self, video_path, mode, max_frames, min_interval, scene_threshold, analysis_fps, width, height):
+        import json
+        import torch
+
+        ytdpl.deps.ensure_requirements()
+        if not video_path or not Path(video_path).is_file():
+            raise Exception(f"❌ No existe el vídeo: {video_path}")
+
+        # El vídeo no se desaloja de output/ytdpl mientras se decodifica
+        with ytdpl.storage.pin(video_path):
+            frames, timestamps, cached = ytdpl.keyframes.extract(
+                video_path, mode=mode, max_frames=max_frames, min_interval=min_interval, threshold=scene_threshold,
+                width=width, height=height, analysis_fps=analysis_fps)
+        print(f"🔑 [KEYFRAMES] {len(timestamps)} frames ({mode}) {frames.shape[2]}x{frames.shape[1]} "
+              f"de {Path(video_path).name}{' (caché)' if cached else ''}")
+        # float() crea un tensor nuevo: el array cacheado no se toca
+        return (torch.from_numpy(frames).float().div_(255.0), json.dumps(timestamps), len(timestamps))
+
+class YTDLPStreamOpen:
+    def __init__(self):
+        self.downloader = YTDLPVideoDownloader()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        cookie_files = YTDLPVideoDownloader.INPUT_TYPES()["required"]["cookies_file"]
+        return {
+            "required": {
+                "url": ("STRING", {"multiline": False, "default": ""}),
+                "cookies_file": cookie_files,
+                "kind": ([ytdpl.stream.VIDEO, ytdpl.stream.AUDIO], {"default": "video"}),
+                "quality": (["best", "1080p", "720p", "480p", "360p"], {"default": "720p"}),
+                # Duración de cada trozo y segundos en cola antes de devolver el primero
+                "chunk_seconds": ("FLOAT", {"default": 5.0, "min": 0.5, "max": 600.0, "step": 0.5}),
+                "start_after": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 3600.0, "step": 0.5}),
+                # Trozos decodificados en memoria como mucho: el resto espera en la red
+                "max_buffered_chunks": ("INT", {"default": 4, "min": 1, "max": 64}),
+                "fps": ("FLOAT", {"default": 1.0, "min": 0.1, "max": 60.0, "step": 0.1}),
+                "width": ("INT", {"default": 0, "min": 0, "max": 8192}),
+                "height": ("INT", {"default": 0, "min": 0, "max": 8192}),
+                "sample_rate": ("INT", {"default": 44100, "min": 8000, "max": 192000}),
+                "channels": (["stereo", "mono"], {"default": "stereo"}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("stream_id",)
+    FUNCTION = "open_stream"
+    CATEGORY = "video/download"
+
+    def open_stream(self, url, cookies_file, kind, quality, chunk_seconds, start_after, max_buffered_chunks,
+                    fps, width, height, sample_rate, channels):
+        ytdpl.deps.ensure_requirements()
+        if not url.strip():
+            raise Exception("❌ La URL está vacía.")
+        url = ytdpl.canonical.request_url(url)
+        channel_count = ytdpl.audio.CHANNEL_MODES[channels]
+        rate = fps if kind == ytdpl.stream.VIDEO else sample_rate
+        stream_id = ytdpl.flight.flight_key(url, kind, quality, chunk_seconds, max_buffered_chunks,
+                                            fps, width, height, sample_rate, channel_count)
+
+        def factory():
+            cookie_path = self.downloader._resolve_cookies(url, "", cookies_file)
+            return ytdpl.stream.MediaStream(
+                ytdpl.stream.source_command(url, kind, quality, cookie_path),
+                ytdpl.stream.decode_command(kind, fps, width, height, sample_rate, channel_count),
+                kind=kind, chunk_seconds=chunk_seconds, rate=rate, channels=channel_count,
+                max_chunks=max_buffered_chunks)
+
+        stream, created = ytdpl.stream.open_stream(stream_id, factory)
+        print(f"📡 [STREAM] {'Abierto' if created else 'Reutilizando'} ({kind}, trozos de {stream.chunk_seconds:.1f}s): {url}")
+        if start_after > 0:
+            buffered = stream.wait_for(start_after)
+            print(f"📡 [STREAM] {buffered:.1f}s en cola tras {time.monotonic() - stream.started:.1f}s")
+        return (stream_id,)
+
+class YTDLPStreamChunk:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "stream_id": ("STRING", {"forceInput": True}),
+                "timeout": ("FLOAT", {"default": 600.0, "min": 1.0, "max": 86400.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "AUDIO", "FLOAT", "FLOAT", "BOOLEAN", "STRING")
+    RETURN_NAMES = ("frames", "audio", "start_time", "end_time", "finished", "stats")
+    FUNCTION = "next_chunk"
+    CATEGORY = "video/download"
+
+    @classmethod
+    def IS_CHANGED(cls, stream_id, timeout):
+        # Cada ejecución consume el siguiente trozo
+        return float("nan")
+
+    def next_chunk(self, stream_id, timeout):
+        import json
+        import torch
+
+        stream = ytdpl.stream.get_stream(stream_id)
+        if stream is None:
+            raise Exception("❌ El stream no está abierto. Vuelve a ejecutar el nodo YT-DLP Stream.")
+        chunk = stream.next_chunk(timeout)
+        if chunk is None:
+            ytdpl.stream.close_stream(stream_id)
+            raise Exception("🏁 [STREAM] El medio terminó: no quedan más trozos.")
+
+        frames = audio = None
+        if stream.kind == ytdpl.stream.VIDEO:
+            frames = torch.from_numpy(chunk.data).float().div_(255.0)
+        else:
+            audio = {"waveform": torch.from_numpy(chunk.data).unsqueeze(0), "sample_rate": int(stream.rate)}
+        stats = stream.stats()
+        print(f"⏩ [STREAM] Trozo {chunk.index} ({chunk.start:.1f}s -> {chunk.end:.1f}s), "
+              f"{stats['buffered_seconds']:.1f}s en cola")
+        return (frames, audio, chunk.start, chunk.end, stream.finished, json.dumps(stats))
+
+class YTDLPMetadata:
+    def __init__(self):
+        self.downloader = YTDLPVideoDownloader()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = YTDLPVideoDownloader.INPUT_TYPES()
+        return {
+            "required": {
+                "url": ("STRING", {"multiline": False, "default": ""}),
+                "cookies_file": base["required"]["cookies_file"],
+                # Patrones de idioma separados por comas, en orden de prioridad ("all" = todos)
+                "subtitle_langs": ("STRING", {"multiline": False, "default": "en.*,es.*"}),
+                "auto_captions": ("BOOLEAN", {"default": True}),
+                # Reutiliza el resultado mientras no caduque (0 = consultar siempre)
+                "cache_ttl_hours": ("FLOAT", {"default": 24.0, "min": 0.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("info", "title", "description", "thumbnail_url", "channel", "chapters", "transcript", "metadata")
+    FUNCTION = "fetch_metadata"
+    CATEGORY = "video/download"
+
+    @classmethod
+    def IS_CHANGED(cls, url, cookies_file, subtitle_langs, auto_captions, cache_ttl_hours):
+        import hashlib
+        state_string = f"{url}_{cookies_file}_{subtitle_langs}_{auto_captions}_{cache_ttl_hours}"
+        m = hashlib.sha256()
+        m.update(state_string.encode('utf-8'))
+        return m.digest().hex()
+
+    def fetch_metadata(self, url, cookies_file, subtitle_langs, auto_captions, cache_ttl_hours):
+        import json
+
+        ytdpl.deps.ensure_requirements()
+        url = url.strip()
+        if not url:
+            raise Exception("❌ La URL está vacía.")
+        langs = ytdpl.metadata.parse_langs(subtitle_langs)
+
+        cookie_path = self.downloader._resolve_cookies(url, "", cookies_file)
+        result, cached = ytdpl.metadata.lookup(self.downloader.output_dir, url, langs, auto_captions,
+                                               cache_ttl_hours, cookie_path)
+        status = "✅ Caché" if cached else "✅ Metadatos"
+
+        subtitles = result.get("subtitles") or {}
+        # El transcript sale del primer idioma seleccionado (orden de subtitle_langs)
+        first_lang = next(iter(subtitles), None)
+        text = ytdpl.metadata.transcript(subtitles[first_lang]["cues"]) if first_lang else ""
+        print(f"📝 [METADATOS] {result.get('title') or url} | {len(result.get('chapters') or [])} capítulos | "
+              f"subtítulos: {', '.join(subtitles) or 'ninguno'}")
+        return (f"{status}: {result.get('title') or url}", result.get("title") or "", result.get("description") or "",
+                result.get("thumbnail") or "", result.get("channel") or "",
+                json.dumps(result.get("chapters") or [], ensure_ascii=False), text,
+                json.dumps(result, ensure_ascii=False))
+
+class YTDLPThumbnail:
+    def __init__(self):
+        self.downloader = YTDLPVideoDownloader()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        base = YTDLPVideoDownloader.INPUT_TYPES()
+        return {
+            "required": {
+                "url": ("STRING", {"multiline": False, "default": ""}),
+                "cookies_file": base["required"]["cookies_file"],
+                # Se elige la miniatura más pequeña que cubre esta resolución (0 = la mayor)
+                "width": ("INT", {"default": 640, "min": 0, "max": 8192}),
+                "height": ("INT", {"default": 360, "min": 0, "max": 8192}),
+                "cache_ttl_hours": ("FLOAT", {"default": 24.0, "min": 0.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "INT", "INT")
+    RETURN_NAMES = ("thumbnail", "thumbnail_url", "width", "height")
+    FUNCTION = "load_thumbnail"
+    CATEGORY = "video/download"
+
+    def load_thumbnail(self, url, cookies_file, width, height, cache_ttl_hours):
+        import torch
+
+        ytdpl.deps.ensure_requirements()
+        url = url.strip()
+        if not url:
+            raise Exception("❌ La URL está vacía.")
+
+        cookie_path = self.downloader._resolve_cookies(url, "", cookies_file)
+        # Sólo metadatos (sin subtítulos): comparte la caché con el nodo de metadatos
+        result, _ = ytdpl.metadata.lookup(self.downloader.output_dir, url, ttl_hours=cache_ttl_hours,
+                                          cookie_path=cookie_path)
+        thumbnails = result.get("thumbnails") or ([{"url": result["thumbnail"]}] if result.get("thumbnail") else [])
+        chosen = ytdpl.thumbnails.select_thumbnail(thumbnails, width, height)
+        if chosen is None:
+            raise Exception(f"❌ El vídeo no tiene miniatura: {url}")
+
+        image, source = ytdpl.thumbnails.load_image(result.get("extractor_key"), result.get("id") or url,
+                                                    chosen["url"], self.downloader.output_dir)
+        print(f"🖼️ [MINIATURA] {image.shape[1]}x{image.shape[0]} ({source}) -> {chosen['url']}")
+        # Copia: el array cacheado se comparte entre ejecuciones
+        return (torch.from_numpy(image.copy()).unsqueeze(0), chosen["url"], image.shape[1], image.shape[0])
+
+NODE_CLASS_MAPPINGS = {
+    "YTDLPVideoDownloader": YTDLPVideoDownloader,
+    "YTDLPBatchDownloader": YTDLPBatchDownloader,
+    "YTDLPPrefetch": YTDLPPrefetch,
+    "YTDLPVideoFrames": YTDLPVideoFrames,
+    "YTDLPAudioWaveform": YTDLPAudioWaveform,
+    "YTDLPKeyframes": YTDLPKeyframes,
+    "YTDLPStreamOpen": YTDLPStreamOpen,
+    "YTDLPStreamChunk": YTDLPStreamChunk,
+    "YTDLPMetadata": YTDLPMetadata,
+    "YTDLPThumbnail": YTDLPThumbnail,
+}
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "YTDLPVideoDownloader": "YT-DLP Downloader (Auto-Quality) 📥",
+    "YTDLPBatchDownloader": "YT-DLP Batch / Playlist Downloader 📦",
+    "YTDLPPrefetch": "YT-DLP Prefetch (segundo plano) ⏭️",
+    "YTDLPVideoFrames": "YT-DLP Video to Frames 🎞️",
+    "YTDLPAudioWaveform": "YT-DLP Audio to Waveform 🔊",
+    "YTDLPKeyframes": "YT-DLP Keyframes / Escenas 🔑",
+    "YTDLPStreamOpen": "YT-DLP Stream (procesar mientras descarga) 📡",
+    "YTDLPStreamChunk": "YT-DLP Stream Chunk ⏩",
+    "YTDLPMetadata": "YT-DLP Metadata / Subtitles (sin descarga) 📝",
+    "YTDLPThumbnail": "YT-DLP Thumbnail to Image 🖼️",
+}
+
+
+def _register_routes():
+    """`POST /ytdpl/prefetch` y `GET /ytdpl/jobs` en el servidor de ComfyUI (si existe)."""
+    try:
+        from server import PromptServer
+    except ImportError:
+        # Fuera de ComfyUI (tests, scripts): sin rutas
+        return
+    if getattr(PromptServer, "instance", None) is None:
+        return
+    routes = PromptServer.instance.routes
+    state = {}
+
+    def submit(body):
+        downloader = state.get("downloader")
+        if downloader is None:
+            downloader = state["downloader"] = YTDLPVideoDownloader()
+        urls = body.get("urls") or [body.get("url", "")]
+        if isinstance(urls, str):
+            urls = ytdpl.batch.parse_url_list(urls)
+        options = {k: v for k, v in body.items() if k not in ("url", "urls")}
+        options.setdefault("cookies_text", "")
+        options.setdefault("cookies_file", "Auto")
+        options.setdefault("browser_source", "Ninguno")
+        options.setdefault("quality", "best")
+        options.setdefault("format", "mp4")
+        return [downloader.prefetch(url, **options)[0].summary() for url in urls if url.strip()]
+
+    @routes.post("/ytdpl/prefetch")
+    async def prefetch_route(request):
+        import asyncio
+        from aiohttp import web
+        try:
+            body = await request.json()
+            # Resolver la identidad puede recorrer extractores: fuera del bucle de eventos
+            jobs = await asyncio.get_running_loop().run_in_executor(None, submit, body)
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"jobs": jobs})
+
+    @routes.get("/ytdpl/jobs")
+    async def jobs_route(request):
+        from aiohttp import web
+        return web.json_response({"jobs": ytdpl.jobs.get_service().jobs()})
 
-            except Exception as e:
-                error_msg = str(e).lower()
-                if "yt_dlp_error:" in error_msg:
-                    # Check for blocking keywords
-                    if any(x in error_msg for x in ["captcha", "403", "forbidden", "verify", "sign in", "js challenge", "private"]):
-                        if attempt == 0:
-                            print("🛑 Bloqueo detectado. Lanzando Auto-Cookie...")
-                            success = get_cookies_interactively(url, auto_cookie_path)
-                            if success:
-                                cookie_path_to_use = str(auto_cookie_path)
-                                continue
-                            else:
-                                raise Exception("🛑 YouTube/TikTok bloqueó la descarga (Requiere Sesión/Captcha) y la interfaz gráfica falló. Pega tu texto de cookies actualizado en el nodo de forma manual.")
-                        else:
-                            raise Exception(f"🛑 Error final de descarga:\n{error_msg[-200:]}")
-                    else:
-                        raise Exception(f"🛑 Error en yt-dlp:\n{error_msg[-200:]}")
-                else:
-                    raise e
 
-NODE_CLASS_MAPPINGS = {"YTDLPVideoDownloader": YTDLPVideoDownloader}
-NODE_DISPLAY_NAME_MAPPINGS = {"YTDLPVideoDownloader": "YT-DLP Downloader (Auto-Quality) 📥"}
+_register_routes()
@@ -0,0 +1,71 @@
+"""Benchmark offline de descarga por fragmentos (HLS / DASH).
+
+Levanta `FakeMediaServer` y descarga el mismo manifiesto con distintos valores
+de `--concurrent-fragments` usando la API de yt-dlp, imprimiendo el tiempo y el
+throughput efectivo de cada configuración.
+
+    python benchmarks/bench_fragments.py --latency 0.03 --fragments 1 4 8 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.fake_media_server import FakeMediaServer
+from ytdpl import transfer
+
+SOURCES = {
+    "hls": "/hls/bench/index.m3u8",
+    "dash": "/dash/bench-video/manifest.mpd",
+}
+
+
+def run_once(url, fragments, out_dir):
+    import yt_dlp
+
+    args = transfer.build_args({"concurrent_fragments": fragments, "buffer_size": "1M"})
+    opts = yt_dlp.parse_options([*args, "-P", out_dir, "-o", f"f{fragments}.%(ext)s", "--no-part"]).ydl_opts
+    opts.update({"quiet": True, "noprogress": True, "no_warnings": True})
+
+    start = time.perf_counter()
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+    elapsed = time.perf_counter() - start
+
+    path = info["requested_downloads"][-1]["filepath"]
+    size = os.path.getsize(path)
+    os.remove(path)
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=sorted(SOURCES), nargs="+", default=sorted(SOURCES))
+    parser.add_argument("--fragments", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.03, help="segundos de latencia por petición")
+    parser.add_argument("--segments", type=int, default=60)
+    parser.add_argument("--segment-size", type=int, default=256 * 1024)
+    parser.add_argument("--json", dest="json_path", help="guardar los resultados en este archivo")
+    opts = parser.parse_args()
+
+    results = []
+    with FakeMediaServer(latency=opts.latency, segments=opts.segments, segment_size=opts.segment_size) as server, \
+            tempfile.TemporaryDirectory() as out_dir:
+        for source in opts.source:
+            for fragments in opts.fragments:
+                elapsed, size = run_once(server.url(SOURCES[source]), fragments, out_dir)
+                mbps = size / elapsed / 1e6
+                results.append({"source": source, "fragments": fragments, "seconds": elapsed, "bytes": size, "mb_per_s": mbps})
+                print(f"{source:5} fragments={fragments:<3} {elapsed:7.2f} s  {mbps:8.1f} MB/s")
+
+    if opts.json_path:
+        with open(opts.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
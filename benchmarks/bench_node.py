@@ -0,0 +1,287 @@
+"""Benchmark offline del nodo completo contra un sitio de medios sintético.
+
+Levanta `FakeMediaServer` y ejecuta `YTDLPVideoDownloader.download_video` de
+principio a fin (extractor genérico de yt-dlp, cookies, caché, índice, probe,
+métricas) sobre cuatro escenarios: MP4 progresivo, DASH con vídeo+audio
+separados, HLS con muchos fragmentos y un archivo grande. Cada combinación
+escenario/motor corre en un intérprete nuevo para que la primera ejecución
+sea realmente en frío.
+
+Por combinación informa: latencia en frío, mediana en caliente, repetición
+con `use_cache` (acierto de caché cuando el extractor reconoce la URL sin red;
+con el extractor genérico mide el atajo de yt-dlp para archivos ya presentes), MB/s, pico de RSS (proceso y subprocesos), procesos lanzados por
+ejecución y el desglose por etapa que registra `ytdpl.metrics`. Los
+resultados se guardan en `benchmarks/results/` para poder comparar:
+
+    python benchmarks/bench_node.py --runs 3
+    python benchmarks/bench_node.py --compare benchmarks/results/20260101-120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MB = 1024 * 1024
+
+
+def scenario_paths(opts):
+    return {
+        "progressive": f"/progressive/clip-{opts.progressive_mb * MB}.mp4",
+        "dash": "/dash/bench/manifest.mpd",
+        "hls": "/hls/bench/index.m3u8",
+        "large": f"/progressive/large-{opts.large_mb * MB}.mp4",
+    }
+
+
+# --- Proceso trabajador: una combinación escenario/motor en un intérprete limpio ---
+
+def _load_node():
+    """Carga el paquete del nodo igual que ComfyUI (por ruta)."""
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        "ComfyUI_Ytdpl", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _isolate(module, state_dir):
+    """Igual que tests/node_isolation.py: sin verificación de dependencias (que puede lanzar
+    pip y sella `.ytdpl_deps.json`) y con el estado del actualizador en `state_dir`, para que
+    el benchmark no toque el paquete instalado ni sus versiones fijadas."""
+    from pathlib import Path
+
+    ytdpl = module.ytdpl
+    ytdpl.deps.ensure_requirements = lambda: None
+    manager = ytdpl.updater.UpdateManager(Path(state_dir) / "update.json", Path(state_dir) / "wheels")
+    ytdpl.updater.get_updater = lambda: manager
+
+
+def _clear_outputs(out_dir):
+    """Borra los archivos descargados (no las carpetas internas `_cache`, `_index`...)."""
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def run_worker(opts):
+    import resource
+    from pathlib import Path
+
+    # Cada proceso lanzado (yt-dlp, ffprobe, pip...) pasa por este evento de auditoría
+    spawns = {"count": 0}
+
+    def audit(event, args):
+        if event == "subprocess.Popen":
+            spawns["count"] += 1
+
+    sys.addaudithook(audit)
+
+    t0 = time.perf_counter()
+    module = _load_node()
+    import_seconds = time.perf_counter() - t0
+
+    state_dir = tempfile.mkdtemp(prefix="ytdpl-bench-state-")
+    _isolate(module, state_dir)
+
+    out_dir = tempfile.mkdtemp(prefix="ytdpl-bench-")
+    node = module.YTDLPVideoDownloader.__new__(module.YTDLPVideoDownloader)
+    node.output_dir = Path(out_dir)
+    node.cookies_dir = Path(out_dir)
+
+    def download(use_cache):
+        before = spawns["count"]
+        start = time.perf_counter()
+        result = node.download_video(opts.url, "", "Ninguno", "Ninguno", False, opts.quality, opts.format,
+                                     engine=opts.engine[0], use_cache=use_cache)
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": elapsed,
+            "bytes": os.path.getsize(result[0]),
+            "spawns": spawns["count"] - before,
+            "status": result[1],
+        }
+
+    runs = []
+    for i in range(opts.runs):
+        # La última ejecución registra la caché y deja el archivo para medir la repetición
+        runs.append(download(use_cache=(i == opts.runs - 1)))
+        if i < opts.runs - 1:
+            _clear_outputs(out_dir)
+    repeat = download(use_cache=True)
+
+    stages = {}
+    metrics_file = os.path.join(out_dir, "_metrics", "downloads.jsonl")
+    if os.path.exists(metrics_file):
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        # Desglose de las ejecuciones en caliente (sin la primera ni la repetición)
+        warm_entries = entries[1:opts.runs] or entries[:1]
+        for entry in warm_entries:
+            for stage, seconds in entry["stages"].items():
+                stages.setdefault(stage, []).append(seconds)
+    _clear_outputs(out_dir)
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    report = {
+        "import_seconds": import_seconds,
+        "runs": runs,
+        "repeat": repeat,
+        "stages": {k: statistics.median(v) for k, v in stages.items()},
+        # ru_maxrss está en KiB en Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+    with open(opts.result, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+# --- Proceso principal ---
+
+def summarize(scenario, engine, report):
+    runs = report["runs"]
+    cold = runs[0]
+    warm = runs[1:] or runs
+    warm_seconds = statistics.median(r["seconds"] for r in warm)
+    size = statistics.median(r["bytes"] for r in warm)
+    return {
+        "scenario": scenario,
+        "engine": engine,
+        "cold_seconds": cold["seconds"],
+        "warm_seconds": warm_seconds,
+        "repeat_seconds": report["repeat"]["seconds"],
+        "bytes": size,
+        "mb_per_s": size / warm_seconds / 1e6 if warm_seconds else 0.0,
+        "peak_rss_mb": report["peak_rss_mb"],
+        "peak_child_rss_mb": report["peak_child_rss_mb"],
+        "spawns_cold": cold["spawns"],
+        "spawns_warm": statistics.median(r["spawns"] for r in warm),
+        "spawns_repeat": report["repeat"]["spawns"],
+        "import_seconds": report["import_seconds"],
+        "stages": report["stages"],
+    }
+
+
+def environment():
+    def git_rev():
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                  capture_output=True, text=True, timeout=10).stdout.strip() or None
+        except OSError:
+            return None
+
+    try:
+        from importlib.metadata import version
+        yt_dlp_version = version("yt-dlp")
+    except Exception:
+        yt_dlp_version = None
+    return {
+        "git": git_rev(),
+        "yt_dlp": yt_dlp_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def print_table(results, baseline=None):
+    base = {(r["scenario"], r["engine"]): r for r in (baseline or [])}
+    header = f"{'escenario':12} {'motor':10} {'frío s':>8} {'caliente s':>10} {'repetir ms':>10} {'MB/s':>8} {'RSS MB':>7} {'hijos MB':>8} {'procesos':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['scenario']:12} {r['engine']:10} {r['cold_seconds']:8.2f} {r['warm_seconds']:10.2f} "
+                f"{r['repeat_seconds'] * 1000:10.1f} {r['mb_per_s']:8.1f} {r['peak_rss_mb']:7.0f} "
+                f"{r['peak_child_rss_mb']:8.0f} {r['spawns_cold']:>3}/{r['spawns_warm']:g}/{r['spawns_repeat']}")
+        old = base.get((r["scenario"], r["engine"]))
+        if old and old["warm_seconds"]:
+            delta = (r["warm_seconds"] - old["warm_seconds"]) / old["warm_seconds"] * 100
+            line += f"   Δ caliente {delta:+.1f}%"
+        print(line)
+    print("\nprocesos = frío/caliente/repetición por ejecución; hijos MB = pico del mayor subproceso")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=["progressive", "dash", "hls", "large"],
+                        default=["progressive", "dash", "hls", "large"])
+    parser.add_argument("--engine", nargs="+", choices=["api", "subprocess"], default=["api", "subprocess"])
+    parser.add_argument("--runs", type=int, default=3, help="ejecuciones por combinación (la primera es en frío)")
+    parser.add_argument("--latency", type=float, default=0.01, help="segundos de latencia por petición")
+    parser.add_argument("--segments", type=int, default=200, help="fragmentos de HLS/DASH")
+    parser.add_argument("--segment-size", type=int, default=128 * 1024)
+    parser.add_argument("--progressive-mb", type=int, default=32)
+    parser.add_argument("--large-mb", type=int, default=512)
+    parser.add_argument("--quality", default="best")
+    parser.add_argument("--format", default="mp4")
+    parser.add_argument("--json", dest="json_path", help="ruta del resultado (por defecto benchmarks/results/<fecha>.json)")
+    parser.add_argument("--compare", help="resultado anterior con el que comparar")
+    parser.add_argument("--verbose", action="store_true", help="mostrar el registro del nodo")
+    # Modo interno: proceso trabajador
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+
+    if opts.worker:
+        run_worker(opts)
+        return
+
+    from benchmarks.fake_media_server import FakeMediaServer
+
+    results = []
+    paths = scenario_paths(opts)
+    with FakeMediaServer(latency=opts.latency, segments=opts.segments, segment_size=opts.segment_size) as server:
+        for scenario in opts.scenario:
+            for engine in opts.engine:
+                with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                    result_path = tmp.name
+                cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--url", server.url(paths[scenario]),
+                       "--engine", engine, "--runs", str(max(1, opts.runs)), "--quality", opts.quality,
+                       "--format", opts.format, "--result", result_path]
+                print(f"⏱️ {scenario} / {engine}...", flush=True)
+                res = subprocess.run(cmd, stdout=None if opts.verbose else subprocess.DEVNULL,
+                                     stderr=None if opts.verbose else subprocess.PIPE, text=True)
+                try:
+                    if res.returncode != 0:
+                        print(f"❌ {scenario} / {engine} falló:\n{(res.stderr or '')[-1500:]}")
+                        continue
+                    with open(result_path, "r", encoding="utf-8") as f:
+                        results.append(summarize(scenario, engine, json.load(f)))
+                finally:
+                    os.remove(result_path)
+
+    baseline = None
+    if opts.compare:
+        with open(opts.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print()
+    print_table(results, baseline)
+
+    json_path = opts.json_path
+    if not json_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        json_path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "options": {k: v for k, v in vars(opts).items()
+                                                             if k not in ("worker", "url", "result")},
+                   "results": results}, f, indent=2)
+    print(f"\n💾 Resultados guardados en {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Servidor HTTP local con medios sintéticos para medir descargas sin red.
+
+Sirve manifiestos HLS y DASH cuyos fragmentos son bytes aleatorios con una
+latencia por petición configurable, de modo que la concurrencia de fragmentos
+se note igual que contra un CDN real, y archivos progresivos de cualquier
+tamaño (con soporte de `Range`) que se generan al vuelo sin ocupar memoria.
+yt-dlp los procesa con su extractor genérico.
+
+    with FakeMediaServer(latency=0.03) as server:
+        url = server.url("/hls/clip/index.m3u8")
+        big = server.url(f"/progressive/big-{512 * 1024 * 1024}.mp4")
+"""
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SEGMENTS = 60
+DEFAULT_SEGMENT_SIZE = 256 * 1024
+SEGMENT_DURATION = 2.0
+# Bloque repetido para los archivos progresivos
+STREAM_BLOCK = 1 << 20
+
+
+class _Payloads:
+    """Bloques aleatorios reutilizados: generar bytes no debe dominar la medición."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def get(self, size):
+        with self._lock:
+            block = self._blocks.get(size)
+            if block is None:
+                block = self._blocks[size] = os.urandom(size)
+            return block
+
+
+def hls_playlist(segments, duration=SEGMENT_DURATION):
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{int(duration + 0.999)}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    for i in range(segments):
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"seg{i}.ts")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def dash_manifest(segments, duration=SEGMENT_DURATION, with_audio=True):
+    total = segments * duration
+    audio = ""
+    if with_audio:
+        audio = f"""
+    <AdaptationSet mimeType="audio/mp4" contentType="audio">
+      <SegmentTemplate timescale="1000" duration="{int(duration * 1000)}" initialization="audio/init.mp4" media="audio/seg$Number$.m4s" startNumber="0"/>
+      <Representation id="audio" codecs="mp4a.40.2" bandwidth="128000" audioSamplingRate="44100"/>
+    </AdaptationSet>"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT{total:.3f}S" minBufferTime="PT2S" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period id="0" start="PT0S">
+    <AdaptationSet mimeType="video/mp4" contentType="video">
+      <SegmentTemplate timescale="1000" duration="{int(duration * 1000)}" initialization="video/init.mp4" media="video/seg$Number$.m4s" startNumber="0"/>
+      <Representation id="video" codecs="avc1.640028" width="1280" height="720" frameRate="30" bandwidth="2000000"/>
+    </AdaptationSet>{audio}
+  </Period>
+</MPD>
+"""
+
+
+class FakeMediaServer:
+    """Servidor en un hilo propio; `requests` cuenta las peticiones atendidas."""
+
+    def __init__(self, latency=0.0, segments=DEFAULT_SEGMENTS, segment_size=DEFAULT_SEGMENT_SIZE, host="127.0.0.1"):
+        self.latency = latency
+        self.segments = segments
+        self.segment_size = segment_size
+        self.requests = 0
+        self._payloads = _Payloads()
+        self._count_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def url(self, path):
+        return f"http://{self._httpd.server_address[0]}:{self.port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-media-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def route(self, path):
+        """Devuelve `(content_type, body)` para `path` o `None` si no existe."""
+        if re.fullmatch(r"/hls/[\w-]+/index\.m3u8", path):
+            return "application/vnd.apple.mpegurl", hls_playlist(self.segments).encode("utf-8")
+        if re.fullmatch(r"/hls/[\w-]+/seg\d+\.ts", path):
+            return "video/mp2t", self._payloads.get(self.segment_size)
+        m = re.fullmatch(r"/dash/([\w-]+)/manifest\.mpd", path)
+        if m:
+            with_audio = not m.group(1).endswith("-video")
+            return "application/dash+xml", dash_manifest(self.segments, with_audio=with_audio).encode("utf-8")
+        if re.fullmatch(r"/dash/[\w-]+/(video|audio)/init\.mp4", path):
+            return "video/mp4", self._payloads.get(1024)
+        if re.fullmatch(r"/dash/[\w-]+/(video|audio)/seg\d+\.m4s", path):
+            return "video/iso.segment", self._payloads.get(self.segment_size)
+        m = re.fullmatch(r"/progressive/[\w]+-(\d+)\.mp4", path)
+        if m:
+            # Un entero: tamaño total de un cuerpo sintético que se genera por bloques
+            return "video/mp4", int(m.group(1))
+        return None
+
+    def _write_stream(self, wfile, start, end):
+        """Escribe los bytes `[start, end]` del archivo sintético sin materializarlo."""
+        block = self._payloads.get(STREAM_BLOCK)
+        pos = start
+        while pos <= end:
+            offset = pos % STREAM_BLOCK
+            chunk = block[offset:offset + min(STREAM_BLOCK - offset, end - pos + 1)]
+            wfile.write(chunk)
+            pos += len(chunk)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._count_lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                routed = server.route(self.path.split("?", 1)[0])
+                if routed is None:
+                    self.send_error(404)
+                    return
+                content_type, body = routed
+                if isinstance(body, int):
+                    self._send_stream(content_type, body)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, content_type, total):
+                start, end = 0, total - 1
+                m = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+                if m and (m.group(1) or m.group(2)):
+                    if m.group(1):
+                        start = int(m.group(1))
+                        end = min(int(m.group(2)), total - 1) if m.group(2) else total - 1
+                    else:
+                        start = max(0, total - int(m.group(2)))
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                try:
+                    server._write_stream(self.wfile, start, end)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El extractor genérico sólo lee las cabeceras y cierra la conexión
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
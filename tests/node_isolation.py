@@ -0,0 +1,28 @@
+"""Aislamiento común de los tests que ejecutan los nodos de descarga.
+
+El nodo verifica las dependencias en el primer uso (`ytdpl.deps`, que sella
+`.ytdpl_deps.json` junto al paquete y puede lanzar `pip install`) y, tras una
+descarga correcta, registra las versiones en el estado del actualizador
+(`.ytdpl_update.json`). En los tests ninguno de los dos debe tocar el
+repositorio ni la red.
+"""
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from ytdpl import deps, updater
+
+
+def isolate_node(testcase):
+    """Sustituye la verificación de dependencias y apunta el actualizador a un directorio temporal.
+
+    Todo se deshace en el cleanup de `testcase`. Devuelve el `UpdateManager` aislado.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tmp.cleanup)
+    manager = updater.UpdateManager(Path(tmp.name) / "update.json", Path(tmp.name) / "wheels")
+    for patcher in (patch.object(deps, "ensure_requirements"),
+                    patch.object(updater, "get_updater", return_value=manager)):
+        patcher.start()
+        testcase.addCleanup(patcher.stop)
+    return manager
@@ -0,0 +1,141 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import wave
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import audio
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def fake_probe(sample_rate=8000, channels=2, duration=1.0):
+    return {"duration": duration, "streams": [
+        {"index": 0, "type": "audio", "codec": "opus", "channels": channels, "sample_rate": str(sample_rate)}]}
+
+
+def fake_ffmpeg(samples, returncode=0):
+    """Proceso falso cuyo stdout emite `samples` (float32 intercalado)."""
+    proc = MagicMock()
+    proc.stdout = io.BytesIO(np.asarray(samples, dtype="<f4").tobytes())
+    proc.stderr = io.BytesIO(b"boom" if returncode else b"")
+    proc.returncode = returncode
+    proc.poll.return_value = returncode
+    return proc
+
+
+class TestDecodeCommand(unittest.TestCase):
+    def test_resample_and_downmix_in_the_same_pipe(self):
+        cmd = audio.decode_command("a.webm", sample_rate=16000, channels=1)
+        self.assertEqual(cmd[0], "ffmpeg")
+        self.assertEqual(cmd[cmd.index("-ar") + 1], "16000")
+        self.assertEqual(cmd[cmd.index("-ac") + 1], "1")
+        self.assertEqual(cmd[-3:], ["-acodec", "pcm_f32le", "pipe:1"])
+        self.assertNotIn("-t", cmd)
+
+    def test_end_time_stops_decoding(self):
+        cmd = audio.decode_command("a.webm", end_time=2.5)
+        self.assertEqual(cmd[cmd.index("-t") + 1], "2.500000")
+        self.assertNotIn("-ar", cmd)
+        self.assertNotIn("-ac", cmd)
+
+
+@unittest.skipIf(np is None, "numpy no instalado")
+class TestLoadWaveform(unittest.TestCase):
+    def test_interleaved_pcm_becomes_channels_by_samples(self):
+        interleaved = [0.1, -0.1, 0.2, -0.2, 0.3, -0.3]
+        with patch("ytdpl.probe.probe", return_value=fake_probe()), \
+             patch("ytdpl.audio.subprocess.Popen", return_value=fake_ffmpeg(interleaved)) as popen:
+            waveform, rate = audio.load_waveform("a.webm", sample_rate=8000, channels=2)
+        self.assertEqual(rate, 8000)
+        self.assertEqual(waveform.dtype, np.float32)
+        self.assertTrue(waveform.flags["C_CONTIGUOUS"])
+        np.testing.assert_allclose(waveform, [[0.1, 0.2, 0.3], [-0.1, -0.2, -0.3]], rtol=1e-6)
+        cmd = popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-ar") + 1], "8000")
+
+    def test_zero_keeps_source_layout(self):
+        with patch("ytdpl.probe.probe", return_value=fake_probe(sample_rate=22050, channels=1)), \
+             patch("ytdpl.audio.subprocess.Popen", return_value=fake_ffmpeg([0.5] * 4)) as popen:
+            waveform, rate = audio.load_waveform("a.m4a")
+        self.assertEqual(rate, 22050)
+        self.assertEqual(waveform.shape, (1, 4))
+        cmd = popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-ac") + 1], "1")
+
+    def test_buffer_grows_when_duration_is_underreported(self):
+        data = np.linspace(-1, 1, 8000 * 3, dtype=np.float32)
+        with patch("ytdpl.probe.probe", return_value=fake_probe(channels=1, duration=0.1)), \
+             patch("ytdpl.audio.subprocess.Popen", return_value=fake_ffmpeg(data)):
+            waveform, _ = audio.load_waveform("a.opus")
+        np.testing.assert_array_equal(waveform[0], data)
+
+    def test_start_trim_and_peak_normalisation(self):
+        data = np.arange(10, dtype=np.float32) / 20  # 10 muestras mono a 10 Hz
+        with patch("ytdpl.probe.probe", return_value=fake_probe(sample_rate=10, channels=1)), \
+             patch("ytdpl.audio.subprocess.Popen", return_value=fake_ffmpeg(data)):
+            waveform, _ = audio.load_waveform("a.opus", start_time=0.5, normalize=True, peak=0.9)
+        self.assertEqual(waveform.shape, (1, 5))
+        self.assertAlmostEqual(float(np.abs(waveform).max()), 0.9, places=6)
+        np.testing.assert_allclose(waveform[0], data[5:] * (0.9 / 0.45), rtol=1e-6)
+
+    def test_ffmpeg_failure_raises(self):
+        with patch("ytdpl.probe.probe", return_value=fake_probe()), \
+             patch("ytdpl.audio.subprocess.Popen", return_value=fake_ffmpeg([], returncode=1)):
+            with self.assertRaisesRegex(Exception, "boom"):
+                audio.load_waveform("a.webm")
+
+    def test_verbose_stderr_does_not_block_the_decode(self):
+        # Más avisos que el buffer de una tubería antes de escribir el audio
+        script = ("import sys; sys.stderr.buffer.write(b'aviso\\n' * 200000); sys.stderr.flush(); "
+                  "sys.stdout.buffer.write(b'\\x00' * 4 * 16000)")
+        result = []
+        with patch("ytdpl.probe.probe", return_value=fake_probe(channels=1)), \
+             patch("ytdpl.audio.decode_command", return_value=[sys.executable, "-c", script]):
+            worker = threading.Thread(target=lambda: result.append(audio.load_waveform("a.webm")), daemon=True)
+            worker.start()
+            worker.join(30)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(result[0][0].shape, (1, 16000))
+
+    def test_file_without_audio_raises(self):
+        silent = {"duration": 1.0, "streams": [{"index": 0, "type": "video", "codec": "h264"}]}
+        with patch("ytdpl.probe.probe", return_value=silent):
+            with self.assertRaisesRegex(Exception, "pista de audio"):
+                audio.load_waveform("v.mp4")
+
+    def test_normalize_peak_leaves_silence_untouched(self):
+        silence = np.zeros((2, 4), dtype=np.float32)
+        audio.normalize_peak(silence, 0.9)
+        self.assertFalse(silence.any())
+
+
+@unittest.skipUnless(np is not None and shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg/ffprobe no disponibles")
+class TestRealDecode(unittest.TestCase):
+    def test_wav_is_resampled_and_downmixed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "tone.wav"
+            tone = (np.sin(np.linspace(0, 2 * np.pi * 440, 48000)) * 16000).astype("<i2")
+            with wave.open(str(path), "wb") as w:
+                w.setnchannels(2)
+                w.setsampwidth(2)
+                w.setframerate(48000)
+                w.writeframes(np.repeat(tone, 2).tobytes())
+            waveform, rate = audio.load_waveform(path, sample_rate=16000, channels=1, end_time=0.5)
+        self.assertEqual(rate, 16000)
+        self.assertEqual(waveform.shape[0], 1)
+        self.assertAlmostEqual(waveform.shape[1], 8000, delta=64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import contextlib
 import unittest
 from unittest.mock import MagicMock, patch
 import sys
@@ -6,11 +7,9 @@ import os
 # Ensure the root directory is in sys.path so we can import __init__.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Mock subprocess to prevent import side effects
-mock_subprocess = MagicMock()
-sys.modules['subprocess'] = mock_subprocess
-
+# Importing the node has no side effects (dependency checks run on first use)
 import __init__ as comfy_node
+from tests.node_isolation import isolate_node
 
 # Mock initialization to avoid filesystem access
 def mock_init_downloader(self):
@@ -24,11 +23,21 @@ def mock_init_downloader(self):
 
 class TestBrowserSelection(unittest.TestCase):
     def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
         self.original_init = comfy_node.YTDLPVideoDownloader.__init__
         comfy_node.YTDLPVideoDownloader.__init__ = mock_init_downloader
+        # Sin métricas en disco: el directorio de salida es un mock
+        self.env_patcher = patch.dict(os.environ, {"YTDPL_METRICS": "0"})
+        self.env_patcher.start()
+        # Ni bloqueos entre procesos: no hay carpeta real donde crearlos
+        self.lock_patcher = patch.object(comfy_node.ytdpl.flight, "file_lock", lambda root, key: contextlib.nullcontext())
+        self.lock_patcher.start()
 
     def tearDown(self):
         comfy_node.YTDLPVideoDownloader.__init__ = self.original_init
+        self.env_patcher.stop()
+        self.lock_patcher.stop()
 
     @patch('__init__.subprocess.Popen')
     @patch('__init__.subprocess.run')
@@ -56,7 +65,8 @@ class TestBrowserSelection(unittest.TestCase):
                 browser_source="Chrome",
                 update_yt_dlp=False,
                 quality="best",
-                format="mp4"
+                format="mp4",
+                engine="subprocess"
             )
         except Exception:
             pass
@@ -102,7 +112,8 @@ class TestBrowserSelection(unittest.TestCase):
                 browser_source="Firefox",
                 update_yt_dlp=False,
                 quality="best",
-                format="mp4"
+                format="mp4",
+                engine="subprocess"
             )
         except Exception:
             pass
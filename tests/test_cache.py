@@ -0,0 +1,90 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import cache
+from tests.node_isolation import isolate_node
+
+
+class TestDownloadCache(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.video = self.root / "Video-abc.mp4"
+        self.video.write_bytes(b"\x00" * 4096)
+        self.store = cache.DownloadCache(self.root)
+        self.key = cache.cache_key("Youtube", "abc", "720p", "mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_keeps_metadata(self):
+        self.store.put([self.key], self.video, {"title": "Video", "uploader": "Canal", "formats": [1, 2]})
+        entry = self.store.get(self.key)
+        self.assertEqual(entry["path"], str(self.video))
+        self.assertEqual(entry["meta"]["title"], "Video")
+        self.assertNotIn("formats", entry["meta"])
+
+    def test_key_depends_on_format_and_container(self):
+        self.assertNotEqual(self.key, cache.cache_key("Youtube", "abc", "1080p", "mp4"))
+        self.assertNotEqual(self.key, cache.cache_key("Youtube", "abc", "720p", "mkv"))
+
+    def test_modified_file_is_rejected(self):
+        self.store.put([self.key], self.video, {})
+        self.video.write_bytes(b"\x01" * 4096)
+        self.assertIsNone(self.store.get(self.key))
+        self.assertFalse((self.root / cache.CACHE_DIRNAME / f"{self.key}.json").exists())
+
+    def test_missing_file_is_rejected(self):
+        self.store.put([self.key], self.video, {})
+        self.video.unlink()
+        self.assertIsNone(self.store.get(self.key))
+
+    def test_concurrent_puts_of_one_key_do_not_collide(self):
+        errors = []
+
+        def writer():
+            try:
+                for _ in range(50):
+                    self.store.put([self.key], self.video, {"title": "Video"})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.store.get(self.key)["meta"]["title"], "Video")
+
+    def test_node_hit_skips_yt_dlp(self):
+        self.store.put([self.key], self.video, {"title": "Video", "description": "d", "thumbnail": "t", "uploader": "Canal"})
+
+        downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        downloader.output_dir = self.root
+        downloader.cookies_dir = self.root
+
+        with patch.object(comfy_node.ytdpl.engine, "match_url", return_value=("Youtube", "abc")), \
+                patch.object(comfy_node.ytdpl.engine, "download") as mock_download, \
+                patch.object(comfy_node.ytdpl.probe, "probe", return_value={"duration": 1.0}), \
+                patch.object(comfy_node.subprocess, "run") as mock_run:
+            result = downloader.download_video(
+                "https://youtu.be/abc", "", "Ninguno", "Ninguno", False, "720p", "mp4")
+
+        self.assertEqual(result, (str(self.video), "✅ Caché: Video-abc.mp4", "Video", "d", "t", "Canal", '{"duration": 1.0}'))
+        mock_download.assert_not_called()
+        mock_run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
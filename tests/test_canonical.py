@@ -0,0 +1,156 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import canonical
+from tests.node_isolation import isolate_node
+
+
+class TestCanonicalize(unittest.TestCase):
+    def test_youtube_variants_share_one_identity(self):
+        variants = [
+            "https://youtu.be/dQw4w9WgXcQ?si=abcdef",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s&si=xyz",
+            "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+            "https://youtube.com/shorts/dQw4w9WgXcQ?feature=share",
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+            "youtube.com/live/dQw4w9WgXcQ",
+        ]
+        for url in variants:
+            with self.subTest(url=url):
+                self.assertEqual(canonical.canonicalize_with_identity(url),
+                                 ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", ("Youtube", "dQw4w9WgXcQ")))
+
+    def test_youtube_playlist_is_kept_and_left_to_yt_dlp(self):
+        url, identity = canonical.canonicalize_with_identity(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=2&pp=abc")
+        self.assertEqual(url, "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123")
+        self.assertIsNone(identity)
+
+    def test_tiktok_photo_and_tracking(self):
+        url, identity = canonical.canonicalize_with_identity(
+            "https://www.tiktok.com/@user.name/photo/7300000000000000001?is_from_webapp=1&sender_device=pc")
+        self.assertEqual(url, "https://www.tiktok.com/@user.name/video/7300000000000000001")
+        self.assertEqual(identity, ("TikTok", "7300000000000000001"))
+        self.assertEqual(canonical.canonicalize_with_identity("https://vm.tiktok.com/ZMabc/?_r=1"),
+                         ("https://vm.tiktok.com/ZMabc/", None))
+
+    def test_instagram_and_twitter(self):
+        self.assertEqual(canonical.canonicalize_with_identity("https://www.instagram.com/reels/C1x_y/?igsh=abc"),
+                         ("https://www.instagram.com/reel/C1x_y/", ("Instagram", "C1x_y")))
+        self.assertEqual(canonical.canonicalize("https://twitter.com/someone/status/123?s=20"),
+                         canonical.canonicalize("https://x.com/i/status/123"))
+
+    def test_generic_urls_only_lose_tracking(self):
+        url = canonical.canonicalize("https://Example.com:443/v/1?b=2&utm_source=x&a=1&fbclid=y#t=3")
+        self.assertEqual(url, "https://example.com/v/1?b=2&a=1")
+
+    def test_only_ruled_hosts_are_fetched_by_their_canonical_form(self):
+        generic = "https://example.com/watch?id=5&pp=2&_t=9&utm_source=x"
+        self.assertEqual(canonical.request_url(f"  {generic} "), generic)
+        self.assertEqual(canonical.canonicalize(generic), "https://example.com/watch?id=5")
+        self.assertEqual(canonical.request_url("https://youtu.be/dQw4w9WgXcQ?si=abc"),
+                         "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        # Host con regla pero enlace no reconocido (Instagram sin /p/): también tal cual
+        self.assertEqual(canonical.request_url("https://www.instagram.com/stories/u/1/?igsh=a"),
+                         "https://www.instagram.com/stories/u/1/?igsh=a")
+
+    def test_custom_rules(self):
+        @canonical.rule("clips.example.org")
+        def _clips(parts, query):
+            return f"https://clips.example.org/{parts.path.strip('/')}", ("Clips", parts.path.strip("/"))
+
+        self.addCleanup(canonical._rules.pop, "clips.example.org")
+        self.assertEqual(canonical.canonicalize_with_identity("http://www.clips.example.org/42/?ref_src=tw"),
+                         ("https://clips.example.org/42", ("Clips", "42")))
+
+
+class TestAliasIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_short_links_are_recognised_after_the_first_resolution(self):
+        short = "https://vm.tiktok.com/ZMabc/"
+        with patch.object(canonical, "_match", return_value=("TikTokVM", "ZMabc")):
+            self.assertEqual(canonical.identify(short, self.root)[1], ("TikTokVM", "ZMabc"))
+            canonical.AliasIndex(self.root).record([short + "?_r=1", short], "TikTok", 7300000000000000001)
+            self.assertEqual(canonical.identify(short + "?_r=1", self.root),
+                             (short, ("TikTok", "7300000000000000001")))
+
+    def test_unchanged_entries_are_not_rewritten(self):
+        short = "https://vm.tiktok.com/ZMa/"
+        index = canonical.AliasIndex(self.root)
+        index.record([short], "TikTok", "a")
+        path = index._entry_path(short)
+        mtime = os.stat(path).st_mtime_ns
+        index.record([short], "TikTok", "a")
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        index.record([short], "TikTok", "b")
+        self.assertEqual(index.lookup(short)["id"], "b")
+
+    def test_unruled_urls_differing_only_in_tracking_names_stay_apart(self):
+        first, second = "https://media.example.org/watch?si=AAA111", "https://media.example.org/watch?si=BBB222"
+        canonical.AliasIndex(self.root).record([first, canonical.canonicalize(first)], "Generic", "video-AAA")
+        self.assertEqual(list(self.root.glob(f"{canonical.ALIASES_DIRNAME}/*.json")), [])
+        with patch.object(canonical, "_match", return_value=None):
+            self.assertEqual(canonical.identify(second, self.root), (second, None))
+
+
+class TestNodeUrls(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.video = self.root / "clip.mp4"
+        self.video.write_bytes(b"\x00" * 1024)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.output_dir = self.root
+        self.downloader.cookies_dir = self.root
+        for p in [patch.dict(os.environ, {"YTDPL_METRICS": "0"}),
+                  patch.object(comfy_node.ytdpl.engine, "match_url", return_value=None),
+                  patch.object(comfy_node.ytdpl.probe, "probe", return_value={"has_audio": True, "audio_codec": "aac"})]:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def fetched_url(self, url):
+        with patch.object(self.downloader, "_resolve_engine", return_value=True), \
+                patch.object(self.downloader, "_download_in_process",
+                             return_value=(self.video, {"title": "ok", "extractor_key": "Generic",
+                                                                 "id": "video-AAA"})) as mock_dl:
+            self.downloader._run_download(url, "", "Ninguno", "Ninguno", "best", "mp4", use_cache=False)
+        return mock_dl.call_args.args[1]
+
+    def test_unruled_hosts_are_downloaded_as_given(self):
+        url = "https://videos.example.net/play?v=1&pp=eAE&_t=abc"
+        self.assertEqual(self.fetched_url(url), url)
+
+    def test_unruled_urls_differing_only_in_si_get_separate_keys(self):
+        first, second = "https://media.example.org/watch?si=AAA111", "https://media.example.org/watch?si=BBB222"
+        self.assertNotEqual(self.downloader._job_keys(first, "best", "mp4", True, {}),
+                            self.downloader._job_keys(second, "best", "mp4", True, {}))
+        is_changed = [comfy_node.YTDLPVideoDownloader.IS_CHANGED(u, "", "Ninguno", "Ninguno", False, "best", "mp4")
+                      for u in (first, second)]
+        self.assertNotEqual(*is_changed)
+        # La descarga de la primera no deja un alias que la segunda pueda encontrar
+        self.fetched_url(first)
+        self.assertEqual(comfy_node.ytdpl.canonical.identify(second, self.root), (second, None))
+
+    def test_ruled_hosts_are_downloaded_by_their_canonical_form(self):
+        self.assertEqual(self.fetched_url("https://youtu.be/dQw4w9WgXcQ?si=abc"),
+                         "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+
+if __name__ == '__main__':
+    unittest.main()
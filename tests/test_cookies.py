@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import cookies
+
+FUTURE = int(time.time()) + 30 * 86400
+PAST = int(time.time()) - 86400
+
+
+def jar_text(*rows):
+    lines = ["# Netscape HTTP Cookie File"]
+    for domain, expires, name in rows:
+        lines.append(f"{domain}\tTRUE\t/\tTRUE\t{expires}\t{name}\tvalue")
+    return "\n".join(lines) + "\n"
+
+
+class TestParsing(unittest.TestCase):
+    def test_parse_jar_handles_httponly_and_comments(self):
+        text = jar_text((".youtube.com", FUTURE, "SID")) + "#HttpOnly_.tiktok.com\tTRUE\t/\tTRUE\t0\tsessionid\tx\nbad line\n"
+        parsed = cookies.parse_jar(text)
+        self.assertEqual([(c["domain"], c["name"]) for c in parsed], [("youtube.com", "SID"), ("tiktok.com", "sessionid")])
+
+    def test_summarize_keeps_latest_expiry_and_session_flag(self):
+        summary = cookies.summarize(cookies.parse_jar(jar_text(
+            (".youtube.com", PAST, "a"), (".youtube.com", FUTURE, "b"), (".tiktok.com", 0, "c"))))
+        self.assertEqual(summary["youtube.com"]["expires"], FUTURE)
+        self.assertEqual(summary["youtube.com"]["count"], 2)
+        self.assertTrue(summary["tiktok.com"]["session"])
+
+    def test_host_candidates(self):
+        self.assertEqual(cookies.host_candidates("https://www.youtube.com/watch?v=x"), ["youtube.com"])
+        self.assertEqual(cookies.host_candidates("https://youtu.be/x"), ["youtube.com"])
+        self.assertEqual(cookies.host_candidates("https://vm.tiktok.com/abc"), ["vm.tiktok.com", "tiktok.com"])
+
+
+class TestCookieStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.store = cookies.CookieStore(str(self.dir))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text, mtime=None):
+        path = self.dir / name
+        path.write_text(text, encoding="utf-8")
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_jars_are_parsed_once_until_they_change(self):
+        path = self.write("yt.txt", jar_text((".youtube.com", FUTURE, "SID")))
+        with patch("ytdpl.cookies.parse_jar", wraps=cookies.parse_jar) as parse:
+            self.store.refresh()
+            self.store.refresh()
+            self.assertEqual(parse.call_count, 1)
+            self.write("yt.txt", jar_text((".youtube.com", FUTURE, "SID"), (".youtube.com", FUTURE, "HSID")),
+                       mtime=path.stat().st_mtime + 10)
+            self.store.refresh()
+            self.assertEqual(parse.call_count, 2)
+
+    def test_names_follow_the_directory(self):
+        self.write("a.txt", jar_text())
+        self.assertEqual(self.store.names(), ["a.txt"])
+        self.write("b.txt", jar_text())
+        os.utime(self.dir, (time.time() + 5, time.time() + 5))
+        self.assertEqual(self.store.names(), ["a.txt", "b.txt"])
+
+    def test_check_rejects_expired_and_foreign_jars(self):
+        self.write("old.txt", jar_text((".youtube.com", PAST, "SID")))
+        self.write("tt.txt", jar_text((".tiktok.com", FUTURE, "sessionid")))
+        self.write("ok.txt", jar_text((".youtube.com", FUTURE, "SID")))
+        url = "https://www.youtube.com/watch?v=x"
+        self.assertIn("caducó", self.store.check("old.txt", url))
+        self.assertIn("youtube.com", self.store.check("tt.txt", url))
+        self.assertIsNone(self.store.check("ok.txt", url))
+        self.assertEqual(self.store.check("missing.txt", url), "no existe")
+
+    def test_select_picks_freshest_valid_jar_for_the_host(self):
+        now = time.time()
+        self.write("yt_old.txt", jar_text((".youtube.com", FUTURE, "SID")), mtime=now - 100)
+        self.write("yt_new.txt", jar_text((".youtube.com", FUTURE, "SID")), mtime=now - 10)
+        self.write("yt_expired.txt", jar_text((".youtube.com", PAST, "SID")), mtime=now)
+        self.write("tt.txt", jar_text((".tiktok.com", FUTURE, "sessionid")), mtime=now)
+        self.assertTrue(self.store.select("https://youtu.be/x").endswith("yt_new.txt"))
+        self.assertTrue(self.store.select("https://www.tiktok.com/@u/video/1").endswith("tt.txt"))
+        self.assertIsNone(self.store.select("https://vimeo.com/1"))
+
+    def test_pasted_cookies_are_written_only_when_they_change(self):
+        text = jar_text((".youtube.com", FUTURE, "SID"))
+        path, written = self.store.save_pasted(text)
+        self.assertTrue(written)
+        mtime = os.stat(path).st_mtime_ns
+        _, written = self.store.save_pasted(text.replace("\n", "\r\n"))
+        self.assertFalse(written)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        _, written = self.store.save_pasted(jar_text((".youtube.com", FUTURE, "HSID")))
+        self.assertTrue(written)
+
+
+class TestNodeCookies(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.cookies_dir = self.dir
+        (self.dir / "old.txt").write_text(jar_text((".youtube.com", PAST, "SID")), encoding="utf-8")
+        (self.dir / "tt.txt").write_text(jar_text((".tiktok.com", FUTURE, "sessionid")), encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expired_choice_is_rejected_before_yt_dlp(self):
+        self.assertIsNone(self.downloader._resolve_cookies("https://youtu.be/x", "", "old.txt"))
+
+    def test_wrong_domain_choice_falls_back_to_a_valid_jar(self):
+        (self.dir / "yt.txt").write_text(jar_text((".youtube.com", FUTURE, "SID")), encoding="utf-8")
+        self.assertEqual(self.downloader._resolve_cookies("https://youtu.be/x", "", "tt.txt"), str(self.dir / "yt.txt"))
+
+    def test_auto_and_none(self):
+        self.assertEqual(self.downloader._resolve_cookies("https://www.tiktok.com/@u/video/1", "", "Auto"),
+                         str(self.dir / "tt.txt"))
+        self.assertIsNone(self.downloader._resolve_cookies("https://www.tiktok.com/@u/video/1", "", "Ninguno"))
+
+    def test_pasted_cookies(self):
+        text = jar_text((".youtube.com", FUTURE, "SID"))
+        path = self.downloader._resolve_cookies("https://youtu.be/x", text, "Ninguno")
+        self.assertEqual(path, str(self.dir / cookies.PASTED_NAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
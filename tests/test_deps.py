@@ -0,0 +1,62 @@
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import deps
+
+
+class TestLazyDependencyCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch.object(deps, "STAMP_FILE", Path(self.tmp.name) / "stamp.json"),
+            patch.object(deps, "_verified", False),
+            patch.object(deps, "installed_versions", return_value={"yt-dlp": "2026.1.1"}),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_full_check_runs_once_per_stamp(self):
+        with patch.object(deps, "install_missing_requirements", return_value=[]) as mock_check:
+            deps.ensure_requirements()
+            deps.ensure_requirements()
+            self.assertEqual(mock_check.call_count, 1)
+
+            # Nuevo proceso con el mismo intérprete y versiones: el sello evita la verificación
+            deps._verified = False
+            deps.ensure_requirements()
+            self.assertEqual(mock_check.call_count, 1)
+
+    def test_version_change_invalidates_stamp(self):
+        with patch.object(deps, "install_missing_requirements", return_value=[]) as mock_check:
+            deps.ensure_requirements()
+            deps._verified = False
+            deps.installed_versions.return_value = {"yt-dlp": "2026.2.1"}
+            deps.ensure_requirements()
+            self.assertEqual(mock_check.call_count, 2)
+
+    def test_no_stamp_while_something_is_missing(self):
+        with patch.object(deps, "install_missing_requirements", return_value=["yt-dlp"]):
+            deps.ensure_requirements()
+        self.assertFalse(deps.STAMP_FILE.exists())
+
+    def test_deno_outside_path_is_passed_explicitly(self):
+        with patch.object(deps.shutil, "which", return_value=None), \
+                patch.object(deps, "DENO_DIR", Path(self.tmp.name)):
+            self.assertEqual(deps.js_runtime_args(), [])
+            (Path(self.tmp.name) / "deno").touch()
+            self.assertEqual(deps.js_runtime_args(), ["--js-runtimes", f"deno:{self.tmp.name}"])
+
+
+if __name__ == '__main__':
+    unittest.main()
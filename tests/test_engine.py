@@ -0,0 +1,116 @@
+import sys
+import os
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import engine
+
+
+class FakeDownloadError(Exception):
+    pass
+
+
+class FakeExtractorError(Exception):
+    pass
+
+
+def make_fake_yt_dlp(ydl):
+    """Construye un paquete yt_dlp falso cuyo YoutubeDL devuelve `ydl`."""
+    fake = types.ModuleType("yt_dlp")
+    fake.parse_options = MagicMock(return_value=MagicMock(ydl_opts={"format": "bestvideo+bestaudio/best"}))
+    ydl.__enter__ = MagicMock(return_value=ydl)
+    ydl.__exit__ = MagicMock(return_value=False)
+    ydl.sanitize_info.side_effect = lambda info: info
+    fake.YoutubeDL = MagicMock(return_value=ydl)
+    utils = types.ModuleType("yt_dlp.utils")
+    utils.DownloadError = FakeDownloadError
+    utils.ExtractorError = FakeExtractorError
+    fake.utils = utils
+    return {"yt_dlp": fake, "yt_dlp.utils": utils}
+
+
+class TestInProcessEngine(unittest.TestCase):
+    def test_single_extraction_returns_final_path_and_metadata(self):
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {"id": "abc", "title": "raw"}
+        ydl.process_ie_result.return_value = {
+            "id": "abc",
+            "title": "Video",
+            "uploader": "Canal",
+            "requested_downloads": [{"filepath": "/out/Video-abc.mp4"}],
+        }
+
+        with patch.dict(sys.modules, make_fake_yt_dlp(ydl)):
+            path, meta = engine.download(["-f", "best"], "https://example.com/v")
+
+        self.assertEqual(path, "/out/Video-abc.mp4")
+        self.assertEqual(meta["uploader"], "Canal")
+        ydl.extract_info.assert_called_once_with("https://example.com/v", download=False, process=False)
+        ydl.process_ie_result.assert_called_once()
+
+    def test_format_fallback_reuses_extraction(self):
+        ydl = MagicMock()
+        ydl.params = {}
+        ydl.extract_info.return_value = {"id": "abc", "formats": [{"format_id": "18"}]}
+        ydl.process_ie_result.side_effect = [
+            FakeDownloadError("ERROR: Requested format is not available"),
+            {"id": "abc", "requested_downloads": [{"filepath": "/out/a.mp4"}]},
+        ]
+
+        with patch.dict(sys.modules, make_fake_yt_dlp(ydl)):
+            path, _ = engine.download(["-f", "best[height<=720]"], "u", fallback_format="best")
+
+        self.assertEqual(path, "/out/a.mp4")
+        self.assertEqual(ydl.extract_info.call_count, 1)
+        self.assertEqual(ydl.process_ie_result.call_count, 2)
+        self.assertEqual(ydl.params["format"], "best")
+        ydl.build_format_selector.assert_called_once_with("best")
+
+    def test_failed_extraction_raises_yt_dlp_error(self):
+        ydl = MagicMock()
+
+        def extract(url, download, process):
+            ydl_opts = fake["yt_dlp"].YoutubeDL.call_args[0][0]
+            ydl_opts["logger"].error("ERROR: [youtube] abc: Private video. Sign in")
+            return None
+
+        ydl.extract_info.side_effect = extract
+        fake = make_fake_yt_dlp(ydl)
+        with patch.dict(sys.modules, fake):
+            with self.assertRaises(Exception) as ctx:
+                engine.download([], "u")
+
+        self.assertIn("YT_DLP_ERROR:", str(ctx.exception))
+        self.assertIn("Private video", str(ctx.exception))
+
+    def test_final_entry_picks_last_downloaded_playlist_item(self):
+        info = {
+            "_type": "playlist",
+            "entries": [
+                {"id": "1", "requested_downloads": [{"filepath": "/out/1.mp4"}]},
+                {"id": "2", "requested_downloads": [{"filepath": "/out/2.mp4"}]},
+                None,
+            ],
+        }
+        self.assertEqual(engine.final_entry(info)["id"], "2")
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_cli_args_translate_to_ydl_opts(self):
+        import yt_dlp
+        args = [
+            "-f", "best", "--restrict-filenames", "-P", "/tmp/out", "--no-overwrites",
+            "--yes-playlist", "--ignore-errors", "--remote-components", "ejs:github",
+            "--impersonate", "chrome", "--merge-output-format", "mp4",
+        ]
+        opts = yt_dlp.parse_options(args).ydl_opts
+        self.assertEqual(opts["format"], "best")
+        self.assertEqual(opts["paths"], {"home": "/tmp/out"})
+        self.assertTrue(opts["restrictfilenames"])
+        self.assertEqual(opts["merge_output_format"], "mp4")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import errors
+from tests.node_isolation import isolate_node
+
+
+class TestClassify(unittest.TestCase):
+    def test_categories(self):
+        cases = {
+            "ERROR: [youtube] abc: Sign in to confirm you're not a bot": errors.AUTH_REQUIRED,
+            "ERROR: unable to download video data: HTTP Error 403: Forbidden": errors.AUTH_REQUIRED,
+            "ERROR: [youtube] abc: Private video. Sign in if you've been granted access": errors.ACCESS_RESTRICTED,
+            "ERROR: [youtube] abc: Sign in to confirm your age. This video may be inappropriate for some users.":
+                errors.ACCESS_RESTRICTED,
+            "ERROR: [youtube] abc: Join this channel to get access to members-only content": errors.ACCESS_RESTRICTED,
+            "ERROR: [TikTok] 123: HTTP Error 429: Too Many Requests": errors.RATE_LIMITED,
+            "ERROR: [youtube] abc: The uploader has not made this video available in your country": errors.GEO_BLOCKED,
+            "ERROR: [youtube] abc: Video unavailable. This video has been removed by the uploader": errors.UNAVAILABLE,
+            "ERROR: [youtube] abc: Requested format is not available": errors.FORMAT_UNAVAILABLE,
+            "ERROR: unable to download video data: HTTP Error 503: Service Unavailable": errors.TRANSIENT,
+            "ERROR: [Errno 104] Connection reset by peer": errors.TRANSIENT,
+            "ERROR: something nobody expected": errors.UNKNOWN,
+        }
+        for text, category in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(errors.classify(Exception(f"YT_DLP_ERROR: {text}")), category)
+
+    def test_status_codes_inside_urls_or_ids_do_not_match(self):
+        text = ("YT_DLP_ERROR: [download] Destination: clip-4031.mp4\n"
+                "ERROR: [generic] https://cdn.example.com/v/403/429/abc: Unexpected end of data")
+        self.assertEqual(errors.classify(text), errors.UNKNOWN)
+
+    def test_only_error_lines_are_considered(self):
+        text = "YT_DLP_ERROR: [youtube] Sign in to confirm (warning ignored)\nERROR: Video unavailable"
+        self.assertEqual(errors.classify(text), errors.UNAVAILABLE)
+
+    def test_typed_errors_keep_their_category(self):
+        self.assertEqual(errors.classify(errors.DownloadFailed("x", errors.GEO_BLOCKED)), errors.GEO_BLOCKED)
+
+
+class TestBackoff(unittest.TestCase):
+    def test_exponential_with_full_jitter_and_cap(self):
+        policy = errors.POLICIES[errors.TRANSIENT]
+        self.assertEqual(errors.backoff_delay(errors.TRANSIENT, 0, rng=lambda: 1.0), policy.base_delay)
+        self.assertEqual(errors.backoff_delay(errors.TRANSIENT, 2, rng=lambda: 1.0), policy.base_delay * 4)
+        self.assertEqual(errors.backoff_delay(errors.TRANSIENT, 20, rng=lambda: 1.0), policy.max_delay)
+        self.assertEqual(errors.backoff_delay(errors.TRANSIENT, 2, rng=lambda: 0.5), policy.base_delay * 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.breaker = errors.CircuitBreaker(threshold=2, cooldown=60, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_blocks_and_fails_fast(self):
+        self.breaker.record_failure("tiktok.com", errors.RATE_LIMITED)
+        self.breaker.before("tiktok.com")
+        self.assertTrue(self.breaker.record_failure("tiktok.com", errors.AUTH_REQUIRED))
+        with self.assertRaises(errors.CircuitOpen) as ctx:
+            self.breaker.before("tiktok.com")
+        self.assertEqual(ctx.exception.category, errors.RATE_LIMITED)
+        # Otros hosts no se ven afectados
+        self.breaker.before("youtube.com")
+
+    def test_non_blocking_failures_do_not_open(self):
+        for _ in range(5):
+            self.assertFalse(self.breaker.record_failure("a.com", errors.TRANSIENT))
+        self.assertEqual(self.breaker.state("a.com"), "closed")
+
+    def test_per_video_restrictions_do_not_open(self):
+        private = errors.classify("YT_DLP_ERROR: ERROR: [youtube] abc: Private video. Sign in if you've been granted access")
+        for _ in range(3):
+            self.assertFalse(self.breaker.record_failure("youtube.com", private))
+        self.assertEqual(self.breaker.state("youtube.com"), "closed")
+        self.breaker.before("youtube.com")
+
+    def test_half_open_allows_a_single_probe(self):
+        self.breaker.record_failure("a.com", errors.RATE_LIMITED)
+        self.breaker.record_failure("a.com", errors.RATE_LIMITED)
+        self.now += 61
+        self.assertEqual(self.breaker.state("a.com"), "half_open")
+        self.breaker.before("a.com")
+        with self.assertRaises(errors.CircuitOpen):
+            self.breaker.before("a.com")
+        # La prueba vuelve a ser bloqueada: se reabre otro periodo completo
+        self.assertTrue(self.breaker.record_failure("a.com", errors.RATE_LIMITED))
+        self.assertEqual(self.breaker.state("a.com"), "open")
+        self.now += 61
+        self.breaker.before("a.com")
+        self.breaker.record_success("a.com")
+        self.assertEqual(self.breaker.state("a.com"), "closed")
+
+
+class TestNodeRetries(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.video = self.root / "clip.mp4"
+        self.video.write_bytes(b"\x00" * 1024)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.output_dir = self.root
+        self.downloader.cookies_dir = self.root
+        self.breaker = errors.CircuitBreaker(threshold=2, cooldown=300)
+        patchers = [
+            patch.dict(os.environ, {"YTDPL_METRICS": "0"}),
+            patch.object(comfy_node.ytdpl.errors, "get_breaker", return_value=self.breaker),
+            patch.object(comfy_node.ytdpl.engine, "match_url", return_value=None),
+            patch.object(comfy_node.ytdpl.probe, "probe", return_value={"has_audio": True, "audio_codec": "aac"}),
+            patch.object(comfy_node.time, "sleep"),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_node(self, side_effect):
+        with patch.object(self.downloader, "_download_in_process", side_effect=side_effect) as mock_dl, \
+             patch.object(self.downloader, "_resolve_engine", return_value=True):
+            try:
+                return self.downloader._run_download("https://www.tiktok.com/@u/video/1", "", "Ninguno",
+                                                     "Ninguno", "best", "mp4", use_cache=False), mock_dl
+            finally:
+                self.calls = mock_dl.call_count
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        outcomes = [Exception("YT_DLP_ERROR: ERROR: HTTP Error 502: Bad Gateway"),
+                    Exception("YT_DLP_ERROR: ERROR: Connection reset by peer"),
+                    (self.video, {"title": "ok"})]
+
+        def side_effect(*args, **kwargs):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        result, mock_dl = self.run_node(side_effect)
+        self.assertEqual(result[0], str(self.video))
+        self.assertEqual(mock_dl.call_count, 3)
+        self.assertEqual(comfy_node.time.sleep.call_count, 2)
+
+    def test_unavailable_is_fatal_without_retry(self):
+        with self.assertRaises(errors.DownloadFailed) as ctx:
+            self.run_node(Exception("YT_DLP_ERROR: ERROR: Video unavailable"))
+        self.assertEqual(ctx.exception.category, errors.UNAVAILABLE)
+        self.assertEqual(self.calls, 1)
+
+    def test_open_circuit_skips_the_extraction(self):
+        blocked = Exception("YT_DLP_ERROR: ERROR: HTTP Error 429: Too Many Requests")
+        with self.assertRaises(errors.DownloadFailed):
+            self.run_node(blocked)
+        # 1 intento + 1 reintento: el segundo bloqueo abre el circuito y el siguiente no llega a yt-dlp
+        self.assertEqual(self.calls, 2)
+        with self.assertRaises(errors.CircuitOpen):
+            self.run_node(blocked)
+        self.assertEqual(self.calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
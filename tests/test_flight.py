@@ -0,0 +1,183 @@
+import sys
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+import __init__ as comfy_node
+from ytdpl import flight
+from tests.node_isolation import isolate_node
+
+# Proceso externo que mantiene el bloqueo mientras no se cierre su stdin
+HOLDER = r"""
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from ytdpl import flight
+with flight.file_lock(Path(sys.argv[2]), sys.argv[3]):
+    print("locked", flush=True)
+    sys.stdin.read()
+"""
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ("/out/a.mp4",)
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.single_flight("k", work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.single_flight("k", work))) for _ in range(3)]
+        for t in followers:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result == ("/out/a.mp4",) for result, _ in results))
+        # Terminada la llamada, la clave queda libre para una nueva ejecución
+        self.assertEqual(flight.single_flight("k", lambda: "otra"), ("otra", False))
+
+    def test_error_is_shared_with_waiters(self):
+        started, release = threading.Event(), threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise Exception("🛑 Error en yt-dlp")
+
+        errors = []
+
+        def call():
+            try:
+                flight.single_flight("err", failing)
+            except Exception as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(errors, ["🛑 Error en yt-dlp"] * 2)
+
+
+@unittest.skipIf(flight.fcntl is None, "bloqueos POSIX no disponibles")
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_other_process_waits_until_release(self):
+        holder = subprocess.Popen([sys.executable, "-c", HOLDER, ROOT, str(self.root), "video"],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), "locked")
+            with self.assertRaises(Exception) as ctx:
+                with flight.file_lock(self.root, "video", timeout=0.2, poll=0.05):
+                    pass
+            self.assertIn("Tiempo de espera agotado", str(ctx.exception))
+
+            # Otra clave no se bloquea
+            with flight.file_lock(self.root, "otro", timeout=0.2, poll=0.05):
+                pass
+        finally:
+            holder.stdin.close()
+            holder.wait(10)
+
+        with flight.file_lock(self.root, "video", timeout=1, poll=0.05):
+            pass
+
+    def test_other_thread_waits_until_release(self):
+        # lockf no excluye hilos del mismo proceso: lo hace el candado local por clave
+        inside, release = threading.Event(), threading.Event()
+
+        def holder():
+            with flight.file_lock(self.root, "video"):
+                inside.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        try:
+            self.assertTrue(inside.wait(5))
+            with self.assertRaises(Exception) as ctx:
+                with flight.file_lock(self.root, "video", timeout=0.2, poll=0.05):
+                    pass
+            self.assertIn("Tiempo de espera agotado", str(ctx.exception))
+        finally:
+            release.set()
+            thread.join(5)
+
+        with flight.file_lock(self.root, "video", timeout=1, poll=0.05):
+            pass
+
+
+class TestNodeDeduplication(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+
+    def test_identical_requests_download_once(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        downloader.output_dir = Path(tmp.name)
+        downloader.cookies_dir = Path(tmp.name)
+
+        release = threading.Event()
+        calls = []
+
+        def fake_run(*args, **kwargs):
+            calls.append(1)
+            release.wait(5)
+            return ("/out/v.mp4", "✅ Éxito: v.mp4", "T", "", "", "", "{}")
+
+        results = []
+
+        def worker():
+            results.append(downloader.download_video(
+                "https://youtu.be/abc", "", "Ninguno", "Ninguno", False, "best", "mp4", "subprocess"))
+
+        with patch.object(comfy_node.ytdpl.engine, "match_url", return_value=("Youtube", "abc")), \
+                patch.object(downloader, "_run_download", side_effect=fake_run):
+            threads = [threading.Thread(target=worker) for _ in range(3)]
+            for t in threads:
+                t.start()
+            time.sleep(0.1)
+            release.set()
+            for t in threads:
+                t.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 3)
+        self.assertTrue((Path(tmp.name) / flight.LOCKS_DIRNAME).is_dir())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import engine, formats
+from tests.node_isolation import isolate_node
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def recorded(name):
+    """Lista de formatos grabada de una extracción real (campos relevantes, peor -> mejor)."""
+    with open(os.path.join(FIXTURES, f"formats_{name}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_ids(choice):
+    return "+".join(f["format_id"] for f in choice.formats)
+
+
+class TestCodecs(unittest.TestCase):
+    def test_codec_family(self):
+        self.assertEqual(formats.codec_family("avc1.640028"), "h264")
+        self.assertEqual(formats.codec_family("mp4a.40.2"), "aac")
+        self.assertEqual(formats.codec_family("vp09.00.40.08"), "vp9")
+        self.assertEqual(formats.codec_family("bytevc1"), "bytevc1")
+        self.assertIsNone(formats.codec_family("none"))
+
+    def test_rank_depends_on_the_container(self):
+        self.assertEqual(formats.video_rank("avc1.4d401f", "mp4"), formats.H264)
+        self.assertEqual(formats.video_rank("avc1.4d401f", "webm"), formats.TRANSCODE)
+        self.assertEqual(formats.video_rank("vp09.00.40.08", "mkv"), formats.COPYABLE)
+        self.assertEqual(formats.video_rank("bytevc1", "mkv"), formats.LAST_RESORT)
+
+
+class TestRecordedYoutube(unittest.TestCase):
+    def setUp(self):
+        self.formats = recorded("youtube")["formats"]
+
+    def test_quality_cap_picks_h264_with_native_audio(self):
+        expected = {"best": "137+140", "1080p": "137+140", "720p": "136+140", "480p": "135+140"}
+        for quality, ids in expected.items():
+            with self.subTest(quality=quality):
+                self.assertEqual(format_ids(formats.choose(self.formats, quality, "mp4")), ids)
+
+    def test_muxed_format_wins_when_it_is_as_good_and_cheaper(self):
+        choice = formats.choose(self.formats, "360p", "mp4")
+        self.assertEqual(format_ids(choice), "18")
+        self.assertIn("sin fusión", choice.reason)
+
+    def test_webm_never_gets_h264(self):
+        choice = formats.choose(self.formats, "1080p", "webm")
+        # av1 y vp9 se copian a webm: gana el más ligero de los 1080p
+        self.assertEqual(format_ids(choice), "399+251")
+
+    def test_reason_is_one_line(self):
+        reason = formats.choose(self.formats, "720p", "mp4").reason
+        self.assertNotIn("\n", reason)
+        self.assertIn("720p30 h264+aac", reason)
+        self.assertIn("6 por encima", reason)
+
+    def test_below_every_format_picks_the_smallest_above(self):
+        no_small = [f for f in self.formats if (f.get("height") or 0) > 700 or f.get("vcodec") == "none"]
+        self.assertEqual(format_ids(formats.choose(no_small, "480p", "mp4")), "136+140")
+
+    def test_audio_modes(self):
+        self.assertEqual(format_ids(formats.choose(self.formats, "best", "audio", is_audio=True)), "251")
+        self.assertEqual(format_ids(formats.choose(self.formats, "best", "m4a", is_audio=True)), "140")
+        self.assertIn("convierte a mp3", formats.choose(self.formats, "best", "mp3", is_audio=True).reason)
+
+
+class TestRecordedTiktok(unittest.TestCase):
+    def setUp(self):
+        self.formats = recorded("tiktok")["formats"]
+
+    def test_bytevc1_and_watermark_are_avoided(self):
+        self.assertEqual(format_ids(formats.choose(self.formats, "best", "mp4")), "h264_540p_1400-1")
+        # Con límite de altura, la copia más barata que lo cumple
+        self.assertEqual(format_ids(formats.choose(self.formats, "1080p", "mp4")), "h264_540p_900-0")
+
+    def test_bytevc1_is_a_last_resort(self):
+        only_hevc = [f for f in self.formats if f["vcodec"] == "bytevc1"]
+        choice = formats.choose(only_hevc, "best", "mp4")
+        self.assertEqual(format_ids(choice), "bytevc1_720p_1100-1")
+        self.assertIn("último recurso", choice.reason)
+
+
+class TestSelector(unittest.TestCase):
+    def test_merged_format_for_yt_dlp(self):
+        log = MagicMock()
+        select = formats.selector("720p", "mp4", log=log)
+        selected = list(select({"formats": recorded("youtube")["formats"]}))
+        self.assertEqual(len(selected), 1)
+        self.assertEqual(selected[0]["format_id"], "136+140")
+        self.assertEqual([f["format_id"] for f in selected[0]["requested_formats"]], ["136", "140"])
+        self.assertEqual(selected[0]["ext"], "mp4")
+        log.assert_called_once()
+
+    def test_nothing_downloadable_selects_nothing(self):
+        self.assertEqual(list(formats.selector("best", "mp4", log=MagicMock())({"formats": []})), [])
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_yt_dlp_accepts_the_selection(self):
+        import yt_dlp
+        data = recorded("youtube")
+        info = {
+            "id": "dQw4w9WgXcQ", "title": "t", "extractor": "youtube", "extractor_key": "Youtube",
+            "webpage_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "duration": data["duration"],
+            "formats": [dict(f, url=f"https://example.invalid/{f['format_id']}") for f in data["formats"]],
+        }
+        opts = {"format": formats.selector("720p", "mp4", log=MagicMock()), "merge_output_format": "mp4",
+                "quiet": True, "no_warnings": True, "logger": engine.YtdlpLogger()}
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            result = ydl.process_ie_result(info, download=False)
+        self.assertEqual(result["format_id"], "136+140")
+        self.assertEqual(result["ext"], "mp4")
+
+
+class TestNodeFormatArgs(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.video = self.root / "clip.mp4"
+        self.video.write_bytes(b"\x00" * 1024)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.output_dir = self.root
+        self.downloader.cookies_dir = self.root
+        for p in [patch.dict(os.environ, {"YTDPL_METRICS": "0"}),
+                  patch.object(comfy_node.ytdpl.engine, "match_url", return_value=None),
+                  patch.object(comfy_node.ytdpl.probe, "probe", return_value={"has_audio": True, "audio_codec": "aac"})]:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def build_args(self, use_api):
+        captured = {}
+
+        def fake_download(build_args, *args, **kwargs):
+            captured["in_process"] = build_args("720p", write_info_json=False)
+            return self.video, {"title": "ok"}
+
+        def fake_subprocess(build_cmd, *args, **kwargs):
+            captured["cli"] = build_cmd("720p")
+            return self.video, {"title": "ok"}
+
+        with patch.object(self.downloader, "_resolve_engine", return_value=use_api), \
+                patch.object(self.downloader, "_download_in_process", side_effect=fake_download), \
+                patch.object(self.downloader, "_download_with_subprocess", side_effect=fake_subprocess):
+            self.downloader._run_download("https://www.tiktok.com/@u/video/1", "", "Ninguno", "Ninguno",
+                                          "720p", "mp4", use_cache=False)
+        return captured.popitem()[1]
+
+    def test_api_mode_leaves_format_to_the_selector(self):
+        self.assertNotIn("-f", self.build_args(use_api=True))
+
+    def test_cli_mode_keeps_the_format_string(self):
+        args = self.build_args(use_api=False)
+        self.assertEqual(args[args.index("-f") + 1], self.downloader.get_format_string("720p", "mp4", False))
+
+
+if __name__ == '__main__':
+    unittest.main()
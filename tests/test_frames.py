@@ -0,0 +1,66 @@
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import frames
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+
+@unittest.skipIf(cv2 is None, "opencv/numpy no instalados")
+class TestFrameLoading(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.video = str(Path(cls.tmp.name) / "clip.avi")
+        # 30 frames a 10 fps; el valor de cada frame codifica su índice
+        writer = cv2.VideoWriter(cls.video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for i in range(30):
+            writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_full_decode_shape_and_range(self):
+        batch, timestamps, fps = frames.load_frames(self.video)
+        self.assertEqual(batch.shape, (30, 48, 64, 3))
+        self.assertEqual(batch.dtype, np.float32)
+        self.assertLessEqual(float(batch.max()), 1.0)
+        self.assertEqual(fps, 10.0)
+
+    def test_stride_max_frames_and_resize(self):
+        batch, timestamps, fps = frames.load_frames(self.video, stride=3, max_frames=4, width=32)
+        self.assertEqual(batch.shape, (4, 24, 32, 3))
+        self.assertEqual(timestamps, [0.0, 0.3, 0.6, 0.9])
+        self.assertAlmostEqual(fps, 10.0 / 3)
+
+    def test_time_range(self):
+        batch, timestamps, _ = frames.load_frames(self.video, start_time=1.0, end_time=2.0)
+        self.assertEqual(len(timestamps), 10)
+        self.assertAlmostEqual(timestamps[0], 1.0)
+        # El frame 10 tiene valor 80/255 (con pérdidas de MJPEG)
+        self.assertAlmostEqual(float(batch[0].mean()), 80 / 255, delta=0.03)
+
+    def test_expected_frames_preallocation(self):
+        self.assertEqual(frames.expected_frames(10.0, 30, stride=3), 10)
+        self.assertEqual(frames.expected_frames(10.0, 30, stride=1, max_frames=5), 5)
+        self.assertEqual(frames.expected_frames(10.0, 30, start_time=1.0, end_time=2.0), 10)
+
+    def test_target_size_keeps_aspect(self):
+        self.assertEqual(frames.target_size(1920, 1080, width=960), (960, 540))
+        self.assertEqual(frames.target_size(1920, 1080, height=360), (640, 360))
+        self.assertEqual(frames.target_size(1920, 1080), (1920, 1080))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import os
+import json
+import subprocess
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Presupuesto de importación del nodo en un intérprete limpio (arranque en frío de ComfyUI)
+IMPORT_BUDGET_SECONDS = 0.25
+
+# Módulos que sólo deben cargarse cuando un nodo se ejecuta
+LAZY_MODULES = ("yt_dlp", "playwright", "numpy", "cv2", "torch", "json", "hashlib")
+
+# Carga el paquete igual que ComfyUI: por ruta, con un nombre de módulo que no es importable
+PROBE = r"""
+import importlib.util, os, sys, time
+root = sys.argv[1]
+path_before = os.environ.get("PATH")
+before = set(sys.modules)
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(
+    "ComfyUI_Ytdpl", os.path.join(root, "__init__.py"), submodule_search_locations=[root])
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+loaded = sorted(set(sys.modules) - before)
+import json
+print(json.dumps({
+    "elapsed": elapsed,
+    "loaded": loaded,
+    "path_changed": os.environ.get("PATH") != path_before,
+    "nodes": sorted(module.NODE_CLASS_MAPPINGS),
+}))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        res = subprocess.run([sys.executable, "-c", PROBE, ROOT], capture_output=True, text=True, timeout=60)
+        if res.returncode != 0:
+            raise AssertionError(res.stderr)
+        cls.report = json.loads(res.stdout.strip().splitlines()[-1])
+
+    def test_import_within_budget(self):
+        self.assertLess(self.report["elapsed"], IMPORT_BUDGET_SECONDS)
+
+    def test_no_heavy_modules_at_import(self):
+        loaded = [m for m in self.report["loaded"] if m.split(".")[0] in LAZY_MODULES]
+        self.assertEqual(loaded, [])
+        # Los subsistemas de ytdpl tampoco se cargan hasta su primer uso
+        self.assertEqual([m for m in self.report["loaded"] if m.startswith("ComfyUI_Ytdpl.ytdpl.")], [])
+
+    def test_no_global_side_effects(self):
+        self.assertFalse(self.report["path_changed"])
+        self.assertIn("YTDLPVideoDownloader", self.report["nodes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
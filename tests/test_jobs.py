@@ -0,0 +1,204 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import jobs, progress
+from tests.node_isolation import isolate_node
+
+RESULT = ("/out/v.mp4", "✅ Éxito: v.mp4", "T", "", "", "", "{}")
+
+
+class TestDownloadService(unittest.TestCase):
+    def setUp(self):
+        self.service = jobs.DownloadService(max_workers=2, per_host_limit=1)
+
+    def test_duplicate_submissions_share_one_job(self):
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return RESULT
+
+        job, created = self.service.submit("k", "https://a.com/1", work)
+        again, created_again = self.service.submit("k", "https://a.com/1", work)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertIs(job, again)
+        release.set()
+        self.assertEqual(job.future.result(5), RESULT)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.service.jobs()[0]["path"], "/out/v.mp4")
+
+    def test_failed_jobs_can_be_resubmitted(self):
+        job, _ = self.service.submit("k", "https://a.com/1", lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            job.future.result(5)
+        self.assertEqual(job.state, jobs.FAILED)
+        retry, created = self.service.submit("k", "https://a.com/1", lambda: RESULT)
+        self.assertTrue(created)
+        self.assertEqual(retry.future.result(5), RESULT)
+
+    def test_claim_removes_the_job(self):
+        job, _ = self.service.submit("k", "https://a.com/1", lambda: RESULT)
+        job.future.result(5)
+        self.assertIs(self.service.claim("k"), job)
+        self.assertIsNone(self.service.claim("k"))
+
+    def test_per_host_limit_and_concurrency(self):
+        running, peak, lock = [], [], threading.Lock()
+
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            return RESULT
+
+        submitted = [self.service.submit(f"a{i}", "https://a.com/x", work)[0] for i in range(3)]
+        submitted.append(self.service.submit("b", "https://b.com/x", work)[0])
+        for job in submitted:
+            job.future.result(5)
+        # Dos workers, pero nunca dos contra el mismo host
+        self.assertLessEqual(max(peak), 2)
+
+    def test_running_jobs_report_progress_without_the_comfy_bar(self):
+        release = threading.Event()
+        created = []
+
+        def work():
+            tracker = progress.ProgressTracker(print_interval=3600)
+            created.append(tracker)
+            tracker.download_hook({"status": "downloading", "downloaded_bytes": 40, "total_bytes": 160})
+            release.wait(5)
+            return RESULT
+
+        with patch.object(progress, "_comfy_progress_bar") as make_bar:
+            job, _ = self.service.submit("k", "https://a.com/1", work)
+            for _ in range(100):
+                if created:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(self.service.jobs()[0]["progress"], 25.0)
+            release.set()
+            job.future.result(5)
+        make_bar.assert_not_called()
+
+    def test_finished_jobs_are_bounded(self):
+        service = jobs.DownloadService(max_workers=1, keep_finished=2)
+        for i in range(5):
+            service.submit(str(i), "https://a.com/x", lambda: RESULT)[0].future.result(5)
+        service.submit("last", "https://a.com/x", lambda: RESULT)[0].future.result(5)
+        self.assertLessEqual(len(service.jobs()), 3)
+
+
+def input_defaults(spec):
+    """Valores por defecto de INPUT_TYPES (como los envía el frontend de ComfyUI)."""
+    values = {}
+    for section in ("required", "optional"):
+        for name, (kind, *rest) in spec.get(section, {}).items():
+            options = rest[0] if rest else {}
+            values[name] = options["default"] if "default" in options else kind[0]
+    return values
+
+
+class TestNodePrefetch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.output_dir = Path(self.tmp.name)
+        self.downloader.cookies_dir = Path(self.tmp.name)
+        self.service = jobs.DownloadService(max_workers=2)
+        for p in [patch.dict(os.environ, {"YTDPL_METRICS": "0"}),
+                  patch.object(comfy_node.ytdpl.jobs, "get_service", return_value=self.service)]:
+            p.start()
+            self.addCleanup(p.stop)
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+
+    def test_node_waits_on_the_prefetched_job(self):
+        release = threading.Event()
+        calls = []
+
+        def fake_run(*args, **kwargs):
+            calls.append(kwargs)
+            release.wait(5)
+            return RESULT
+
+        with patch.object(self.downloader, "_run_download", side_effect=fake_run):
+            # Opciones por defecto explícitas (nodo) y omitidas (ruta HTTP) dan la misma petición
+            job, created = self.downloader.prefetch("https://youtu.be/dQw4w9WgXcQ", "", "Ninguno", "Ninguno",
+                                                    "best", "mp4")
+            self.assertTrue(created)
+            threading.Timer(0.1, release.set).start()
+            result = self.downloader.download_video(
+                "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=x", "", "Ninguno", "Ninguno", False, "best", "mp4",
+                use_cache=True, concurrent_fragments=0, sections="")
+
+        self.assertEqual(result, RESULT)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(self.service.get(job.key))
+
+    def test_prefetch_node_defaults_are_claimed_by_the_downloader(self):
+        calls = []
+
+        def fake_run(self_, *args, **kwargs):
+            calls.append(kwargs)
+            return RESULT
+
+        url = "https://youtu.be/dQw4w9WgXcQ"
+        node = comfy_node.YTDLPPrefetch.__new__(comfy_node.YTDLPPrefetch)
+        node.downloader = self.downloader
+        prefetch_inputs = input_defaults(comfy_node.YTDLPPrefetch.INPUT_TYPES())
+        prefetch_inputs["urls"] = url
+        download_inputs = input_defaults(comfy_node.YTDLPVideoDownloader.INPUT_TYPES())
+        download_inputs["url"] = url
+
+        # autospec: una opción que _run_download no acepta falla igual que en producción
+        with patch.object(comfy_node.YTDLPVideoDownloader, "_run_download", autospec=True, side_effect=fake_run):
+            node.prefetch(**prefetch_inputs)
+            (job_state,) = self.service.jobs()
+            job = self.service.get(job_state["key"])
+            self.assertEqual(job.future.result(5), RESULT)
+            with patch.object(self.service, "claim", wraps=self.service.claim) as claim:
+                result = self.downloader.download_video(**download_inputs)
+
+        self.assertEqual(result, RESULT)
+        # El descargador reclamó el trabajo adelantado (misma clave) y no volvió a descargar
+        claim.assert_called_once_with(job.key)
+        self.assertIsNone(self.service.get(job.key))
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_prefetch_falls_back_to_a_direct_download(self):
+        outcomes = [Exception("red caída"), RESULT]
+
+        def fake_run(*args, **kwargs):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with patch.object(self.downloader, "_run_download", side_effect=fake_run):
+            job, _ = self.downloader.prefetch("https://youtu.be/dQw4w9WgXcQ", "", "Ninguno", "Ninguno", "best", "mp4")
+            with self.assertRaises(Exception):
+                job.future.result(5)
+            result = self.downloader.download_video("https://youtu.be/dQw4w9WgXcQ", "", "Ninguno", "Ninguno",
+                                                    False, "best", "mp4")
+        self.assertEqual(result, RESULT)
+        self.assertEqual(outcomes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import keyframes, storage
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+# Tres escenas de color plano a 10 fps: 0-2 s, 2-3.6 s y 3.6-5 s (cortes en frames pares: el proxy toma 1 de cada 2)
+SCENES = [(20, (200, 30, 30)), (16, (30, 200, 30)), (14, (30, 30, 200))]
+
+
+@unittest.skipIf(cv2 is None, "opencv/numpy no instalados")
+class TestSceneSelection(unittest.TestCase):
+    def test_scores_are_vectorised_mean_differences(self):
+        proxy = np.zeros((3, 4, 4), np.uint8)
+        proxy[2] = 255
+        np.testing.assert_allclose(keyframes.scene_scores(proxy), [0.0, 1.0])
+
+    def test_first_frame_and_cuts_above_threshold(self):
+        times = [i * 0.5 for i in range(10)]
+        scores = np.array([0, 0, 0.5, 0, 0, 0, 0.3, 0, 0], np.float32)
+        self.assertEqual(keyframes.select_scenes(times, scores, threshold=0.1, min_interval=0.0), [0, 3, 7])
+
+    def test_close_cuts_keep_the_strongest(self):
+        times = [i * 0.5 for i in range(10)]
+        scores = np.array([0, 0, 0.2, 0.6, 0, 0, 0, 0, 0], np.float32)
+        self.assertEqual(keyframes.select_scenes(times, scores, threshold=0.1, min_interval=1.0), [0, 4])
+
+    def test_max_frames_keeps_the_most_marked_cuts(self):
+        times = [float(i) for i in range(6)]
+        scores = np.array([0.2, 0.9, 0.3, 0.8, 0.15], np.float32)
+        self.assertEqual(keyframes.select_scenes(times, scores, threshold=0.1, min_interval=0.0, max_frames=3),
+                         [0, 2, 4])
+
+    def test_spread_is_uniform(self):
+        self.assertEqual(keyframes.spread(5, 0), [0, 1, 2, 3, 4])
+        self.assertEqual(keyframes.spread(9, 3), [0, 4, 8])
+
+
+@unittest.skipIf(cv2 is None, "opencv/numpy no instalados")
+class TestSceneExtraction(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = str(Path(self.tmp.name) / "clip.avi")
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for count, rgb in SCENES:
+            for _ in range(count):
+                writer.write(np.full((48, 64, 3), rgb[::-1], np.uint8))
+        writer.release()
+        keyframes._memo.clear()
+        # Sin ffmpeg: el proxy sale de OpenCV igual que en una instalación mínima
+        patcher = mock.patch.object(keyframes, "has_ffmpeg", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_detects_each_scene_with_its_colour(self):
+        frames, timestamps, cached = keyframes.extract(self.video, mode=keyframes.SCENES, width=32)
+        self.assertFalse(cached)
+        self.assertEqual(timestamps, [0.0, 2.0, 3.6])
+        self.assertEqual(frames.shape, (3, 24, 32, 3))
+        self.assertEqual(frames.dtype, np.uint8)
+        # Canal dominante de cada escena: rojo, verde, azul
+        self.assertEqual([int(np.argmax(f.reshape(-1, 3).mean(axis=0))) for f in frames], [0, 1, 2])
+
+    def test_result_is_cached_per_file(self):
+        keyframes.extract(self.video, mode=keyframes.SCENES)
+        sidecars = os.listdir(Path(self.tmp.name) / keyframes.KEYFRAMES_DIRNAME)
+        self.assertEqual(len(sidecars), 1)
+
+        keyframes._memo.clear()
+        with mock.patch.object(keyframes, "proxy_frames", side_effect=AssertionError("no debe decodificar")):
+            frames, timestamps, cached = keyframes.extract(self.video, mode=keyframes.SCENES)
+        self.assertTrue(cached)
+        self.assertEqual(timestamps, [0.0, 2.0, 3.6])
+
+    def test_changed_file_invalidates_cache(self):
+        keyframes.extract(self.video, mode=keyframes.SCENES)
+        keyframes._memo.clear()
+        stat = os.stat(self.video)
+        os.utime(self.video, (stat.st_atime, stat.st_mtime + 10))
+        _, _, cached = keyframes.extract(self.video, mode=keyframes.SCENES)
+        self.assertFalse(cached)
+
+    def test_eviction_discards_cached_results(self):
+        keyframes.extract(self.video, mode=keyframes.SCENES)
+        manager = storage.StorageManager(Path(self.tmp.name))
+        manager.evict({"path": self.video, "id": None, "extractor": None})
+        self.assertEqual(os.listdir(Path(self.tmp.name) / keyframes.KEYFRAMES_DIRNAME), [])
+
+    def test_keyframes_mode_requires_ffmpeg(self):
+        with self.assertRaises(Exception) as ctx:
+            keyframes.extract(self.video, mode=keyframes.KEYFRAMES)
+        self.assertIn("ffmpeg", str(ctx.exception))
+
+
+@unittest.skipUnless(cv2 is not None and shutil.which("ffmpeg"), "ffmpeg no disponible")
+class TestKeyframeExtraction(unittest.TestCase):
+    def test_only_intra_frames_are_decoded(self):
+        import subprocess
+
+        with tempfile.TemporaryDirectory() as tmp:
+            video = str(Path(tmp) / "gop.mp4")
+            # 6 s a 10 fps con un keyframe cada 20 frames: I-frames en 0, 2 y 4 s
+            subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x48:rate=10:duration=6",
+                            "-g", "20", "-keyint_min", "20", "-sc_threshold", "0", "-pix_fmt", "yuv420p", video],
+                           check=True)
+            frames, timestamps, _ = keyframes.extract(video, mode=keyframes.KEYFRAMES, min_interval=0.0)
+            self.assertEqual(timestamps, [0.0, 2.0, 4.0])
+            self.assertEqual(frames.shape, (3, 48, 64, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import metadata
+
+VTT = """WEBVTT
+Kind: captions
+
+00:00:00.000 --> 00:00:02.500 align:start position:0%
+<c>hello</c> &amp; welcome
+
+00:00:02.500 --> 00:00:05.000
+hello &amp; welcome
+to the show
+
+01:00:05.000 --> 01:00:06.250
+bye
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:02,000
+<i>uno</i>
+
+2
+00:00:02,000 --> 00:00:03,500
+dos
+"""
+
+
+class TestTimedText(unittest.TestCase):
+    def test_vtt_cues_without_tags(self):
+        cues = metadata.parse_timed_text(VTT)
+        self.assertEqual(len(cues), 3)
+        self.assertEqual(cues[0], {"start": 0.0, "end": 2.5, "text": "hello & welcome"})
+        self.assertEqual(cues[1]["text"], "hello & welcome\nto the show")
+        self.assertEqual(cues[2]["start"], 3605.0)
+        self.assertEqual(cues[2]["end"], 3606.25)
+
+    def test_srt_cues(self):
+        cues = metadata.parse_timed_text(SRT)
+        self.assertEqual([c["text"] for c in cues], ["uno", "dos"])
+        self.assertEqual(cues[1]["end"], 3.5)
+
+    def test_json3_cues(self):
+        data = json.dumps({"events": [
+            {"tStartMs": 1000, "dDurationMs": 1500, "segs": [{"utf8": "hola "}, {"utf8": "mundo"}]},
+            {"tStartMs": 2500, "dDurationMs": 100, "segs": [{"utf8": "\n"}]},
+        ]})
+        self.assertEqual(metadata.parse_json3(data), [{"start": 1.0, "end": 2.5, "text": "hola mundo"}])
+
+    def test_transcript_drops_rolling_repeats(self):
+        text = metadata.transcript(metadata.parse_timed_text(VTT))
+        self.assertEqual(text, "hello & welcome\nto the show\nbye")
+
+
+class TestTrackSelection(unittest.TestCase):
+    INFO = {
+        "subtitles": {"es": [{"ext": "vtt"}], "live_chat": [{"ext": "json"}]},
+        "automatic_captions": {"en": [{"ext": "vtt"}], "es": [{"ext": "vtt"}], "en-GB": [{"ext": "vtt"}]},
+    }
+
+    def test_pattern_order_and_manual_over_auto(self):
+        tracks = metadata.select_tracks(self.INFO, ["es", "en.*"])
+        self.assertEqual([(lang, auto) for lang, _, auto in tracks], [("es", False), ("en", True), ("en-GB", True)])
+
+    def test_auto_captions_can_be_excluded(self):
+        tracks = metadata.select_tracks(self.INFO, ["all"], auto_captions=False)
+        self.assertEqual([lang for lang, _, _ in tracks], ["es"])
+
+    def test_parse_langs(self):
+        self.assertEqual(metadata.parse_langs(" en.* , es,,"), ["en.*", "es"])
+
+
+class FakeYDL:
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True):
+        assert download is False
+        return {
+            "id": "abc", "extractor_key": "Youtube", "title": "Título", "uploader": "Canal",
+            "formats": [{"url": "http://media"}],
+            "thumbnails": [{"url": "http://t/1.jpg", "width": 120, "height": 90, "preference": -1}, {"id": "x"}],
+            "chapters": [{"start_time": 0, "end_time": 10, "title": "Intro"}],
+            "subtitles": {"es": [{"ext": "ttml", "url": "http://ttml"}, {"ext": "vtt", "url": "http://vtt"}]},
+            "automatic_captions": {"en": [{"ext": "srt", "data": SRT}]},
+        }
+
+    def urlopen(self, url):
+        assert url == "http://vtt"
+        return io.BytesIO(VTT.encode("utf-8"))
+
+
+class TestExtract(unittest.TestCase):
+    def test_extract_never_downloads_media(self):
+        with patch("yt_dlp.YoutubeDL", FakeYDL):
+            result = metadata.extract("https://youtu.be/abc", ["es", "en"], auto_captions=True)
+        self.assertEqual(result["title"], "Título")
+        self.assertEqual(result["channel"], "Canal")
+        self.assertNotIn("formats", result)
+        self.assertEqual(result["chapters"], [{"start": 0, "end": 10, "title": "Intro"}])
+        self.assertEqual(result["thumbnails"], [{"url": "http://t/1.jpg", "width": 120, "height": 90}])
+        self.assertEqual(list(result["subtitles"]), ["es", "en"])
+        self.assertEqual(result["subtitles"]["es"]["ext"], "vtt")
+        self.assertTrue(result["subtitles"]["en"]["auto"])
+        self.assertEqual(result["subtitles"]["en"]["cues"][0]["text"], "uno")
+
+    def test_playlists_resolve_a_single_entry(self):
+        seen = []
+
+        class RecordingYDL(FakeYDL):
+            def __init__(self, opts):
+                super().__init__(opts)
+                seen.append(opts)
+
+        with patch("yt_dlp.YoutubeDL", RecordingYDL):
+            metadata.extract("https://www.youtube.com/watch?v=abc&list=PL1", [], auto_captions=False)
+        self.assertTrue(seen[0]["noplaylist"])
+        self.assertEqual(seen[0]["playlist_items"], "1")
+        self.assertTrue(seen[0]["ignore_no_formats_error"])
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = metadata.MetadataCache(Path(self.tmp.name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_under_every_key(self):
+        self.cache.put(["a", "b"], {"title": "x"})
+        self.assertEqual(self.cache.get("a", 60), {"title": "x"})
+        self.assertEqual(self.cache.get("b", 60), {"title": "x"})
+        self.assertIsNone(self.cache.get("c", 60))
+
+    def test_expired_entries_are_discarded(self):
+        self.cache.put(["a"], {"title": "x"})
+        with patch("ytdpl.metadata.time.time", return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get("a", 60))
+        self.assertFalse((Path(self.tmp.name) / metadata.METADATA_DIRNAME / "a.json").exists())
+
+    def test_key_depends_on_language_selection(self):
+        self.assertNotEqual(metadata.metadata_key("Youtube", "abc", ["en"], True),
+                            metadata.metadata_key("Youtube", "abc", ["es"], True))
+        self.assertNotEqual(metadata.metadata_key("Youtube", "abc", ["en"], True),
+                            metadata.metadata_key("Youtube", "abc", ["en"], False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import metrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.env = patch.dict(os.environ, {}, clear=False)
+        self.env.start()
+        for var in ("YTDPL_METRICS", "YTDPL_METRICS_FILE", "YTDPL_METRICS_PROM", "YTDPL_PROFILE"):
+            os.environ.pop(var, None)
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_spans_accumulate_across_retries(self):
+        run = metrics.RunMetrics("u")
+        with patch.object(metrics.time, "monotonic", side_effect=[0.0, 1.5, 10.0, 10.5]):
+            with run.span("filename_prediction"):
+                pass
+            with run.span("filename_prediction"):
+                pass
+        self.assertEqual(run.stages["filename_prediction"], 2.0)
+
+    def test_transfer_is_split_by_progress_phases(self):
+        run = metrics.RunMetrics("u")
+        tracker = SimpleNamespace(phase_started={"download": 2.0, "postprocess": 6.0}, downloaded_bytes=8_000_000)
+        run.record_transfer(tracker, 0.5, 7.0)
+        self.assertEqual(run.stages, {"extraction": 1.5, "download": 4.0, "postprocess": 1.0})
+        self.assertEqual(run.record("ok")["throughput_bps"], 2_000_000.0)
+
+        # Archivo ya presente: no hay eventos de descarga
+        run = metrics.RunMetrics("u")
+        run.record_transfer(SimpleNamespace(phase_started={}, downloaded_bytes=0), 0.0, 3.0)
+        self.assertEqual(run.stages, {"extraction": 3.0})
+        self.assertIsNone(run.record("ok")["throughput_bps"])
+
+    def test_finish_appends_jsonl_and_prometheus(self):
+        prom = self.root / "textfile" / "ytdpl.prom"
+        os.environ["YTDPL_METRICS_PROM"] = str(prom)
+        run = metrics.RunMetrics("https://youtu.be/abc", "api")
+        run.extractor = "Youtube"
+        run.add("download", 2.0)
+        run.bytes = 1000
+        run.finish(self.root, "ok")
+        metrics.RunMetrics("https://youtu.be/x").finish(self.root, "error", error=Exception("403 Forbidden"))
+
+        lines = (self.root / metrics.METRICS_DIRNAME / metrics.METRICS_FILENAME).read_text().splitlines()
+        entries = [json.loads(line) for line in lines]
+        self.assertEqual([e["status"] for e in entries], ["ok", "error"])
+        self.assertEqual(entries[0]["stages"], {"download": 2.0})
+        self.assertEqual(entries[0]["throughput_bps"], 500.0)
+        self.assertIn("403", entries[1]["error"])
+
+        text = prom.read_text()
+        self.assertIn('ytdpl_downloads_total{status="ok",extractor="Youtube"}', text)
+        self.assertIn('ytdpl_stage_seconds_count{stage="download"}', text)
+        self.assertIn('ytdpl_downloaded_bytes_total{extractor="Youtube"}', text)
+
+    def test_disabled(self):
+        os.environ["YTDPL_METRICS"] = "0"
+        self.assertIsNone(metrics.RunMetrics("u").finish(self.root, "ok"))
+        self.assertFalse((self.root / metrics.METRICS_DIRNAME).exists())
+
+    def test_profile_runs_once_per_process(self):
+        os.environ["YTDPL_PROFILE"] = "1"
+        with patch.object(metrics, "_profiled", False):
+            with metrics.maybe_profile(self.root):
+                sum(range(1000))
+            with metrics.maybe_profile(self.root):
+                pass
+        profiles = list((self.root / metrics.METRICS_DIRNAME).glob("profile-*.prof"))
+        self.assertEqual(len(profiles), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import index
+from tests.node_isolation import isolate_node
+
+
+class TestOutputIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.video = self.root / "Video-abc.mp4"
+        self.video.write_bytes(b"\x00" * 1024)
+        self.store = index.OutputIndex(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record_and_lookup(self):
+        self.store.record("Youtube", "abc", self.video)
+        entry = self.store.lookup("Youtube", "abc")
+        self.assertEqual(entry["path"], str(self.video))
+        self.assertEqual(entry["size"], 1024)
+        self.assertIsNone(self.store.lookup("Youtube", "otro"))
+        self.assertEqual([e["id"] for e in self.store.entries()], ["abc"])
+
+    def test_changed_or_missing_file_is_discarded(self):
+        self.store.record("Youtube", "abc", self.video)
+        self.video.write_bytes(b"\x01" * 10)
+        self.assertIsNone(self.store.lookup("Youtube", "abc"))
+        self.assertEqual(list(self.store.entries()), [])
+
+    def test_variants_of_a_video_are_tracked_separately(self):
+        clip = self.root / "Video-abc 10-25.mp4"
+        clip.write_bytes(b"\x00" * 10)
+        full = self.store.record("Youtube", "abc", self.video)
+        clip_entry = self.store.record("Youtube", "abc", clip)
+
+        self.assertEqual(sorted(e["path"] for e in self.store.entries()), sorted([str(self.video), str(clip)]))
+        self.assertEqual(self.store.lookup("Youtube", "abc")["path"], str(clip))
+        # Servir la descarga completa sólo renueva su propia entrada
+        touched = self.store.touch("Youtube", "abc", self.video)
+        self.assertGreaterEqual(touched["accessed"], full["accessed"])
+        self.assertEqual(self.store.lookup("Youtube", "abc", clip)["accessed"], clip_entry["accessed"])
+        self.store.discard("Youtube", "abc", clip)
+        self.assertEqual([e["path"] for e in self.store.entries()], [str(self.video)])
+
+    def test_read_final_paths_skips_noise(self):
+        report = self.root / "report.jsonl"
+        report.write_text('NA\n{"id": "1", "extractor_key": "Youtube", "filepath": "/out/1.mp4"}\n'
+                          '{"id": "2", "filepath": null}\n', encoding="utf-8")
+        self.assertEqual([r["id"] for r in index.read_final_paths(report)], ["1"])
+        self.assertEqual(index.read_final_paths(self.root / "no-existe"), [])
+
+
+class TestSubprocessFinalPath(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.downloader.output_dir = self.root
+        self.downloader.cookies_dir = self.root
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reported_path_wins_over_prediction_and_is_indexed(self):
+        merged = self.root / "Video-abc.mkv"
+        decoy = self.root / "Otro-trabajo.mp4"
+
+        filename_res = MagicMock(returncode=0, stdout=str(self.root / "Video-abc.webm"), stderr="")
+        probe_res = MagicMock(returncode=0, stdout="aac", stderr="")
+
+        def fake_popen(cmd, **kwargs):
+            report_path = cmd[cmd.index("--print-to-file") + 2]
+            merged.write_bytes(b"\x00" * 64)
+            # Un archivo más reciente de otro trabajo no debe confundir al nodo
+            decoy.write_bytes(b"\x00" * 8)
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"id": "abc", "extractor_key": "Youtube", "filepath": str(merged)}) + "\n")
+            merged.with_suffix(".info.json").write_text(json.dumps({"id": "abc", "extractor_key": "Youtube", "title": "Video"}))
+            return MagicMock(returncode=0, stdout=["[download] 100%\n"])
+
+        with patch.object(comfy_node.subprocess, "run", side_effect=[filename_res, probe_res]), \
+                patch.object(comfy_node.subprocess, "Popen", side_effect=fake_popen):
+            result = self.downloader.download_video(
+                "https://youtu.be/abc", "", "Ninguno", "Ninguno", False, "best", "mkv", "subprocess", use_cache=False)
+
+        self.assertEqual(result[0], str(merged))
+        self.assertEqual(result[2], "Video")
+        self.assertEqual(index.OutputIndex(self.root).lookup("Youtube", "abc")["path"], str(merged))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,9 +10,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 # Import the module
 import __init__ as my_module
+from tests.node_isolation import isolate_node
 
 class TestNewPathLogic(unittest.TestCase):
     def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
         # Patch mkdir globally for the test duration
         self.mkdir_patcher = patch('pathlib.Path.mkdir')
         self.mock_mkdir = self.mkdir_patcher.start()
@@ -24,7 +27,12 @@ class TestNewPathLogic(unittest.TestCase):
 
         self.downloader = my_module.YTDLPVideoDownloader()
 
+        # Metrics would be written under the (non-existent) output dir
+        self.env_patcher = patch.dict(os.environ, {"YTDPL_METRICS": "0"})
+        self.env_patcher.start()
+
     def tearDown(self):
+        self.env_patcher.stop()
         self.mkdir_patcher.stop()
         self.exists_patcher.stop()
 
@@ -61,12 +69,12 @@ class TestNewPathLogic(unittest.TestCase):
 
         # Call download_video
         result = self.downloader.download_video(
-            url, "", cookies_file, browser_source, update_yt_dlp, quality, format_type
+            url, "", cookies_file, browser_source, update_yt_dlp, quality, format_type, "subprocess"
         )
 
         # Verify result
         self.assertEqual(result[0], str(expected_path))
-        self.assertEqual(len(result), 6) # Check that the tuple has 6 elements
+        self.assertEqual(len(result), 7) # Check that the tuple has 7 elements (media_info included)
 
         # Verify subprocess.run calls (get-filename)
         # It might be called multiple times if first fails, but here first succeeds.
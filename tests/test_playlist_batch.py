@@ -0,0 +1,124 @@
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import batch, engine
+from tests.node_isolation import isolate_node
+
+
+class TestRunBatch(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        def worker(url):
+            time.sleep(0.02 if url.endswith("0") else 0)
+            return url.upper()
+
+        urls = [f"https://a{i}.com/{i}" for i in range(6)]
+        results = batch.run_batch(urls, worker, max_workers=4, per_host_limit=2)
+        self.assertEqual([r["result"] for r in results], [u.upper() for u in urls])
+
+    def test_per_host_limit_is_respected(self):
+        lock = threading.Lock()
+        active = {"n": 0, "max": 0}
+
+        def worker(url):
+            with lock:
+                active["n"] += 1
+                active["max"] = max(active["max"], active["n"])
+            time.sleep(0.02)
+            with lock:
+                active["n"] -= 1
+
+        urls = [f"https://www.youtube.com/watch?v={i}" for i in range(4)] + ["https://m.youtube.com/watch?v=x"]
+        batch.run_batch(urls, worker, max_workers=8, per_host_limit=2)
+        self.assertEqual(active["max"], 2)
+
+    def test_failure_does_not_abort_batch(self):
+        def worker(url):
+            if "bad" in url:
+                raise Exception("Private video")
+            return url
+
+        results = batch.run_batch(["https://x.com/ok1", "https://x.com/bad", "https://x.com/ok2"], worker)
+        self.assertEqual([r["ok"] for r in results], [True, False, True])
+        self.assertIn("Private video", results[1]["error"])
+
+    def test_expand_urls_only_lists_marked_urls_in_order(self):
+        listed = []
+
+        def expand(url):
+            listed.append(url)
+            if url.endswith("rota"):
+                raise Exception("sin red")
+            return [f"{url}/1", f"{url}/2"]
+
+        urls = ["https://a.com/v", "https://a.com/lista", "https://b.com/rota", "https://b.com/v"]
+        expanded = batch.expand_urls(urls, expand, lambda url: "/v" not in url, max_workers=2)
+        self.assertEqual(expanded, ["https://a.com/v", "https://a.com/lista/1", "https://a.com/lista/2",
+                                    "https://b.com/rota", "https://b.com/v"])
+        self.assertEqual(sorted(listed), ["https://a.com/lista", "https://b.com/rota"])
+
+    def test_parse_url_list(self):
+        text = "https://a.com/1\n\n  # comentario\nhttps://b.com/2  \n"
+        self.assertEqual(batch.parse_url_list(text), ["https://a.com/1", "https://b.com/2"])
+
+
+class TestBatchNode(unittest.TestCase):
+    def setUp(self):
+        # Sin verificación real de dependencias ni estado del actualizador junto al paquete
+        isolate_node(self)
+
+    def test_node_returns_aligned_lists(self):
+        node = comfy_node.YTDLPBatchDownloader.__new__(comfy_node.YTDLPBatchDownloader)
+        node.downloader = MagicMock()
+
+        def fake_download(url, *args, **kwargs):
+            if url.endswith("2"):
+                raise Exception("🛑 Error en yt-dlp")
+            return (f"/out/{url[-1]}.mp4", "✅ Éxito", f"T{url[-1]}", "", "", "C", '{"duration": 1.0}')
+
+        node.downloader.download_video.side_effect = fake_download
+
+        paths, titles, statuses, report = node.download_batch(
+            "https://a.com/1\nhttps://a.com/2\nhttps://a.com/3",
+            "", "Ninguno", "Ninguno", "best", "mp4",
+            expand_playlists=False, pool="process", max_workers=2, per_host_limit=1)
+
+        self.assertEqual(paths, ["/out/1.mp4", "", "/out/3.mp4"])
+        self.assertEqual(titles, ["T1", "", "T3"])
+        self.assertTrue(statuses[1].startswith("❌"))
+        self.assertEqual([item["status"] for item in json.loads(report)], ["ok", "error", "ok"])
+        self.assertEqual(json.loads(report)[0]["media_info"], {"duration": 1.0})
+        # En modo 'process' cada elemento usa el motor por subprocess
+        self.assertEqual(node.downloader.download_video.call_args.kwargs["engine"], "subprocess")
+
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_single_videos_are_not_listed_as_playlists(self):
+        node = comfy_node.YTDLPBatchDownloader.__new__(comfy_node.YTDLPBatchDownloader)
+        node.downloader = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp:
+            node.downloader.output_dir = Path(tmp)
+            node.downloader.download_video.return_value = ("/out/v.mp4", "✅ Éxito", "T", "", "", "C", "{}")
+            playlist = "https://www.youtube.com/playlist?list=PLabc"
+            with patch.object(comfy_node.ytdpl.engine, "expand_playlist", return_value=["https://youtu.be/aaaaaaaaaaa"]) as expand:
+                paths, _, _, _ = node.download_batch(
+                    f"https://youtu.be/dQw4w9WgXcQ\nhttps://www.tiktok.com/@u/video/7234567890123456789\n{playlist}",
+                    "", "Ninguno", "Ninguno", "best", "mp4",
+                    expand_playlists=True, pool="thread", max_workers=2, per_host_limit=1)
+        # Sólo la playlist cuesta una extracción; los vídeos sueltos van directos al pool
+        self.assertEqual([c.args[0] for c in expand.call_args_list], [playlist])
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(node.downloader.download_video.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
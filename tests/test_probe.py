@@ -0,0 +1,78 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import probe
+
+FFPROBE_OUTPUT = {
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1280, "height": 720,
+         "avg_frame_rate": "30000/1001", "r_frame_rate": "30000/1001"},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "channels": 2, "sample_rate": "44100"},
+        {"index": 2, "codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}},
+    ],
+    "format": {"duration": "10.010000", "bit_rate": "1500000", "format_name": "mov,mp4,m4a,3gp,3g2,mj2"},
+}
+
+
+class TestMediaProbe(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = Path(self.tmp.name) / "Video-abc.mp4"
+        self.video.write_bytes(b"\x00" * 256)
+        probe._memo.clear()
+        self.run_patcher = patch.object(probe.subprocess, "run",
+                                        return_value=MagicMock(returncode=0, stdout=json.dumps(FFPROBE_OUTPUT), stderr=""))
+        self.mock_run = self.run_patcher.start()
+
+    def tearDown(self):
+        self.run_patcher.stop()
+        probe._memo.clear()
+        self.tmp.cleanup()
+
+    def test_summary_fields(self):
+        info = probe.probe(self.video)
+        self.assertAlmostEqual(info["fps"], 29.97, places=2)
+        self.assertEqual(info["frame_count"], 300)
+        self.assertEqual((info["width"], info["height"]), (1280, 720))
+        self.assertEqual((info["video_codec"], info["audio_codec"]), ("h264", "aac"))
+        self.assertEqual(info["bitrate"], 1500000)
+        self.assertTrue(info["has_audio"])
+        self.assertEqual([s["type"] for s in info["streams"]], ["video", "audio", "video"])
+
+    def test_single_spawn_per_file(self):
+        probe.probe(self.video)
+        probe.probe(self.video)
+        # Otro proceso (memoria vacía) lee el resultado guardado junto al archivo
+        probe._memo.clear()
+        probe.probe(str(self.video))
+        self.assertEqual(self.mock_run.call_count, 1)
+        self.assertTrue((self.video.parent / probe.PROBE_DIRNAME).is_dir())
+
+    def test_changed_file_is_probed_again(self):
+        probe.probe(self.video)
+        self.video.write_bytes(b"\x00" * 512)
+        probe.probe(self.video)
+        self.assertEqual(self.mock_run.call_count, 2)
+
+    def test_silent_video(self):
+        raw = {"streams": [FFPROBE_OUTPUT["streams"][0]], "format": {"duration": "2"}}
+        info = probe.summarize(raw)
+        self.assertFalse(info["has_audio"])
+        self.assertEqual(info["audio_codec"], "")
+
+    def test_ffprobe_failure_raises(self):
+        self.mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="Invalid data found")
+        with self.assertRaises(Exception) as ctx:
+            probe.probe(self.video)
+        self.assertIn("Invalid data", str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import os
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import engine, progress
+
+
+def template_line(marker, data):
+    return f"{marker}{json.dumps(data)}\n"
+
+
+class TestProgressTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = progress.ProgressTracker(log_lines=5, print_interval=3600)
+
+    def test_download_lines_become_events(self):
+        handled = self.tracker.feed_line(template_line(progress.DOWNLOAD_MARKER, {
+            "status": "downloading", "downloaded_bytes": 500, "total_bytes": 1000,
+            "speed": 250.0, "eta": 2, "fragment_index": 3, "fragment_count": 6, "filename": "a.mp4",
+            "_default_template": "50%",
+        }))
+        self.assertTrue(handled)
+        event = self.tracker.last_event
+        self.assertEqual(event["phase"], "download")
+        self.assertEqual(event["fragment_index"], 3)
+        self.assertNotIn("_default_template", event)
+        self.assertEqual(progress.ProgressTracker.percent(event), 50.0)
+        self.assertEqual(self.tracker.downloaded_bytes, 500)
+        self.assertEqual(len(self.tracker.log), 0)
+
+    def test_postprocess_phase(self):
+        self.tracker.feed_line(template_line(progress.POSTPROCESS_MARKER, {"status": "started", "postprocessor": "Merger"}))
+        self.assertEqual(self.tracker.phase, "postprocess")
+        self.assertEqual(self.tracker.last_event["postprocessor"], "Merger")
+
+    def test_log_is_bounded(self):
+        for i in range(1000):
+            self.assertFalse(self.tracker.feed_line(f"[download] línea {i}\n"))
+        self.assertEqual(len(self.tracker.log), 5)
+        self.assertTrue(self.tracker.tail().endswith("línea 999"))
+
+    def test_percent_from_fragments_without_size(self):
+        self.assertEqual(progress.ProgressTracker.percent({"fragment_index": 1, "fragment_count": 4}), 25.0)
+        self.assertIsNone(progress.ProgressTracker.percent({"status": "downloading"}))
+
+    def test_comfy_progress_bar_is_updated(self):
+        pbar = MagicMock()
+        with patch.object(progress, "_comfy_progress_bar", return_value=pbar):
+            tracker = progress.ProgressTracker(print_interval=3600)
+        tracker.download_hook({"status": "downloading", "downloaded_bytes": 30, "total_bytes": 120})
+        pbar.update_absolute.assert_called_with(25, 100)
+
+    def test_background_trackers_skip_the_comfy_bar(self):
+        reported = []
+        with patch.object(progress, "_comfy_progress_bar") as make_bar:
+            with progress.background(reported.append):
+                tracker = progress.ProgressTracker(print_interval=3600)
+            foreground = progress.ProgressTracker(print_interval=3600)
+        tracker.download_hook({"status": "downloading", "downloaded_bytes": 30, "total_bytes": 120})
+        self.assertEqual(reported, [25.0])
+        # Sólo el tracker creado fuera de background() tiene barra
+        make_bar.assert_called_once_with(100)
+        self.assertIsNotNone(foreground._pbar)
+
+    def test_logger_feeds_ring_buffer(self):
+        logger = engine.YtdlpLogger(self.tracker, max_errors=2)
+        for i in range(4):
+            logger.error(f"ERROR {i}")
+        self.assertEqual(list(logger.errors), ["ERROR 2", "ERROR 3"])
+        self.assertEqual(self.tracker.log[-1], "ERROR 3")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import __init__ as comfy_node
+from ytdpl import engine, sections
+
+
+class TestSections(unittest.TestCase):
+    def test_parse_timestamp(self):
+        self.assertEqual(sections.parse_timestamp("90"), 90.0)
+        self.assertEqual(sections.parse_timestamp("1:30"), 90.0)
+        self.assertEqual(sections.parse_timestamp("1:02:03.5"), 3723.5)
+        self.assertIsNone(sections.parse_timestamp("inf"))
+        with self.assertRaises(Exception):
+            sections.parse_timestamp("1m30s")
+
+    def test_parse_sections_text_has_priority(self):
+        ranges = sections.parse_sections("1:02:00-1:02:15, 10-25", start_time=5, end_time=8)
+        self.assertEqual(ranges, [(10.0, 25.0), (3720.0, 3735.0)])
+
+    def test_parse_sections_from_start_end(self):
+        self.assertEqual(sections.parse_sections("", 5, 0), [(5.0, None)])
+        self.assertEqual(sections.parse_sections("", 0, 0), [])
+        with self.assertRaises(Exception):
+            sections.parse_sections("20-10")
+
+    def test_build_args(self):
+        args = sections.build_args([(10.0, 25.0)], exact_cuts=True)
+        self.assertEqual(args[:2], ["--download-sections", "*10.000-25.000"])
+        self.assertIn("--force-keyframes-at-cuts", args)
+        self.assertEqual(sections.build_args([]), [])
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_args_are_accepted_by_yt_dlp(self):
+        import yt_dlp
+        opts = yt_dlp.parse_options(sections.build_args([(10.0, 25.0), (60.0, None)])).ydl_opts
+        ranges = list(opts["download_ranges"]({"duration": 120}, None))
+        self.assertEqual([(r["start_time"], r["end_time"]) for r in ranges], [(10.0, 25.0), (60.0, float("inf"))])
+
+    def test_is_changed_includes_range(self):
+        base = ("https://youtu.be/abc", "", "Ninguno", "Ninguno", False, "best", "mp4")
+        full = comfy_node.YTDLPVideoDownloader.IS_CHANGED(*base)
+        clip = comfy_node.YTDLPVideoDownloader.IS_CHANGED(*base, start_time=10.0, end_time=20.0)
+        other = comfy_node.YTDLPVideoDownloader.IS_CHANGED(*base, sections="10-20, 30-40")
+        self.assertEqual(len({full, clip, other}), 3)
+        self.assertEqual(clip, comfy_node.YTDLPVideoDownloader.IS_CHANGED(*base, sections="0:10-0:20"))
+
+
+class TestJoinSections(unittest.TestCase):
+    def test_joined_path_lists_every_range(self):
+        pieces = ["/out/Clip [abc] 10-25.mp4", "/out/Clip [abc] 60-75.mp4"]
+        self.assertEqual(sections.joined_path(pieces), os.path.join("/out", "Clip [abc] 10-25+60-75.mp4"))
+
+    def test_in_process_engine_joins_one_file_per_range(self):
+        downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        meta = {"id": "abc", "requested_downloads": [{"filepath": "/out/Clip [abc] 10-25.mp4"},
+                                                     {"filepath": "/out/Clip [abc] 60-75.mp4"}]}
+        with patch.object(comfy_node.ytdpl.engine, "download", return_value=("/out/Clip [abc] 60-75.mp4", meta)), \
+             patch.object(comfy_node.ytdpl.sections, "join_clips", return_value="/out/joined.mp4") as join:
+            final_path, _ = downloader._download_in_process(lambda *a, **k: ["-f", "best"], "https://youtu.be/abc",
+                                                            "best", format_selector=object())
+        join.assert_called_once_with(["/out/Clip [abc] 10-25.mp4", "/out/Clip [abc] 60-75.mp4"])
+        self.assertEqual(final_path, Path("/out/joined.mp4"))
+
+    def test_single_range_is_not_joined(self):
+        downloader = comfy_node.YTDLPVideoDownloader.__new__(comfy_node.YTDLPVideoDownloader)
+        self.assertIsNone(downloader._join_sections(["/out/a.mp4", "/out/a.mp4"]))
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg no disponible")
+    def test_join_clips_concatenates_and_removes_pieces(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pieces = []
+            for label in ("0-1", "5-6"):
+                piece = os.path.join(tmp, f"Clip [abc] {label}.mp4")
+                subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=32x32:rate=10:duration=1",
+                                "-pix_fmt", "yuv420p", piece], check=True)
+                pieces.append(piece)
+            joined = sections.join_clips(pieces)
+            self.assertEqual(os.listdir(tmp), [os.path.basename(joined)])
+            self.assertTrue(joined.endswith("Clip [abc] 0-1+5-6.mp4"))
+
+
+if __name__ == '__main__':
+    unittest.main()
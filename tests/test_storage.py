@@ -0,0 +1,120 @@
+import sys
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import flight, index, storage
+
+DAY = 86400
+
+
+class TestStorageManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.index = index.OutputIndex(self.root)
+        self.now = time.time()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_video(self, video_id, size, days_ago):
+        path = self.root / f"Video-{video_id}.mp4"
+        path.write_bytes(b"\x00" * size)
+        entry = self.index.record("Youtube", video_id, path)
+        entry["accessed"] = self.now - days_ago * DAY
+        self.index._write(entry)
+        return path
+
+    def test_quota_evicts_least_recently_used(self):
+        old = self.add_video("old", 400, days_ago=10)
+        mid = self.add_video("mid", 400, days_ago=5)
+        new = self.add_video("new", 400, days_ago=1)
+
+        report = storage.StorageManager(self.root, quota_bytes=900).enforce(self.now)
+
+        self.assertEqual(report["evicted"], [str(old)])
+        self.assertEqual(report["remaining"], 800)
+        self.assertFalse(old.exists())
+        self.assertTrue(mid.exists() and new.exists())
+        self.assertIsNone(self.index.lookup("Youtube", "old"))
+
+    def test_files_in_use_are_never_evicted(self):
+        recent = self.add_video("recent", 400, days_ago=0)
+        pinned = self.add_video("pinned", 400, days_ago=9)
+        locked = self.add_video("locked", 400, days_ago=8)
+        victim = self.add_video("victim", 400, days_ago=7)
+
+        manager = storage.StorageManager(self.root, quota_bytes=1)
+        with storage.pin(pinned), flight.file_lock(self.root, flight.flight_key(["Youtube", "locked"])):
+            report = manager.enforce(self.now)
+
+        self.assertEqual(report["evicted"], [str(victim)])
+        self.assertTrue(recent.exists() and pinned.exists() and locked.exists())
+
+    def test_every_variant_of_a_locked_video_is_protected(self):
+        full = self.add_video("locked", 400, days_ago=9)
+        clip = self.root / "Video-locked 10-25.mp4"
+        clip.write_bytes(b"\x00" * 400)
+        entry = self.index.record("Youtube", "locked", clip)
+        entry["accessed"] = self.now - 8 * DAY
+        self.index._write(entry)
+
+        manager = storage.StorageManager(self.root, quota_bytes=1)
+        with flight.file_lock(self.root, flight.flight_key(["Youtube", "locked"])):
+            report = manager.enforce(self.now)
+
+        self.assertEqual(report["evicted"], [])
+        self.assertTrue(full.exists() and clip.exists())
+
+    def test_age_quota_and_untracked_files(self):
+        self.add_video("fresh", 100, days_ago=2)
+        stale = self.add_video("stale", 100, days_ago=40)
+        legacy = self.root / "descarga-antigua.mp4"
+        legacy.write_bytes(b"\x00" * 100)
+        os.utime(legacy, (self.now - 60 * DAY, self.now - 60 * DAY))
+
+        report = storage.StorageManager(self.root, max_age_seconds=30 * DAY).enforce(self.now)
+
+        self.assertEqual(sorted(report["evicted"]), sorted([str(stale), str(legacy)]))
+        self.assertEqual(report["files"], 3)
+
+    def test_orphaned_partials_are_cleaned(self):
+        old_part = self.root / "Video-x.mp4.part"
+        frag = self.root / "Video-x.mp4.part-Frag3.part"
+        info = self.root / "Video-y.info.json"
+        fresh_part = self.root / "Video-z.mp4.part"
+        tmp_entry = self.root / "_cache" / "abc.json.123.tmp"
+        tmp_entry.parent.mkdir()
+        for path in (old_part, frag, info, fresh_part, tmp_entry):
+            path.write_bytes(b"\x00")
+        stale_time = self.now - storage.PARTIAL_GRACE - 60
+        for path in (old_part, frag, info, tmp_entry):
+            os.utime(path, (stale_time, stale_time))
+
+        removed = storage.StorageManager(self.root).clean_partials(self.now)
+
+        self.assertEqual(sorted(removed), sorted(str(p) for p in (old_part, frag, info, tmp_entry)))
+        self.assertTrue(fresh_part.exists())
+
+    def test_maintenance_is_throttled(self):
+        thread = storage.schedule_maintenance(self.root, interval=3600)
+        self.assertIsNotNone(thread)
+        thread.join(5)
+        self.assertIsNone(storage.schedule_maintenance(self.root, interval=3600))
+
+    def test_quotas_fall_back_to_environment(self):
+        os.environ["YTDPL_STORAGE_QUOTA_GB"] = "2"
+        try:
+            self.assertEqual(storage.quotas(0, 0), (2 * 1024 ** 3, 0))
+            self.assertEqual(storage.quotas(1, 7), (1024 ** 3, 7 * DAY))
+        finally:
+            del os.environ["YTDPL_STORAGE_QUOTA_GB"]
+
+
+if __name__ == '__main__':
+    unittest.main()
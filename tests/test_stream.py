@@ -0,0 +1,176 @@
+import http.server
+import os
+import shutil
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from ytdpl import engine, stream
+
+W, H = 4, 2
+
+
+def ppm(value):
+    return f"P6\n{W} {H}\n255\n".encode() + bytes([value]) * (W * H * 3)
+
+
+class HlsStandIn(http.server.ThreadingHTTPServer):
+    """Playlist HLS local cuyos segmentos sólo están disponibles con el paso del tiempo, como en un directo.
+
+    Cada segmento lleva ya frames PPM, así que no hace falta ffmpeg para decodificar.
+    """
+
+    def __init__(self, segments=8, frames_per_segment=2, segment_seconds=0.3):
+        super().__init__(("127.0.0.1", 0), self.Handler)
+        self.segments = segments
+        self.frames_per_segment = frames_per_segment
+        self.segment_seconds = segment_seconds
+        self.first_request = None
+        self.served = {}
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/live.m3u8"
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            server = self.server
+            if server.first_request is None:
+                server.first_request = time.monotonic()
+            if self.path.endswith(".m3u8"):
+                body = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:1\n#EXT-X-MEDIA-SEQUENCE:0\n"
+                body += "".join(f"#EXTINF:{server.segment_seconds},\nseg{i}.ts\n" for i in range(server.segments))
+                data, ctype = (body + "#EXT-X-ENDLIST\n").encode(), "application/vnd.apple.mpegurl"
+            else:
+                i = int(self.path.rsplit("seg", 1)[1].split(".")[0])
+                wait = server.first_request + i * server.segment_seconds - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                first = i * server.frames_per_segment
+                data = b"".join(ppm(first + k) for k in range(server.frames_per_segment))
+                ctype = "video/mp2t"
+                server.served[i] = time.monotonic()
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+
+def pcm_source(seconds, rate=100, channels=2):
+    """Proceso que escribe PCM f32le de golpe (una fuente más rápida que el consumidor)."""
+    code = ("import sys, array; a = array.array('f', [float(i // %d) for i in range(%d)]); "
+            "sys.stdout.buffer.write(a.tobytes())") % (channels, int(seconds * rate) * channels)
+    return [sys.executable, "-c", code]
+
+
+class TestPpm(unittest.TestCase):
+    def test_header_with_comments(self):
+        import io
+        f = io.BytesIO(b"P6\n# creado por ffmpeg\n4 2\n255\n" + b"\x00" * 24)
+        self.assertEqual(stream.read_ppm_header(f), (4, 2))
+        self.assertIsNone(stream.read_ppm_header(io.BytesIO(b"")))
+
+
+class TestCommands(unittest.TestCase):
+    def test_source_writes_to_stdout_and_prefers_hls(self):
+        cmd = stream.source_command("https://x/v", stream.VIDEO, "720p", "/c.txt")
+        self.assertEqual(cmd[cmd.index("-o") + 1], "-")
+        self.assertEqual(cmd[cmd.index("-f") + 1], "best[height<=720][protocol^=m3u8]/best[height<=720]/best")
+        self.assertEqual(cmd[-3:], ["--cookies", "/c.txt", "https://x/v"])
+
+    def test_decoder(self):
+        cmd = stream.decode_command(stream.VIDEO, fps=2, width=320)
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "fps=2,scale=320:-2")
+        self.assertEqual(cmd[-3:], ["-vcodec", "ppm", "pipe:1"])
+        cmd = stream.decode_command(stream.AUDIO, sample_rate=16000, channels=1)
+        self.assertIn("16000", cmd)
+        self.assertEqual(cmd[-1], "pipe:1")
+
+
+class TestMediaStream(unittest.TestCase):
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_chunks_arrive_while_the_hls_source_is_still_emitting(self):
+        server = HlsStandIn()
+        self.addCleanup(server.shutdown)
+        media = stream.MediaStream(stream.source_command(server.url), None, stream.VIDEO,
+                                   chunk_seconds=1.0, rate=2.0).start()
+        self.addCleanup(media.close)
+
+        first = media.next_chunk(timeout=30)
+        first_at = time.monotonic()
+        chunks = [first, *media]
+        # El primer trozo se entrega antes de que el sitio haya emitido el último segmento
+        self.assertLess(first_at, server.served[server.segments - 1])
+        self.assertEqual(first.data.shape, (2, H, W, 3))
+        frames = np.concatenate([c.data for c in chunks])
+        self.assertEqual(frames[:, 0, 0, 0].tolist(), list(range(server.segments * server.frames_per_segment)))
+        self.assertEqual([(c.start, c.end) for c in chunks[:2]], [(0.0, 1.0), (1.0, 2.0)])
+        self.assertTrue(media.finished)
+
+    def test_backpressure_bounds_memory(self):
+        media = stream.MediaStream(pcm_source(60), None, stream.AUDIO, chunk_seconds=1.0, rate=100, channels=2,
+                                   max_chunks=2).start()
+        self.addCleanup(media.close)
+        seen = []
+        for chunk in media:
+            # El productor nunca va más de max_chunks (+1 en mano) por delante del consumidor
+            self.assertLessEqual(media.produced - media.consumed, 2)
+            seen.append(chunk)
+            time.sleep(0.002)
+        self.assertEqual(len(seen), 60)
+        self.assertEqual(seen[0].data.shape, (2, 100))
+        self.assertEqual(seen[1].data[0, 0], 100.0)
+        self.assertGreater(media.stats()["blocked_seconds"], 0)
+
+    def test_partial_last_chunk_and_wait_for(self):
+        media = stream.MediaStream(pcm_source(2.5), None, stream.AUDIO, chunk_seconds=1.0, rate=100, channels=2,
+                                   max_chunks=4).start()
+        self.addCleanup(media.close)
+        # Pedir más de lo que cabe en cola no bloquea: se limita a max_chunks trozos
+        self.assertEqual(media.wait_for(3600, timeout=10), 3.0)
+        chunks = list(media)
+        self.assertEqual([c.data.shape[1] for c in chunks], [100, 100, 50])
+        self.assertEqual(chunks[-1].end, 2.5)
+
+    def test_source_failure_is_raised_to_the_consumer(self):
+        failing = [sys.executable, "-c", "import sys; sys.stderr.write('ERROR: Video unavailable\\n'); sys.exit(1)"]
+        media = stream.MediaStream(failing, None, stream.AUDIO, rate=100).start()
+        self.addCleanup(media.close)
+        with self.assertRaises(Exception) as ctx:
+            media.next_chunk(timeout=10)
+        self.assertIn("YT_DLP_ERROR", str(ctx.exception))
+        self.assertIn("Video unavailable", str(ctx.exception))
+
+    def test_registry_reuses_open_streams(self):
+        factory = lambda: stream.MediaStream(pcm_source(1), None, stream.AUDIO, rate=100)
+        first, created = stream.open_stream("k", factory)
+        again, created_again = stream.open_stream("k", factory)
+        self.addCleanup(stream.close_stream, "k")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertIs(first, again)
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg no instalado")
+    def test_real_decoder_pipeline(self):
+        src = [shutil.which("ffmpeg"), "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x48:rate=10",
+               "-t", "3", "-f", "mpegts", "pipe:1"]
+        media = stream.MediaStream(src, stream.decode_command(stream.VIDEO, fps=2, width=32), stream.VIDEO,
+                                   chunk_seconds=1.0, rate=2).start()
+        self.addCleanup(media.close)
+        chunks = list(media)
+        self.assertEqual(chunks[0].data.shape, (2, 24, 32, 3))
+        self.assertEqual(sum(len(c.data) for c in chunks), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
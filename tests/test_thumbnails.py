@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import thumbnails
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+
+class TestSelectThumbnail(unittest.TestCase):
+    THUMBS = [
+        {"url": "a", "width": 120, "height": 90},
+        {"url": "b", "width": 1280, "height": 720},
+        {"url": "c", "width": 480, "height": 360},
+        {"url": "d", "width": 1920, "height": 1080},
+        {"url": "e"},
+    ]
+
+    def test_smallest_that_covers_the_target(self):
+        self.assertEqual(thumbnails.select_thumbnail(self.THUMBS, 400, 300)["url"], "c")
+        self.assertEqual(thumbnails.select_thumbnail(self.THUMBS, 640, 360)["url"], "b")
+
+    def test_largest_when_nothing_covers_or_no_target(self):
+        self.assertEqual(thumbnails.select_thumbnail(self.THUMBS, 4000, 0)["url"], "d")
+        self.assertEqual(thumbnails.select_thumbnail(self.THUMBS)["url"], "d")
+
+    def test_unsized_list_uses_preferred_last(self):
+        self.assertEqual(thumbnails.select_thumbnail([{"url": "x"}, {"url": "y"}], 100, 100)["url"], "y")
+        self.assertIsNone(thumbnails.select_thumbnail([]))
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used_by_size(self):
+        cache = thumbnails.LRUCache(10)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        self.assertEqual(cache.get("a"), b"1234")  # "a" pasa a ser el más reciente
+        cache.put("c", b"1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"1234")
+        self.assertEqual(cache.used, 8)
+
+    def test_oversized_values_are_not_cached(self):
+        cache = thumbnails.LRUCache(3)
+        cache.put("a", b"1234")
+        self.assertEqual(len(cache), 0)
+
+
+@unittest.skipIf(cv2 is None, "opencv/numpy no instalados")
+class TestLoadImage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        image = np.zeros((36, 64, 3), np.uint8)
+        image[..., 2] = 255  # rojo en BGR
+        cls.png = cv2.imencode(".png", image)[1].tobytes()
+        png = cls.png
+        cls.requests, cls.ports = [], set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                cls.requests.append(self.path)
+                cls.ports.add(self.client_address[1])
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(png)))
+                self.end_headers()
+                self.wfile.write(png)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.requests.clear()
+        self.ports.clear()
+        patchers = [
+            patch.object(thumbnails, "_bytes_cache", thumbnails.LRUCache(1 << 20)),
+            patch.object(thumbnails, "_image_cache", thumbnails.LRUCache(1 << 24, sizeof=lambda a: a.nbytes)),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_decodes_rgb_float_and_caches_in_memory(self):
+        url = f"{self.base}/a.png"
+        image, source = thumbnails.load_image("Youtube", "abc", url, self.root)
+        self.assertEqual(source, "red")
+        self.assertEqual(image.shape, (36, 64, 3))
+        self.assertEqual(image.dtype, np.float32)
+        np.testing.assert_allclose(image[0, 0], [1.0, 0.0, 0.0])
+
+        again, source = thumbnails.load_image("Youtube", "abc", url, self.root)
+        self.assertEqual(source, "memoria")
+        self.assertIs(again, image)
+        self.assertEqual(self.requests, ["/a.png"])
+
+    def test_bytes_survive_on_disk(self):
+        url = f"{self.base}/b.png"
+        thumbnails.load_image("Youtube", "abc", url, self.root)
+        with patch.object(thumbnails, "_bytes_cache", thumbnails.LRUCache(1 << 20)), \
+             patch.object(thumbnails, "_image_cache", thumbnails.LRUCache(1 << 24, sizeof=lambda a: a.nbytes)):
+            _, source = thumbnails.load_image("Youtube", "abc", url, self.root)
+        self.assertEqual(source, "disco")
+        self.assertEqual(len(self.requests), 1)
+
+    def test_session_reuses_the_connection(self):
+        if not thumbnails._session():
+            self.skipTest("curl_cffi no instalado")
+        for i in range(4):
+            thumbnails.load_image("Youtube", f"v{i}", f"{self.base}/{i}.png")
+        self.assertEqual(len(self.requests), 4)
+        self.assertEqual(len(self.ports), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
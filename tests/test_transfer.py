@@ -0,0 +1,88 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import engine, transfer
+
+
+class TestTransferSettings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_file = Path(self.tmp.name) / "download_settings.json"
+        self.patcher = patch.object(transfer, "SETTINGS_FILE", self.settings_file)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_extractor_defaults(self):
+        settings = transfer.resolve("Youtube")
+        self.assertEqual(settings["concurrent_fragments"], 8)
+        self.assertEqual(settings["http_chunk_size"], "10M")
+        self.assertEqual(transfer.resolve(None)["concurrent_fragments"], 4)
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_defaults_apply_to_match_url_keys(self):
+        # Misma ruta que el nodo: match_url da el ie_key ("TwitchVod"), no el IE_NAME ("twitch:vod")
+        cases = {
+            "https://www.twitch.tv/videos/1234567890": 8,
+            "https://www.twitch.tv/somechannel": 1,
+            "https://www.tiktok.com/@u/video/7234567890123456789": 1,
+        }
+        for url, fragments in cases.items():
+            with self.subTest(url=url):
+                extractor, _ = engine.match_url(url)
+                self.assertEqual(transfer.resolve(extractor)["concurrent_fragments"], fragments)
+
+    def test_file_and_node_overrides(self):
+        self.settings_file.write_text(json.dumps({"youtube": {"concurrent_fragments": 16, "buffer_size": "4M"}}))
+        settings = transfer.resolve("Youtube", {"concurrent_fragments": 0, "http_chunk_size": "auto", "throttled_rate": "50K"})
+        self.assertEqual(settings["concurrent_fragments"], 16)
+        self.assertEqual(settings["buffer_size"], "4M")
+        self.assertEqual(settings["http_chunk_size"], "10M")
+        self.assertEqual(settings["throttled_rate"], "50K")
+
+        settings = transfer.resolve("Youtube", {"concurrent_fragments": 2})
+        self.assertEqual(settings["concurrent_fragments"], 2)
+
+    def test_invalid_file_is_ignored(self):
+        self.settings_file.write_text("{no es json")
+        self.assertEqual(transfer.resolve("TikTok")["concurrent_fragments"], 1)
+
+    def test_build_args(self):
+        args = transfer.build_args(transfer.resolve("Youtube"))
+        self.assertEqual(args[:2], ["--concurrent-fragments", "8"])
+        self.assertIn("--throttled-rate", args)
+        self.assertNotIn("--downloader", args)
+
+    def test_missing_external_downloader_falls_back_to_native(self):
+        with patch.object(transfer.shutil, "which", return_value=None):
+            args = transfer.build_args(transfer.resolve(None, {"external_downloader": "aria2c"}))
+        self.assertNotIn("--downloader", args)
+
+        with patch.object(transfer.shutil, "which", return_value="/usr/bin/aria2c"):
+            args = transfer.build_args(transfer.resolve(None, {"external_downloader": "aria2c"}))
+        self.assertIn("--downloader", args)
+
+    @unittest.skipUnless(engine.is_available(), "yt-dlp no instalado")
+    def test_args_are_accepted_by_yt_dlp(self):
+        import yt_dlp
+        settings = transfer.resolve("Youtube", {"external_downloader": "aria2c"})
+        settings["downloader_args"] = "-x 16 -s 16"
+        with patch.object(transfer.shutil, "which", return_value="/usr/bin/aria2c"):
+            opts = yt_dlp.parse_options(transfer.build_args(settings)).ydl_opts
+        self.assertEqual(opts["concurrent_fragment_downloads"], 8)
+        self.assertEqual(opts["http_chunk_size"], 10 * 1024 * 1024)
+        self.assertEqual(opts["throttledratelimit"], 100 * 1024)
+        self.assertEqual(opts["external_downloader"], {"default": "aria2c"})
+
+
+if __name__ == '__main__':
+    unittest.main()
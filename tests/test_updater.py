@@ -0,0 +1,91 @@
+import sys
+import os
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ytdpl import updater
+
+
+class TestUpdateManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.manager = updater.UpdateManager(root / "state.json", root / "wheels")
+        self.versions = {"yt-dlp": "2026.1.1", "yt-dlp-ejs": "0.8.0", "curl-cffi": "0.16.3", "websockets": "17.2"}
+        self.patchers = [
+            patch.object(updater, "installed_versions", side_effect=lambda: dict(self.versions)),
+            patch.object(updater, "unload_yt_dlp"),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp.cleanup()
+
+    def fake_pip_download(self, cmd, **kwargs):
+        dest = Path(cmd[cmd.index("--dest") + 1])
+        (dest / "yt_dlp-2026.2.1-py3-none-any.whl").touch()
+        (dest / "websockets-17.2-py3-none-any.whl").touch()
+
+    def test_check_is_rate_limited(self):
+        self.manager._save_state(last_check=time.time() - 3600)
+        with patch.object(updater.threading, "Thread") as mock_thread:
+            self.assertFalse(self.manager.request_update(interval_hours=24))
+            mock_thread.assert_not_called()
+
+    def test_update_is_applied_only_between_jobs(self):
+        with patch.object(updater.subprocess, "run", side_effect=self.fake_pip_download), \
+                patch.object(updater.subprocess, "check_call") as mock_install:
+            with self.manager.job():
+                self.assertTrue(self.manager.request_update(interval_hours=0))
+                self.manager._check_thread.join(5)
+                # Hay un trabajo activo: un segundo trabajo concurrente no debe instalar nada
+                with self.manager.job():
+                    pass
+                mock_install.assert_not_called()
+
+            with self.manager.job():
+                pass
+
+        mock_install.assert_called_once()
+        cmd = mock_install.call_args[0][0]
+        self.assertIn("--no-index", cmd)
+        updater.unload_yt_dlp.assert_called_once()
+        self.assertEqual(self.manager.load_state()["available"]["yt-dlp"], "2026.2.1")
+
+    def test_known_good_is_pinned_for_rollback(self):
+        self.manager.mark_good()
+        self.manager._pending = "update"
+        with patch.object(updater.subprocess, "check_call"):
+            with self.manager.job():
+                pass
+        self.assertEqual(self.manager.load_state()["pinned"], self.versions)
+
+        # La versión nueva se instaló y falla: el rollback reinstala las fijadas
+        pinned = dict(self.versions)
+        self.versions["yt-dlp"] = "2026.2.1"
+        with patch.object(updater.subprocess, "check_call") as mock_install:
+            self.assertTrue(self.manager.request_rollback())
+            with self.manager.job():
+                pass
+        cmd = mock_install.call_args[0][0]
+        self.assertIn(f"yt-dlp=={pinned['yt-dlp']}", cmd)
+
+    def test_wheel_versions(self):
+        wheels = Path(self.tmp.name) / "w"
+        wheels.mkdir()
+        (wheels / "curl_cffi-0.17.0-cp39-abi3-manylinux_2_17_x86_64.whl").touch()
+        (wheels / "requests-2.32.0-py3-none-any.whl").touch()
+        self.assertEqual(updater.wheel_versions(wheels), {"curl-cffi": "0.17.0"})
+
+
+if __name__ == '__main__':
+    unittest.main()
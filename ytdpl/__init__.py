@@ -0,0 +1,17 @@
+"""Subsistemas internos del nodo ComfyUI-Ytdpl.
+
+Los submódulos se cargan en el primer acceso (`ytdpl.cache`, `ytdpl.engine`...)
+para que importar el nodo durante el arranque de ComfyUI no cargue nada pesado.
+"""
+import importlib
+
+
+def __getattr__(name):
+    if name.startswith("_"):
+        raise AttributeError(name)
+    try:
+        return importlib.import_module(f"{__name__}.{name}")
+    except ModuleNotFoundError as e:
+        if e.name == f"{__name__}.{name}":
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+        raise
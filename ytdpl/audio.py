@@ -0,0 +1,116 @@
+"""Decodificación de audio a una forma de onda float32 con una sola tubería.
+
+Un único `ffmpeg` lee la mejor pista de audio del archivo tal cual se
+descargó (opus/webm, m4a...), la remuestrea y mezcla a la frecuencia y número
+de canales pedidos y escribe PCM float32 por stdout. Los bytes se leen
+directamente (`readinto`) sobre un buffer numpy preasignado con la duración
+que da `ytdpl.probe`, así que no hay archivo intermedio ni segunda
+transcodificación. El recorte por inicio y la normalización de pico se hacen
+en numpy sobre ese mismo buffer.
+"""
+import subprocess
+import threading
+from collections import deque
+
+CHANNEL_MODES = {"original": 0, "mono": 1, "stereo": 2}
+DECODE_TIMEOUT = 3600
+# Bloque de lectura de la tubería
+READ_CHUNK = 1 << 20
+
+
+def decode_command(path, sample_rate=0, channels=0, end_time=0.0):
+    """Comando ffmpeg que emite PCM f32le intercalado por stdout."""
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a:0", "-vn", "-sn", "-dn"]
+    if end_time and end_time > 0:
+        # No se decodifica más allá del final pedido
+        cmd += ["-t", f"{end_time:.6f}"]
+    if channels:
+        cmd += ["-ac", str(int(channels))]
+    if sample_rate:
+        cmd += ["-ar", str(int(sample_rate))]
+    return cmd + ["-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"]
+
+
+def source_layout(path):
+    """`(sample_rate, channels, duration)` de la pista de audio según el sondeo cacheado."""
+    from . import probe
+
+    info = probe.probe(path)
+    audio = next((s for s in info["streams"] if s.get("type") == "audio"), None)
+    if audio is None:
+        raise Exception(f"❌ El archivo no tiene ninguna pista de audio: {path}")
+    return int(audio.get("sample_rate") or 0), int(audio.get("channels") or 0), float(info["duration"] or 0.0)
+
+
+def normalize_peak(waveform, peak=1.0):
+    """Escala en sitio para que el máximo absoluto sea `peak`."""
+    import numpy as np
+
+    current = float(np.max(np.abs(waveform))) if waveform.size else 0.0
+    if current > 0:
+        waveform *= np.float32(peak / current)
+    return waveform
+
+
+def load_waveform(path, sample_rate=0, channels=0, start_time=0.0, end_time=0.0, normalize=False, peak=1.0):
+    """Decodifica el audio a un array float32 `[canales, muestras]`.
+
+    `sample_rate`/`channels` a 0 conservan los del archivo. Devuelve
+    `(waveform, sample_rate)`.
+    """
+    import numpy as np
+
+    src_rate, src_channels, duration = source_layout(path)
+    out_rate = int(sample_rate or src_rate)
+    out_channels = int(channels or src_channels)
+    if not out_rate or not out_channels:
+        raise Exception(f"❌ No se pudo determinar la frecuencia o los canales del audio: {path}")
+
+    limit = end_time if end_time and end_time > 0 else duration
+    # Capacidad estimada (+1 s de margen); se amplía si el contenedor mentía sobre la duración
+    frames_capacity = max(1, int((limit + 1.0) * out_rate))
+    buffer = np.empty(frames_capacity * out_channels, dtype=np.float32)
+    view = memoryview(buffer).cast("B")
+    filled = 0
+
+    proc = subprocess.Popen(decode_command(path, out_rate, out_channels, end_time),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stderr se vacía en paralelo: con muchos avisos (archivo dañado) ffmpeg se bloquearía
+    # escribiéndolo mientras aquí se espera a stdout. Sólo se guarda la cola para el error
+    tail = deque(maxlen=20)
+    reader = threading.Thread(target=lambda: tail.extend(proc.stderr), name="ytdpl-audio-log", daemon=True)
+    reader.start()
+    try:
+        while True:
+            if filled == len(view):
+                grown = np.empty(len(buffer) * 2, dtype=np.float32)
+                grown[:len(buffer)] = buffer
+                buffer = grown
+                view = memoryview(buffer).cast("B")
+            n = proc.stdout.readinto(view[filled:filled + READ_CHUNK])
+            if not n:
+                break
+            filled += n
+        proc.wait(timeout=DECODE_TIMEOUT)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        reader.join(timeout=5)
+    if proc.returncode != 0:
+        detail = b"".join(tail).decode("utf-8", "replace").strip()[-300:]
+        raise Exception(f"❌ ffmpeg no pudo decodificar el audio: {detail}")
+
+    frames = filled // (4 * out_channels)
+    # Vista [muestras, canales] sobre lo decodificado, recortada por el inicio
+    samples = buffer[:frames * out_channels].reshape(frames, out_channels)
+    first = min(frames, int(round(start_time * out_rate))) if start_time and start_time > 0 else 0
+    samples = samples[first:]
+    if not len(samples):
+        raise Exception("❌ No se decodificó ningún audio en el rango pedido.")
+
+    # [canales, muestras] contiguo, como espera el tipo AUDIO de ComfyUI
+    waveform = np.ascontiguousarray(samples.T)
+    if normalize:
+        normalize_peak(waveform, peak)
+    return waveform, out_rate
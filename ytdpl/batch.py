@@ -0,0 +1,87 @@
+"""Descarga por lotes con un pool de workers acotado y límites por host."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+def parse_url_list(text):
+    """Una URL por línea; ignora líneas vacías y comentarios `#`."""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+
+def host_of(url):
+    """Host normalizado para agrupar límites (`www.` y `m.` cuentan como el mismo sitio)."""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+class HostLimiter:
+    """Semáforo por host: como mucho `limit` descargas simultáneas contra el mismo sitio."""
+
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def slot(self, url):
+        host = host_of(url)
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+        return sem
+
+
+def run_batch(urls, worker, max_workers=4, per_host_limit=2):
+    """Ejecuta `worker(url)` para cada URL y devuelve los resultados en el orden de entrada.
+
+    Cada resultado es `{"index", "url", "ok", "result" | "error"}`; un fallo no
+    detiene el resto del lote (equivalente a `--ignore-errors`).
+    """
+    limiter = HostLimiter(per_host_limit)
+
+    def run_one(index, url):
+        with limiter.slot(url):
+            try:
+                return {"index": index, "url": url, "ok": True, "result": worker(url)}
+            except Exception as e:
+                print(f"❌ [LOTE] Elemento {index + 1} falló ({url}): {e}")
+                return {"index": index, "url": url, "ok": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="ytdpl-batch") as pool:
+        futures = [pool.submit(run_one, i, url) for i, url in enumerate(urls)]
+        return [f.result() for f in futures]
+
+
+def expand_urls(urls, expand, needs_expansion, max_workers=4, per_host_limit=2):
+    """Sustituye cada playlist de `urls` por sus entradas, manteniendo el orden.
+
+    Sólo se lista lo que `needs_expansion(url)` marca (un vídeo suelto no cuesta
+    ninguna extracción), en paralelo y con los mismos límites que las descargas.
+    `expand(url)` devuelve la lista de URLs de las entradas.
+    """
+    pending = [i for i, url in enumerate(urls) if needs_expansion(url)]
+
+    def list_entries(url):
+        try:
+            return expand(url)
+        except Exception as e:
+            print(f"⚠️ [LOTE] No se pudo listar {url} como playlist: {e}")
+            return [url]
+
+    listed = {}
+    if pending:
+        results = run_batch([urls[i] for i in pending], list_entries, max_workers, per_host_limit)
+        listed = {i: item["result"] for i, item in zip(pending, results)}
+    expanded = []
+    for i, url in enumerate(urls):
+        expanded.extend(listed.get(i, [url]))
+    return expanded
@@ -0,0 +1,100 @@
+"""Caché local de descargas direccionada por contenido.
+
+Cada entrada se guarda como un JSON independiente en `output/ytdpl/_cache`,
+nombrado con el hash de (extractor, id, formato, contenedor). Así una consulta
+es O(1), no hace falta cargar un índice global y varias instancias pueden
+escribir a la vez con reemplazos atómicos.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIRNAME = "_cache"
+
+# Campos del info dict que se conservan para reconstruir las salidas del nodo
+META_KEYS = (
+    "id", "extractor_key", "format_id", "ext", "title", "description",
+    "thumbnail", "uploader", "channel", "duration", "webpage_url",
+)
+
+# Bytes leídos del inicio y del final del archivo para la huella rápida
+FINGERPRINT_SAMPLE = 1 << 20
+
+
+def cache_key(extractor, video_id, format_spec, container):
+    """Clave estable de una descarga: mismo vídeo, mismo formato, mismo contenedor."""
+    raw = json.dumps([extractor, str(video_id), format_spec, container])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path, size=None):
+    """Huella de integridad barata: tamaño + primer y último MiB del archivo."""
+    size = os.path.getsize(path) if size is None else size
+    m = hashlib.sha256(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        m.update(f.read(FINGERPRINT_SAMPLE))
+        if size > FINGERPRINT_SAMPLE:
+            f.seek(max(size - FINGERPRINT_SAMPLE, FINGERPRINT_SAMPLE))
+            m.update(f.read(FINGERPRINT_SAMPLE))
+    return m.hexdigest()
+
+
+class DownloadCache:
+    """Índice persistente `clave -> archivo final + metadatos`.
+
+    `root` es el directorio de salida del nodo (un `Path`).
+    """
+
+    def __init__(self, root):
+        self.cache_dir = root / CACHE_DIRNAME
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Devuelve la entrada si el archivo sigue intacto en disco; si no, la descarta."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            size = os.path.getsize(entry["path"])
+            intact = size == entry["size"] and file_fingerprint(entry["path"], size) == entry["fingerprint"]
+        except (OSError, KeyError):
+            intact = False
+
+        if not intact:
+            self.discard(key)
+            return None
+        return entry
+
+    def put(self, keys, path, meta):
+        """Registra `path` bajo todas las `keys` y devuelve la entrada guardada."""
+        path = str(path)
+        size = os.path.getsize(path)
+        entry = {
+            "path": path,
+            "size": size,
+            "fingerprint": file_fingerprint(path, size),
+            "created": time.time(),
+            "meta": {k: meta.get(k) for k in META_KEYS if meta.get(k) is not None},
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for key in dict.fromkeys(keys):
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        return entry
+
+    def discard(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
@@ -0,0 +1,249 @@
+"""URLs canónicas e índice de alias.
+
+`canonicalize` normaliza una URL con reglas por sitio (registrables con
+`rule`): quita parámetros de seguimiento (`si`, `utm_*`, `igsh`...), unifica
+hosts (`m.`, `youtu.be`, `x.com`) y formas equivalentes (`/shorts/X`,
+`/embed/X`, `/photo/` de TikTok). Para los sitios conocidos la regla da
+además `(extractor, id)` sin recorrer los extractores de yt-dlp ni tocar la
+red.
+
+El índice de alias (`output/ytdpl/_aliases`, un JSON por URL) recuerda a qué
+vídeo resolvió cada URL vista; así incluso un enlace corto (`vm.tiktok.com`)
+que sólo se resuelve con una petición encuentra la descarga previa la
+segunda vez. En hosts sin regla la URL original, sin normalizar, es a la
+vez la clave y lo que se descarga (`request_url`).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+ALIASES_DIRNAME = "_aliases"
+
+# Parámetros que sólo sirven para seguimiento / compartir
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "igsh", "si", "feature", "pp",
+    "ref_src", "ref_url", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "share_source",
+    "share_medium", "share_app_id", "is_from_webapp", "sender_device", "web_id", "_r", "_t",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+MATCH_MEMO_SIZE = 1024
+
+_rules = {}
+_match_memo = OrderedDict()
+_match_lock = threading.Lock()
+
+
+def rule(*hosts):
+    """Registra una regla para `hosts` (y sus subdominios).
+
+    La regla recibe `(partes, query)` —el resultado de `urlsplit` y la lista
+    de parámetros ya sin seguimiento— y devuelve `(url_canónica, identidad)`,
+    con identidad `(extractor, id)` o None, o None si no reconoce la URL.
+    """
+    def register(fn):
+        for host in hosts:
+            _rules[host] = fn
+        return fn
+    return register
+
+
+def _strip_tracking(query):
+    return [(k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+
+
+def _find_rule(host):
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        fn = _rules.get(".".join(labels[i:]))
+        if fn is not None:
+            return fn
+    return None
+
+
+def _canonicalize(url):
+    """`(url_canónica, (extractor, id) | None, reconocida por una regla)`."""
+    url = url.strip()
+    if not url:
+        return url, None, False
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((parts.scheme == "https" and parts.port == 443) or (parts.scheme == "http" and parts.port == 80)):
+        host = f"{host}:{parts.port}"
+    query = _strip_tracking(parts.query)
+    parts = parts._replace(scheme=parts.scheme.lower(), netloc=host, fragment="")
+
+    fn = _find_rule(host.split(":")[0])
+    if fn is not None:
+        result = fn(parts, query)
+        if result is not None:
+            return (*result, True)
+    return urlunsplit(parts._replace(query=urlencode(query))), None, False
+
+
+def canonicalize_with_identity(url):
+    """`(url_canónica, (extractor, id) | None)` sin tocar la red."""
+    canonical, identity, _ = _canonicalize(url)
+    return canonical, identity
+
+
+def canonicalize(url):
+    return canonicalize_with_identity(url)[0]
+
+
+def request_url(url):
+    """URL que identifica la petición y se entrega a yt-dlp.
+
+    Es la canónica sólo si la reconoce una regla del sitio. En hosts sin regla
+    no se sabe si `pp`, `si` o `_t` son de seguimiento o parte del enlace, así
+    que la URL original sirve tanto de clave (caché, single-flight, bloqueos,
+    IS_CHANGED) como de descarga.
+    """
+    canonical, _, ruled = _canonicalize(url)
+    return canonical if ruled else url.strip()
+
+
+# === REGLAS POR SITIO ===
+
+_YT_ID = r"[\w-]{11}"
+
+
+@rule("youtube.com", "youtu.be", "youtube-nocookie.com")
+def _youtube(parts, query):
+    params = dict(query)
+    video_id = None
+    if parts.netloc == "youtu.be":
+        video_id = parts.path.strip("/").split("/")[0]
+    elif parts.path == "/watch":
+        video_id = params.get("v")
+    else:
+        m = re.match(rf"^/(?:shorts|embed|live|v|e)/({_YT_ID})(?:[/?]|$)", parts.path)
+        if m:
+            video_id = m.group(1)
+    if not video_id or not re.fullmatch(_YT_ID, video_id):
+        # Canales, playlists...: sólo se unifica el host
+        return urlunsplit(parts._replace(netloc="www.youtube.com", query=urlencode(query))), None
+
+    canonical = f"https://www.youtube.com/watch?v={video_id}"
+    if params.get("list"):
+        # Con --yes-playlist la lista cambia lo que se descarga: se conserva y la identidad la decide yt-dlp
+        return f"{canonical}&list={params['list']}", None
+    return canonical, ("Youtube", video_id)
+
+
+@rule("tiktok.com")
+def _tiktok(parts, query):
+    m = re.match(r"^/@([\w.-]*)/(?:video|photo)/(\d+)", parts.path) or re.match(r"^/v/(\d+)\.html", parts.path)
+    if not m:
+        # Enlaces cortos (vm./vt.): sólo la red los resuelve; el índice de alias los recuerda
+        return urlunsplit(parts._replace(query="")), None
+    user, video_id = (m.group(1), m.group(2)) if m.lastindex == 2 else ("", m.group(1))
+    # /photo/ no lo reconoce yt-dlp; /video/ entrega el mismo medio
+    return f"https://www.tiktok.com/@{user}/video/{video_id}", ("TikTok", video_id)
+
+
+@rule("instagram.com")
+def _instagram(parts, query):
+    m = re.match(r"^(?:/[^/]+)?/(p|reels?|tv)/([\w-]+)", parts.path)
+    if not m:
+        return None
+    kind = "reel" if m.group(1).startswith("reel") else m.group(1)
+    return f"https://www.instagram.com/{kind}/{m.group(2)}/", ("Instagram", m.group(2))
+
+
+@rule("twitter.com", "x.com")
+def _twitter(parts, query):
+    m = re.match(r"^/(?:[^/]+|i/web)/status(?:es)?/(\d+)(/(?:video|photo)/\d+)?", parts.path)
+    if not m:
+        return None
+    return f"https://x.com/i/status/{m.group(1)}{m.group(2) or ''}", ("Twitter", m.group(1))
+
+
+# === IDENTIDAD ===
+
+def _match(url):
+    """`engine.match_url` memorizado: recorrer todos los extractores cuesta milisegundos."""
+    from . import engine
+
+    with _match_lock:
+        if url in _match_memo:
+            _match_memo.move_to_end(url)
+            return _match_memo[url]
+    matched = engine.match_url(url)
+    with _match_lock:
+        _match_memo[url] = matched
+        while len(_match_memo) > MATCH_MEMO_SIZE:
+            _match_memo.popitem(last=False)
+    return matched
+
+
+def identify(url, root=None):
+    """`(request_url, (extractor, id) | None)`: regla del sitio, índice de alias y, por último, yt-dlp.
+
+    El índice de alias sólo se consulta para URLs que reconoce una regla: en
+    el resto, dos URLs que difieren en un parámetro pueden ser vídeos distintos.
+    """
+    canonical, identity, ruled = _canonicalize(url)
+    if not ruled:
+        canonical = url.strip()
+        return canonical, (_match(canonical) if canonical else None)
+    if identity is None and root is not None:
+        aliases = AliasIndex(root)
+        entry = aliases.lookup(url) or aliases.lookup(canonical)
+        if entry is not None:
+            identity = (entry["extractor"], entry["id"])
+    if identity is None and canonical:
+        identity = _match(canonical)
+    return canonical, identity
+
+
+def alias_key(url):
+    return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+
+class AliasIndex:
+    """Índice persistente `URL vista -> (extractor, id)`.
+
+    `root` es el directorio de salida del nodo (un `Path`).
+    """
+
+    def __init__(self, root):
+        self.alias_dir = root / ALIASES_DIRNAME
+
+    def _entry_path(self, url):
+        return self.alias_dir / f"{alias_key(url)}.json"
+
+    def lookup(self, url):
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def record(self, urls, extractor, video_id, canonical=None):
+        """Asocia al vídeo cada URL de `urls` que reconoce una regla del sitio (sólo escribe las que cambian)."""
+        if not extractor or video_id is None:
+            return
+        urls = [u.strip() for u in urls if u and u.strip() and _canonicalize(u)[2]]
+        if not urls:
+            return
+        self.alias_dir.mkdir(parents=True, exist_ok=True)
+        for url in dict.fromkeys(urls):
+            current = self.lookup(url)
+            if current and current.get("extractor") == extractor and current.get("id") == str(video_id):
+                continue
+            entry = {"url": url, "canonical": canonical or canonicalize(url), "extractor": extractor,
+                     "id": str(video_id), "recorded": time.time()}
+            entry_path = self._entry_path(url)
+            tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
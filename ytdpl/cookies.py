@@ -0,0 +1,214 @@
+"""Almacén de cookies: jars Netscape parseados una vez e indexados por dominio.
+
+Cada `.txt` de `input/cookies` se parsea sólo cuando cambia su mtime o su
+tamaño; el resto de consultas (lista para el desplegable, selección por
+dominio) se resuelven desde memoria. Para cada jar se guarda, por dominio, la
+caducidad más lejana de sus cookies, así que antes de lanzar yt-dlp se sabe si
+un jar está caducado o no tiene nada que ver con el sitio de la URL.
+
+Las cookies pegadas en el nodo se escriben en `cookies_pegadas.txt` sólo
+cuando cambia su contenido (por hash), no en cada ejecución.
+"""
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+AUTO = "Auto"
+NONE = "Ninguno"
+PASTED_NAME = "cookies_pegadas.txt"
+
+# Hosts cuya sesión vive en otro dominio
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "x.com": "twitter.com",
+}
+
+HTTPONLY_PREFIX = "#HttpOnly_"
+
+
+def parse_jar(text):
+    """Cookies de un jar Netscape: `[{domain, path, secure, expires, name, value}]`."""
+    cookies = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(HTTPONLY_PREFIX):
+            line = line[len(HTTPONLY_PREFIX):]
+        elif not line or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) < 7:
+            continue
+        try:
+            expires = int(float(fields[4] or 0))
+        except ValueError:
+            continue
+        cookies.append({
+            "domain": fields[0].lstrip(".").lower(),
+            "path": fields[2],
+            "secure": fields[3].upper() == "TRUE",
+            "expires": expires,
+            "name": fields[5],
+            "value": fields[6],
+        })
+    return cookies
+
+
+def summarize(cookies):
+    """Por dominio: `{"expires": caducidad más lejana, "session": hay cookies de sesión, "count"}`."""
+    domains = {}
+    for cookie in cookies:
+        entry = domains.setdefault(cookie["domain"], {"expires": 0, "session": False, "count": 0})
+        entry["count"] += 1
+        if cookie["expires"] <= 0:
+            entry["session"] = True
+        else:
+            entry["expires"] = max(entry["expires"], cookie["expires"])
+    return domains
+
+
+def host_candidates(url_or_host):
+    """Dominios con los que puede casar el host: él mismo y sus sufijos (`a.b.com`, `b.com`)."""
+    host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+    host = (host or "").lower().rstrip(".")
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    host = HOST_ALIASES.get(host, host)
+    labels = host.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)] or [host]
+
+
+def content_hash(text):
+    # Los saltos de línea se normalizan: al releer en modo texto "\r\n" llega como "\n"
+    return hashlib.sha256(text.replace("\r\n", "\n").encode("utf-8")).hexdigest()
+
+
+class CookieStore:
+    """Jars de un directorio, reparseados sólo si cambian."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._names = []
+        self._jars = {}
+        self._by_domain = {}
+
+    def refresh(self):
+        """Relee el directorio; sólo parsea los jars nuevos o modificados."""
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith(".txt")]
+            except OSError:
+                entries = []
+            seen = set()
+            for entry in entries:
+                seen.add(entry.name)
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                current = self._jars.get(entry.name)
+                if current and current["mtime"] == stat.st_mtime_ns and current["size"] == stat.st_size:
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8", errors="replace") as f:
+                        text = f.read()
+                except OSError:
+                    continue
+                self._jars[entry.name] = {
+                    "name": entry.name,
+                    "path": entry.path,
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "hash": content_hash(text),
+                    "domains": summarize(parse_jar(text)),
+                }
+            for name in set(self._jars) - seen:
+                del self._jars[name]
+
+            by_domain = {}
+            for jar in self._jars.values():
+                for domain in jar["domains"]:
+                    by_domain.setdefault(domain, []).append(jar["name"])
+            self._by_domain = by_domain
+            self._names = sorted(self._jars)
+            try:
+                self._dir_mtime = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                self._dir_mtime = None
+
+    def names(self):
+        """Nombres de los jars; sólo relee si cambió el directorio (altas y bajas de archivos)."""
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return []
+        if dir_mtime != self._dir_mtime:
+            self.refresh()
+        return list(self._names)
+
+    def jar(self, name):
+        self.refresh()
+        return self._jars.get(name)
+
+    def check(self, name, url, now=None):
+        """Motivo por el que el jar no sirve para `url` (o None si sirve)."""
+        jar = self.jar(name)
+        if jar is None:
+            return "no existe"
+        return self._check(jar, url, time.time() if now is None else now)
+
+    def _check(self, jar, url, now):
+        candidates = host_candidates(url)
+        matching = [jar["domains"][d] for d in candidates if d in jar["domains"]]
+        if not matching:
+            return f"no tiene cookies de {candidates[-1]}"
+        if not any(d["session"] or d["expires"] > now for d in matching):
+            latest = max(d["expires"] for d in matching)
+            return f"caducó el {time.strftime('%Y-%m-%d', time.localtime(latest))}"
+        return None
+
+    def select(self, url, now=None):
+        """Ruta del jar válido más reciente para el host de `url`, o None."""
+        now = time.time() if now is None else now
+        self.refresh()
+        jars, by_domain = self._jars, self._by_domain
+        best = None
+        for domain in host_candidates(url):
+            for name in by_domain.get(domain, ()):
+                jar = jars.get(name)
+                if jar is None or (best is not None and jar["mtime"] <= best["mtime"]):
+                    continue
+                if self._check(jar, url, now) is None:
+                    best = jar
+        return best["path"] if best else None
+
+    def save_pasted(self, text, name=PASTED_NAME):
+        """Escribe las cookies pegadas sólo si su contenido cambió. Devuelve `(ruta, escrito)`."""
+        path = os.path.join(self.directory, name)
+        jar = self.jar(name)
+        if jar is not None and jar["hash"] == content_hash(text):
+            return path, False
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        return path, True
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(directory):
+    """Almacén compartido (por proceso) de `directory`."""
+    key = os.path.abspath(str(directory))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CookieStore(key)
+        return store
@@ -0,0 +1,114 @@
+"""Verificación perezosa de dependencias en el primer uso del nodo.
+
+La comprobación completa (`find_spec` de cada módulo, incluidos los plugins
+de `yt_dlp_plugins`, y el `pip install` de lo que falte) sólo se ejecuta si
+cambia el intérprete o la versión de algún paquete respecto al sello guardado
+en `.ytdpl_deps.json`. Nada de esto ocurre al importar el nodo.
+"""
+import importlib.util
+import json
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+# 🚀 FIX: Mapeo exacto entre el nombre en pip y el módulo interno del plugin
+REQUIREMENTS = [
+    ("yt-dlp", "yt_dlp"),
+    ("curl-cffi", "curl_cffi"),
+    ("numpy", "numpy"),
+    ("opencv-python", "cv2"),
+    ("websockets", "websockets"),
+    ("playwright", "playwright"),
+    ("yt-dlp-ejs", "yt_dlp_ejs"),
+    ("bgutil-ytdlp-pot-provider", "yt_dlp_plugins.extractor.getpot_bgutil")
+]
+
+STAMP_FILE = Path(__file__).parent.parent / ".ytdpl_deps.json"
+DENO_DIR = Path.home() / ".deno" / "bin"
+
+_lock = threading.Lock()
+_verified = False
+
+
+def installed_versions():
+    """Versiones instaladas según los metadatos de distribución (None si falta)."""
+    from importlib import metadata
+
+    versions = {}
+    for pkg, _ in REQUIREMENTS:
+        try:
+            versions[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            versions[pkg] = None
+    return versions
+
+
+def stamp_state():
+    return {"python": sys.executable, "version": sys.version, "packages": installed_versions()}
+
+
+def _read_stamp():
+    try:
+        with open(STAMP_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stamp(state):
+    try:
+        with open(STAMP_FILE, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+    except OSError as e:
+        print(f"⚠️ ComfyUI-Ytdpl: No se pudo guardar el sello de dependencias: {e}")
+
+
+def install_missing_requirements():
+    missing = []
+    for pkg, imp in REQUIREMENTS:
+        try:
+            if importlib.util.find_spec(imp) is None:
+                missing.append(pkg)
+        except ModuleNotFoundError:
+            missing.append(pkg)
+
+    if missing:
+        print(f"📥 ComfyUI-Ytdpl: Instalando dependencias faltantes: {missing}")
+        try:
+            # 🚀 FIX: Pasamos el array limpio 'missing' sin forzar sufijos problemáticos
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet", *missing])
+            print("✅ Dependencias instaladas correctamente.")
+            if "playwright" in missing:
+                print("📥 Instalando navegadores de Playwright...")
+                subprocess.check_call([sys.executable, "-m", "playwright", "install", "chromium"])
+                print("✅ Navegadores de Playwright instalados.")
+        except Exception as e:
+            print(f"❌ Error al instalar dependencias: {e}")
+    return missing
+
+
+def ensure_requirements():
+    """Verifica las dependencias una vez por proceso, saltándose el trabajo si el sello coincide."""
+    global _verified
+    if _verified:
+        return
+    with _lock:
+        if _verified:
+            return
+        state = stamp_state()
+        if _read_stamp() != state:
+            # Si se instaló algo, las versiones cambiaron: el próximo arranque verificará y sellará
+            if not install_missing_requirements():
+                _write_stamp(state)
+        _verified = True
+
+
+def js_runtime_args():
+    """Apunta yt-dlp al Deno de `~/.deno/bin` (vital para WSL2) sin modificar el PATH global."""
+    if shutil.which("deno"):
+        return []
+    if (DENO_DIR / "deno").exists() or (DENO_DIR / "deno.exe").exists():
+        return ["--js-runtimes", f"deno:{DENO_DIR}"]
+    return []
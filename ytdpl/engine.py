@@ -0,0 +1,187 @@
+"""Motor de descarga en proceso basado en la API de yt-dlp (YoutubeDL).
+
+Mantiene `yt_dlp` cargado dentro del proceso de ComfyUI y resuelve cada URL con
+una única extracción: la ruta final, el fallback de calidad y los metadatos
+salen del mismo info dict, sin lanzar intérpretes adicionales.
+"""
+import copy
+import importlib.util
+from collections import deque
+
+
+class YtdlpLogger:
+    """Reenvía los mensajes de yt-dlp a la consola y conserva los últimos errores.
+
+    Con un `tracker` (ver `progress.ProgressTracker`) las líneas también van a
+    su registro acotado.
+    """
+
+    def __init__(self, tracker=None, max_errors=50):
+        self.errors = deque(maxlen=max_errors)
+        self.tracker = tracker
+
+    def _emit(self, msg):
+        print(msg)
+        if self.tracker is not None:
+            self.tracker.log.append(msg)
+
+    def debug(self, msg):
+        # yt-dlp envía los mensajes normales por debug; los verbose llevan prefijo
+        if not msg.startswith("[debug] "):
+            self._emit(msg)
+
+    def info(self, msg):
+        self._emit(msg)
+
+    def warning(self, msg):
+        self._emit(msg)
+
+    def error(self, msg):
+        self._emit(msg)
+        self.errors.append(msg)
+
+
+def is_available():
+    """Indica si `yt_dlp` puede importarse en este intérprete."""
+    try:
+        return importlib.util.find_spec("yt_dlp") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def final_entry(info):
+    """Devuelve el último vídeo realmente descargado (recorre playlists anidadas)."""
+    if not info:
+        return None
+    if info.get("_type") in ("playlist", "multi_video"):
+        for entry in reversed(list(info.get("entries") or [])):
+            found = final_entry(entry)
+            if found is not None:
+                return found
+        return None
+    return info if info.get("requested_downloads") else None
+
+
+def download(args, url, fallback_format=None, tracker=None, format_selector=None):
+    """Extrae `url` una sola vez y la descarga con las opciones CLI `args`.
+
+    `args` son los mismos flags que recibiría `python -m yt_dlp` (sin la URL),
+    así ambos motores comparten configuración. Si el formato pedido no existe
+    y se indica `fallback_format`, la selección se repite sobre la misma
+    extracción en lugar de volver a consultar el sitio.
+
+    `format_selector` (ver `formats.selector`) sustituye al `-f` de `args`:
+    elige en una sola pasada sobre la lista de formatos y no necesita fallback.
+
+    `tracker` recibe los eventos de progreso y post-procesado estructurados.
+
+    Devuelve `(ruta_final, info_dict)` del último vídeo descargado.
+    """
+    import yt_dlp
+    from yt_dlp.utils import DownloadError, ExtractorError
+
+    ydl_opts = yt_dlp.parse_options(list(args)).ydl_opts
+    logger = YtdlpLogger(tracker)
+    ydl_opts["logger"] = logger
+    if format_selector is not None:
+        ydl_opts["format"] = format_selector
+        fallback_format = None
+    if tracker is not None:
+        ydl_opts["progress_hooks"] = [tracker.download_hook]
+        ydl_opts["postprocessor_hooks"] = [tracker.postprocessor_hook]
+        # El tracker imprime un resumen periódico en lugar de una línea por actualización
+        ydl_opts["noprogress"] = True
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ie_result = ydl.extract_info(url, download=False, process=False)
+            if ie_result is None:
+                raise Exception("YT_DLP_ERROR: " + "\n".join(logger.errors))
+
+            # Sólo los vídeos sueltos admiten reintento: las playlists traen entradas perezosas
+            single_video = ie_result.get("_type", "video") == "video"
+            pristine = copy.deepcopy(ie_result) if (fallback_format and single_video) else None
+            try:
+                info = ydl.process_ie_result(ie_result, download=True)
+            except (DownloadError, ExtractorError) as e:
+                if pristine is None or "requested format is not available" not in str(e).lower():
+                    raise
+                print(f"⚠️ Formato no disponible. Reintentando con '{fallback_format}' sobre la misma extracción...")
+                logger.errors.clear()
+                ydl.params["format"] = fallback_format
+                ydl.format_selector = ydl.build_format_selector(fallback_format)
+                info = ydl.process_ie_result(pristine, download=True)
+
+            info = ydl.sanitize_info(info)
+    except (DownloadError, ExtractorError) as e:
+        raise Exception(f"YT_DLP_ERROR: {e}")
+
+    # Igual que el CLI con --ignore-errors: cualquier error reportado invalida la ejecución
+    if logger.errors:
+        raise Exception("YT_DLP_ERROR: " + "\n".join(logger.errors))
+
+    entry = final_entry(info)
+    if entry is None:
+        raise Exception("YT_DLP_ERROR: yt-dlp no devolvió ningún archivo descargado.")
+    return entry["requested_downloads"][-1]["filepath"], entry
+
+
+def match_url(url):
+    """Resuelve `url` a `(extractor, id)` sin tocar la red.
+
+    Usa las expresiones regulares de los extractores de yt-dlp; devuelve
+    `None` si sólo el extractor genérico la acepta o si yt-dlp no está instalado.
+    """
+    if not is_available():
+        return None
+    from yt_dlp.extractor import gen_extractor_classes
+
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == "Generic" or not ie.suitable(url):
+            continue
+        video_id = ie.get_temp_id(url)
+        return (ie.ie_key(), video_id) if video_id else None
+    return None
+
+
+def returns_single_video(extractor):
+    """Indica si las URLs del extractor `extractor` (ie_key) son siempre un único vídeo.
+
+    Usa el tipo de resultado que yt-dlp declara por extractor; los que pueden
+    devolver playlists (`YoutubeTab`, `Generic`...) o uno desconocido dan False.
+    """
+    if not extractor or not is_available():
+        return False
+    from yt_dlp.extractor import get_info_extractor
+
+    try:
+        return getattr(get_info_extractor(extractor), "_RETURN_TYPE", None) == "video"
+    except Exception:
+        return False
+
+
+def expand_playlist(url, cookie_path=None):
+    """Lista las URLs de las entradas de una playlist sin extraer cada vídeo.
+
+    Si `url` no es una playlist (o yt-dlp no está disponible en proceso)
+    devuelve `[url]` y la descarga normal se encarga de ella.
+    """
+    if not is_available():
+        return [url]
+    import yt_dlp
+
+    ydl_opts = {"extract_flat": "in_playlist", "quiet": True, "no_warnings": True, "logger": YtdlpLogger()}
+    if cookie_path:
+        ydl_opts["cookiefile"] = str(cookie_path)
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    if not info or info.get("_type") not in ("playlist", "multi_video"):
+        return [url]
+    entries = []
+    for entry in info.get("entries") or []:
+        if entry:
+            entry_url = entry.get("webpage_url") or entry.get("url")
+            if entry_url:
+                entries.append(entry_url)
+    return entries or [url]
@@ -0,0 +1,168 @@
+"""Clasificación tipada de errores de yt-dlp, reintentos y cortacircuitos por host.
+
+`classify` asigna a un error una categoría a partir de los mensajes de
+yt-dlp (las líneas `ERROR:` y los códigos HTTP reales, no cualquier "403"
+que aparezca dentro de una URL o un id). Cada categoría tiene su propia
+política de reintentos con backoff exponencial y jitter.
+
+Los bloqueos (rate limit, captcha/inicio de sesión) alimentan un
+cortacircuitos por host: tras varios seguidos, las descargas siguientes
+contra ese sitio fallan al instante durante un tiempo en lugar de lanzar
+otra extracción condenada; pasado ese tiempo se deja pasar una de prueba.
+"""
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+AUTH_REQUIRED = "auth_required"
+ACCESS_RESTRICTED = "access_restricted"
+GEO_BLOCKED = "geo_blocked"
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+UNAVAILABLE = "unavailable"
+FORMAT_UNAVAILABLE = "format_unavailable"
+UNKNOWN = "unknown"
+
+# Orden de evaluación: lo más específico primero
+PATTERNS = [
+    (GEO_BLOCKED, r"available (in|from) your (country|location)|geo.?restrict|blocked it in your country"),
+    (RATE_LIMITED, r"HTTP Error 429|\b429\b:? Too Many Requests|rate.?limit|too many requests"),
+    # Restricciones de un vídeo concreto (antes que AUTH_REQUIRED: "Sign in to confirm your age")
+    (ACCESS_RESTRICTED, r"private video|this video is private|members.only|join this channel|age.restricted|"
+                        r"confirm your age|inappropriate for some users"),
+    (AUTH_REQUIRED, r"sign in to confirm|captcha|login required|log in to|cookies.{0,40}(required|needed)|"
+                    r"HTTP Error 40[13]|\b40[13]\b:? (Forbidden|Unauthorized)|js challenge|verify (you|that)"),
+    (FORMAT_UNAVAILABLE, r"requested format is not available|no video formats found"),
+    (UNAVAILABLE, r"video unavailable|has been removed|does not exist|HTTP Error 404|\b404\b:? Not Found|"
+                  r"unsupported url|is not a valid url|account.{0,20}terminated|no longer available"),
+    (TRANSIENT, r"HTTP Error 5\d\d|\b5\d\d\b:? (Internal Server Error|Bad Gateway|Service Unavailable|Gateway Time-?out)|"
+                r"connection (reset|refused|aborted)|timed? ?out|temporary failure in name resolution|"
+                r"remote end closed|incompleteread|unable to download video data|eof occurred|"
+                r"network is unreachable|ssl.?error"),
+]
+_COMPILED = [(category, re.compile(pattern, re.IGNORECASE)) for category, pattern in PATTERNS]
+
+RetryPolicy = namedtuple("RetryPolicy", "retries base_delay max_delay")
+
+# Reintentos automáticos por categoría (las de NEEDS_COOKIES se reintentan una vez con cookies nuevas)
+POLICIES = {
+    TRANSIENT: RetryPolicy(3, 2.0, 30.0),
+    RATE_LIMITED: RetryPolicy(2, 15.0, 120.0),
+    AUTH_REQUIRED: RetryPolicy(0, 0.0, 0.0),
+    ACCESS_RESTRICTED: RetryPolicy(0, 0.0, 0.0),
+    GEO_BLOCKED: RetryPolicy(0, 0.0, 0.0),
+    UNAVAILABLE: RetryPolicy(0, 0.0, 0.0),
+    FORMAT_UNAVAILABLE: RetryPolicy(0, 0.0, 0.0),
+    UNKNOWN: RetryPolicy(0, 0.0, 0.0),
+}
+
+NEEDS_COOKIES = (AUTH_REQUIRED, ACCESS_RESTRICTED)
+# Categorías que indican que el sitio nos está bloqueando. Un vídeo privado, de miembros
+# o con restricción de edad es cosa de ese vídeo: no debe cortar el resto del host
+BLOCKING = (RATE_LIMITED, AUTH_REQUIRED)
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 300
+
+
+class DownloadFailed(Exception):
+    """Error de descarga con su categoría (`exc.category`)."""
+
+    def __init__(self, message, category=UNKNOWN):
+        super().__init__(message)
+        self.category = category
+
+
+class CircuitOpen(DownloadFailed):
+    """El cortacircuitos del host está abierto: no se intenta la descarga."""
+
+
+def error_lines(text):
+    """Las líneas `ERROR:` del texto; si no hay, el texto entero."""
+    text = text.replace("YT_DLP_ERROR:", "", 1)
+    lines = [line for line in text.splitlines() if "ERROR:" in line.upper()]
+    return "\n".join(lines) if lines else text
+
+
+def classify(error):
+    """Categoría de un error (excepción o texto de yt-dlp)."""
+    category = getattr(error, "category", None)
+    if category:
+        return category
+    text = error_lines(str(error))
+    for category, pattern in _COMPILED:
+        if pattern.search(text):
+            return category
+    return UNKNOWN
+
+
+def backoff_delay(category, attempt, rng=random.random):
+    """Espera antes del reintento `attempt` (desde 0): exponencial con jitter completo."""
+    policy = POLICIES.get(category, POLICIES[UNKNOWN])
+    ceiling = min(policy.max_delay, policy.base_delay * (2 ** attempt))
+    return ceiling * rng()
+
+
+class CircuitBreaker:
+    """Cortacircuitos por host: cerrado -> abierto tras `threshold` bloqueos seguidos -> semiabierto."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened = {}
+        self._probing = set()
+
+    def before(self, host):
+        """Lanza `CircuitOpen` si el host está bloqueado; en semiabierto deja pasar una sola prueba."""
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return
+            remaining = self.cooldown - (self.clock() - opened)
+            if remaining > 0 or host in self._probing:
+                wait = max(0, int(remaining))
+                raise CircuitOpen(f"🚫 [CORTACIRCUITOS] {host} nos está bloqueando. Se reintentará en ~{wait} s "
+                                  f"(descarga no intentada).", RATE_LIMITED)
+            self._probing.add(host)
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+            self._probing.discard(host)
+
+    def record_failure(self, host, category):
+        """Cuenta un fallo; sólo los bloqueos abren el circuito. Devuelve True si quedó abierto."""
+        with self._lock:
+            probing = host in self._probing
+            self._probing.discard(host)
+            if category not in BLOCKING:
+                if probing:
+                    # La prueba llegó al sitio: el bloqueo ya no aplica
+                    self._opened.pop(host, None)
+                self._failures.pop(host, None)
+                return False
+            failures = self._failures[host] = self._failures.get(host, 0) + 1
+            if probing or failures >= self.threshold:
+                self._opened[host] = self.clock()
+                return True
+            return False
+
+    def state(self, host):
+        with self._lock:
+            if host not in self._opened:
+                return "closed"
+            if self.clock() - self._opened[host] >= self.cooldown:
+                return "half_open"
+            return "open"
+
+
+_breaker = CircuitBreaker()
+
+
+def get_breaker():
+    return _breaker
@@ -0,0 +1,189 @@
+"""Coordinación de descargas idénticas simultáneas (single-flight).
+
+Dentro del proceso, `single_flight` deja que sólo la primera llamada con una
+clave dada ejecute la descarga; las que llegan mientras tanto esperan y
+reciben el mismo resultado (o la misma excepción).
+
+Entre procesos (varias instancias de ComfyUI sobre el mismo `output/ytdpl`,
+incluso por NFS) y entre hilos, `file_lock` toma un bloqueo consultivo POSIX (`lockf`, que
+NFS propaga) sobre `output/ytdpl/_locks/<clave>.lock`. La segunda instancia
+espera a que termine la primera y, al entrar, encuentra el resultado en la
+caché o el archivo ya presente en disco. El sistema operativo libera el
+bloqueo si el proceso muere, así que no quedan bloqueos huérfanos.
+"""
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+LOCKS_DIRNAME = "_locks"
+# Una descarga larga puede tardar; pasado este tiempo se abandona la espera
+LOCK_TIMEOUT = 6 * 3600
+LOCK_POLL = 0.5
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+def flight_key(*parts):
+    """Clave estable a partir de valores serializables en JSON."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def single_flight(key, fn):
+    """Ejecuta `fn()` una sola vez por clave concurrente.
+
+    Devuelve `(resultado, compartido)`; `compartido` es True para las llamadas
+    que reutilizaron el resultado de otra en curso.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+        else:
+            call.waiters += 1
+
+    if not leader:
+        print("⏳ [SINGLE-FLIGHT] La misma descarga ya está en curso en este proceso. Esperando su resultado...")
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    try:
+        call.result = fn()
+        return call.result, False
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _try_lock(f):
+    if fcntl is not None:
+        fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.lockf(f, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Los bloqueos POSIX no excluyen hilos del mismo proceso (y cerrar cualquier descriptor del
+# archivo los libera), así que cada clave lleva además un candado local con contador de uso
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def _acquire_local(key, blocking=True, timeout=-1):
+    with _key_locks_guard:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    if entry[0].acquire(blocking, timeout if blocking else -1):
+        return True
+    _release_local(key, locked=False)
+    return False
+
+
+def _release_local(key, locked=True):
+    with _key_locks_guard:
+        entry = _key_locks[key]
+        if locked:
+            entry[0].release()
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _key_locks[key]
+
+
+@contextmanager
+def file_lock(root, key, timeout=LOCK_TIMEOUT, poll=LOCK_POLL):
+    """Bloqueo consultivo entre procesos (y entre hilos) sobre `root/_locks/<key>.lock`."""
+    start = time.monotonic()
+    if not _acquire_local(key, blocking=False):
+        print("⏳ [SINGLE-FLIGHT] Otra descarga del mismo vídeo está en curso en este proceso. Esperando...")
+        if not _acquire_local(key, timeout=timeout):
+            raise Exception(f"❌ Tiempo de espera agotado ({int(timeout)} s) esperando a otra descarga del mismo vídeo.")
+    try:
+        lock_dir = root / LOCKS_DIRNAME
+        try:
+            lock_dir.mkdir(parents=True, exist_ok=True)
+            f = open(lock_dir / f"{key}.lock", "a+b")
+        except OSError as e:
+            # Directorio de sólo lectura o sin permisos: se sigue sin coordinación entre procesos
+            print(f"⚠️ [SINGLE-FLIGHT] No se pudo crear el bloqueo ({e}). Continuando sin él.")
+            yield
+            return
+        try:
+            announced = False
+            while True:
+                try:
+                    _try_lock(f)
+                    break
+                except OSError:
+                    if not announced:
+                        print("⏳ [SINGLE-FLIGHT] Otra instancia está descargando el mismo vídeo. Esperando a que termine...")
+                        announced = True
+                    if time.monotonic() - start > timeout:
+                        raise Exception(f"❌ Tiempo de espera agotado ({int(timeout)} s) esperando a otra descarga del mismo vídeo.")
+                    time.sleep(poll)
+            try:
+                yield
+            finally:
+                _unlock(f)
+        finally:
+            f.close()
+    finally:
+        _release_local(key)
+
+
+def is_locked(root, key):
+    """True si algún hilo o proceso tiene ahora mismo el bloqueo de `key`."""
+    if not _acquire_local(key, blocking=False):
+        return True
+    try:
+        lock_path = root / LOCKS_DIRNAME / f"{key}.lock"
+        try:
+            f = open(lock_path, "rb+")
+        except OSError:
+            return False
+        try:
+            _try_lock(f)
+        except OSError:
+            return True
+        else:
+            _unlock(f)
+            return False
+        finally:
+            f.close()
+    finally:
+        _release_local(key)
@@ -0,0 +1,261 @@
+"""Selección de formatos por puntuación sobre la lista extraída.
+
+En lugar de una cadena de fallbacks (`bestvideo[h264]+bestaudio/best/...`)
+que yt-dlp prueba paso a paso, `choose` recorre una sola vez la lista de
+formatos y puntúa cada opción (formato combinado, o vídeo + audio a fusionar)
+por, en este orden:
+
+1. tener audio;
+2. no superar la altura pedida (si ninguna cabe, la más baja por encima);
+3. códec: h264 primero, luego los que se copian al contenedor sin
+   recodificar, luego los que exigirían recodificar y `bytevc1` (HEVC de
+   TikTok, a menudo mudo o ilegible) sólo si no hay nada más;
+4. altura, fps (hasta 60) y la preferencia del extractor (p. ej. marca de agua);
+5. coste: sin fusión mejor que con fusión y, con límite de altura, el tamaño
+   estimado más pequeño (con `best`, el mayor bitrate).
+
+Así nunca se baja un 4K cuando un 1080p copiable cumple la petición, no hace
+falta una segunda selección con `best`, y `Choice.reason` resume la
+decisión en una línea. `selector` adapta `choose` a la API de yt-dlp (un
+`format` invocable).
+"""
+from collections import namedtuple
+
+VIDEO_CONTAINERS = {
+    # contenedor -> (códecs de vídeo, códecs de audio) que se copian sin recodificar (None = todos)
+    "mp4": ({"h264", "hevc", "av1", "vp9"}, {"aac", "mp3", "opus", "flac", "alac", "ac3", "eac3"}),
+    "mov": ({"h264", "hevc"}, {"aac", "mp3", "alac"}),
+    "webm": ({"vp8", "vp9", "av1"}, {"opus", "vorbis"}),
+    "mkv": (None, None),
+    "avi": ({"h264", "mpeg4"}, {"mp3", "aac", "ac3"}),
+    "flv": ({"h264"}, {"aac", "mp3"}),
+}
+
+# Audio nativo de cada contenedor: se prefiere al resto de copiables (aac en mp4 lo lee cualquier reproductor)
+NATIVE_AUDIO = {"mp4": "aac", "mov": "aac", "flv": "aac", "avi": "mp3", "webm": "opus"}
+
+# Extracción de audio (-x): códecs que llegan al formato final sin recodificar
+AUDIO_TARGETS = {
+    "mp3": {"mp3"}, "m4a": {"aac", "alac"}, "aac": {"aac"}, "flac": {"flac"}, "opus": {"opus"},
+    "ogg": {"vorbis", "opus"}, "wav": set(), "mka": None, "audio": None,
+}
+
+# Rango de códec (menor es mejor)
+H264, COPYABLE, TRANSCODE, LAST_RESORT = 0, 1, 2, 3
+RANK_NAMES = {H264: "h264", COPYABLE: "copia", TRANSCODE: "recodifica", LAST_RESORT: "último recurso"}
+
+_CODEC_PREFIXES = (
+    ("avc", "h264"), ("h264", "h264"), ("hvc", "hevc"), ("hev", "hevc"), ("hevc", "hevc"), ("h265", "hevc"),
+    ("bytevc1", "bytevc1"), ("vp09", "vp9"), ("vp9", "vp9"), ("vp08", "vp8"), ("vp8", "vp8"),
+    ("av01", "av1"), ("av1", "av1"), ("mp4v", "mpeg4"), ("mp4a", "aac"), ("aac", "aac"), ("opus", "opus"),
+    ("vorbis", "vorbis"), ("mp3", "mp3"), ("flac", "flac"), ("alac", "alac"), ("ac-3", "ac3"), ("ac3", "ac3"),
+    ("ec-3", "eac3"), ("eac3", "eac3"),
+)
+
+Choice = namedtuple("Choice", "formats video audio reason")
+
+
+def codec_family(codec):
+    """`avc1.640028` -> `h264`, `mp4a.40.2` -> `aac`...; None si no hay pista o no se conoce."""
+    codec = (codec or "").lower()
+    if not codec or codec == "none":
+        return None
+    for prefix, family in _CODEC_PREFIXES:
+        if codec.startswith(prefix):
+            return family
+    return codec.split(".")[0]
+
+
+def _has_video(f):
+    return f.get("vcodec") != "none"
+
+
+def _has_audio(f):
+    return f.get("acodec") != "none"
+
+
+def _usable(f):
+    # Storyboards (mhtml, sin vídeo ni audio) y DRM no se pueden descargar
+    return (_has_video(f) or _has_audio(f)) and f.get("ext") != "mhtml" and not f.get("has_drm")
+
+
+def _duration_hint(formats):
+    """Duración deducida de algún formato con tamaño y bitrate (la lista no la trae)."""
+    for f in formats:
+        size, tbr = f.get("filesize") or f.get("filesize_approx"), f.get("tbr")
+        if size and tbr:
+            return size * 8 / (tbr * 1000)
+    return None
+
+
+def estimate_size(f, duration=None):
+    size = f.get("filesize") or f.get("filesize_approx")
+    if size:
+        return size
+    if f.get("tbr") and duration:
+        return f["tbr"] * 125 * duration
+    return None
+
+
+def video_rank(vcodec, container):
+    family = codec_family(vcodec)
+    if family == "bytevc1":
+        return LAST_RESORT
+    allowed = VIDEO_CONTAINERS.get(container, (None, None))[0]
+    if family is not None and allowed is not None and family not in allowed:
+        return TRANSCODE
+    return H264 if family == "h264" else COPYABLE
+
+
+def audio_fits(acodec, container):
+    allowed = VIDEO_CONTAINERS.get(container, (None, None))[1]
+    family = codec_family(acodec)
+    return family is None or allowed is None or family in allowed
+
+
+def _pick_audio(audios, container):
+    """Mejor pista de audio para fusionar: copiable al contenedor, nativa, idioma preferido y bitrate."""
+    if not audios:
+        return None
+    native = NATIVE_AUDIO.get(container)
+    return max(audios, key=lambda item: (
+        audio_fits(item[1].get("acodec"), container), native is None or codec_family(item[1].get("acodec")) == native,
+        item[1].get("language_preference") or 0, item[1].get("abr") or item[1].get("tbr") or 0, item[0]))[1]
+
+
+def _fmt_size(size):
+    return f"~{size / 1024 ** 2:.1f} MiB" if size else "tamaño desconocido"
+
+
+def choose_video(formats, quality, container):
+    indexed = [(i, f) for i, f in enumerate(formats) if _usable(f)]
+    max_height = None if quality == "best" else int(str(quality).rstrip("p"))
+    audios = [(i, f) for i, f in indexed if _has_audio(f) and not _has_video(f)]
+    audio = _pick_audio(audios, container)
+    duration = _duration_hint(formats)
+
+    options = []
+    for i, f in indexed:
+        if not _has_video(f):
+            continue
+        if _has_audio(f):
+            options.append((i, f, None))
+        elif audio is not None:
+            options.append((i, f, audio))
+        else:
+            # Sin ninguna pista de audio: vídeo mudo como último recurso
+            options.append((i, f, None))
+    if not options:
+        return None
+
+    def key(option):
+        i, video, paired = option
+        height = video.get("height") or 0
+        fits = max_height is None or height <= max_height
+        rank = video_rank(video.get("vcodec"), container)
+        if paired is not None and not audio_fits(paired.get("acodec"), container):
+            rank = max(rank, TRANSCODE)
+        size = (estimate_size(video, duration) or 0) + (estimate_size(paired, duration) or 0 if paired else 0)
+        return (
+            _has_audio(video) or paired is not None,
+            fits,
+            -rank,
+            height if fits else -height,
+            min(video.get("fps") or 30, 60),
+            video.get("preference") or 0,
+            paired is None,
+            # "best" se queda con el bitrate más alto; con límite de altura, con la copia más barata
+            (size or 0) if max_height is None else -(size or float("inf")),
+            i,
+        )
+
+    best = max(options, key=key)
+    i, video, paired = best
+    height = video.get("height")
+    rank = -key(best)[2]
+    size = sum(estimate_size(f, duration) or 0 for f in (video, paired) if f)
+    over = sum(1 for _, f, _ in options if max_height and (f.get("height") or 0) > max_height)
+    skipped_bytevc1 = sum(1 for _, f, _ in options if codec_family(f.get("vcodec")) == "bytevc1" and f is not video)
+    codecs = "+".join(filter(None, [codec_family(video.get("vcodec")), codec_family((paired or video).get("acodec"))]))
+    reason = (f"{video.get('format_id')}{'+' + str(paired.get('format_id')) if paired else ''} -> "
+              f"{height or '?'}p{int(video['fps']) if video.get('fps') else ''} {codecs or '?'}, {_fmt_size(size)}, "
+              f"{'fusión' if paired else 'sin fusión'} a {container} ({RANK_NAMES[rank]}) | "
+              f"objetivo {'≤' + str(max_height) + 'p' if max_height else 'best'}; {len(options)} candidatos, "
+              f"{over} por encima, {skipped_bytevc1} bytevc1 descartados")
+    selected = [video, paired] if paired else [video]
+    return Choice(selected, video, paired or (video if _has_audio(video) else None), reason)
+
+
+def choose_audio(formats, container):
+    indexed = [(i, f) for i, f in enumerate(formats) if _usable(f) and _has_audio(f)]
+    if not indexed:
+        return None
+    targets = AUDIO_TARGETS.get(container)
+    duration = _duration_hint(formats)
+
+    def key(item):
+        i, f = item
+        family = codec_family(f.get("acodec"))
+        return (
+            not _has_video(f),
+            targets is None or family in targets,
+            f.get("language_preference") or 0,
+            f.get("abr") or f.get("tbr") or 0,
+            -(estimate_size(f, duration) or float("inf")),
+            i,
+        )
+
+    i, f = max(indexed, key=key)
+    family = codec_family(f.get("acodec"))
+    conversion = "sin conversión" if targets is None or family in targets else f"convierte a {container}"
+    reason = (f"{f.get('format_id')} -> {family or '?'} {int(f['abr']) if f.get('abr') else '?'} kbps, "
+              f"{_fmt_size(estimate_size(f, duration))}, {conversion}"
+              f"{'' if not _has_video(f) else ' (sin pista sólo audio: se usa un formato con vídeo)'}")
+    return Choice([f], None, f, reason)
+
+
+def choose(formats, quality, container, is_audio=False):
+    """`Choice` para la lista `formats` de yt-dlp (peor -> mejor), o None si no hay nada descargable."""
+    if is_audio:
+        return choose_audio(formats, container)
+    return choose_video(formats, quality, container)
+
+
+def merged_format(choice, container):
+    """Formato que espera yt-dlp para descargar y fusionar la elección."""
+    if len(choice.formats) == 1:
+        return choice.formats[0]
+    video, audio = choice.formats
+    return {
+        "requested_formats": [video, audio],
+        "format_id": f"{video.get('format_id')}+{audio.get('format_id')}",
+        "format": f"{video.get('format')}+{audio.get('format')}",
+        "ext": container,
+        "protocol": f"{video.get('protocol') or 'https'}+{audio.get('protocol') or 'https'}",
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "resolution": video.get("resolution"),
+        "fps": video.get("fps"),
+        "dynamic_range": video.get("dynamic_range"),
+        "vcodec": video.get("vcodec"),
+        "vbr": video.get("vbr"),
+        "aspect_ratio": video.get("aspect_ratio"),
+        "acodec": audio.get("acodec"),
+        "abr": audio.get("abr"),
+        "asr": audio.get("asr"),
+        "audio_channels": audio.get("audio_channels"),
+        "language": audio.get("language"),
+        "tbr": sum(f.get("tbr") or 0 for f in (video, audio)) or None,
+        "filesize_approx": sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in (video, audio)) or None,
+    }
+
+
+def selector(quality, container, is_audio=False, log=print):
+    """Selector invocable para `YoutubeDL(format=...)`: una sola pasada por entrada."""
+    def select(ctx):
+        choice = choose(ctx["formats"], quality, container, is_audio)
+        if choice is None:
+            return
+        log(f"🎯 [FORMATOS] {choice.reason}")
+        yield merged_format(choice, container)
+    return select
@@ -0,0 +1,124 @@
+"""Decodificación de vídeo a lotes de frames sin pasar por una lista intermedia.
+
+`iter_frames` es un generador que sólo decodifica los frames que se conservan
+(los saltados por `stride` se descartan con `grab()`), redimensiona mientras
+decodifica y `load_frames` copia cada frame directamente en un buffer
+float32 preasignado con la forma IMAGE de ComfyUI `[N, H, W, 3]`.
+"""
+import math
+
+
+def target_size(src_w, src_h, width=0, height=0):
+    """Tamaño de salida; un 0 conserva la proporción respecto al otro lado."""
+    if width and height:
+        return int(width), int(height)
+    if width:
+        return int(width), max(1, round(src_h * width / src_w))
+    if height:
+        return max(1, round(src_w * height / src_h)), int(height)
+    return src_w, src_h
+
+
+def probe_stream(path):
+    """Devuelve `(fps, frame_count, width, height)` según OpenCV."""
+    import cv2
+
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            raise Exception(f"❌ OpenCV no pudo abrir el vídeo: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    return fps, count, width, height
+
+
+def frame_range(fps, count, start_time=0.0, end_time=0.0):
+    """Índices `[first, last)` de frames dentro del rango de tiempo pedido."""
+    first = int(math.floor(start_time * fps)) if (fps and start_time > 0) else 0
+    last = count
+    if fps and end_time > 0:
+        last = min(count, int(math.ceil(end_time * fps))) if count else int(math.ceil(end_time * fps))
+    return first, last
+
+
+def expected_frames(fps, count, stride=1, max_frames=0, start_time=0.0, end_time=0.0):
+    """Cota superior del número de frames que producirá `iter_frames`."""
+    first, last = frame_range(fps, count, start_time, end_time)
+    total = max(0, math.ceil((last - first) / max(1, stride))) if last else 0
+    return min(total, max_frames) if max_frames else total
+
+
+def iter_frames(path, stride=1, start_time=0.0, end_time=0.0, width=0, height=0, max_frames=0):
+    """Genera `(timestamp, frame_rgb_uint8)` decodificando sólo lo necesario."""
+    import cv2
+
+    stride = max(1, int(stride))
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise Exception(f"❌ OpenCV no pudo abrir el vídeo: {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out_w, out_h = target_size(src_w, src_h, width, height)
+        first, last = frame_range(fps, int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0), start_time, end_time)
+
+        if first:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        index = first
+        produced = 0
+        while not last or index < last:
+            if (index - first) % stride:
+                # grab() avanza el demuxer sin convertir el frame: mucho más barato que read()
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if (out_w, out_h) != (frame.shape[1], frame.shape[0]):
+                interpolation = cv2.INTER_AREA if out_w < frame.shape[1] else cv2.INTER_LINEAR
+                frame = cv2.resize(frame, (out_w, out_h), interpolation=interpolation)
+            yield (index / fps if fps else 0.0), cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            produced += 1
+            index += 1
+            if max_frames and produced >= max_frames:
+                break
+    finally:
+        cap.release()
+
+
+def load_frames(path, stride=1, max_frames=0, start_time=0.0, end_time=0.0, width=0, height=0):
+    """Carga el rango pedido en un único array float32 `[N, H, W, 3]` en [0, 1].
+
+    Devuelve `(frames, timestamps, fps_efectivo)`.
+    """
+    import numpy as np
+
+    fps, count, src_w, src_h = probe_stream(path)
+    out_w, out_h = target_size(src_w, src_h, width, height)
+    capacity = expected_frames(fps, count, stride, max_frames, start_time, end_time)
+    if not capacity:
+        # Contenedores sin número de frames (streams, webm): se estima y se amplía si hace falta
+        capacity = max_frames or 256
+
+    buffer = np.empty((capacity, out_h, out_w, 3), dtype=np.float32)
+    timestamps = []
+    n = 0
+    for ts, frame in iter_frames(path, stride, start_time, end_time, width, height, max_frames):
+        if n == len(buffer):
+            grown = np.empty((len(buffer) * 2, out_h, out_w, 3), dtype=np.float32)
+            grown[:n] = buffer[:n]
+            buffer = grown
+        np.multiply(frame, np.float32(1.0 / 255.0), out=buffer[n])
+        timestamps.append(ts)
+        n += 1
+
+    if n == 0:
+        raise Exception("❌ No se decodificó ningún frame en el rango pedido.")
+    return buffer[:n], timestamps, (fps / max(1, int(stride)) if fps else 0.0)
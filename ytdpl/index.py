@@ -0,0 +1,148 @@
+"""Índice en disco del directorio de salida.
+
+Cada descarga terminada se registra como un JSON independiente en
+`output/ytdpl/_index/<hash de (extractor, id)>/<hash de la ruta>.json`, con la
+ruta final que informó yt-dlp, su tamaño, su mtime y la fecha del último uso.
+Un mismo vídeo puede tener varias variantes en disco (otra calidad, otro
+contenedor, un clip): cada archivo tiene su propia entrada y su propio último
+uso. Buscar un vídeo es listar una carpeta de unas pocas entradas: no hace
+falta listar ni hacer `stat` de todo el directorio, y cada trabajo sólo ve
+las rutas de su propio vídeo.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+INDEX_DIRNAME = "_index"
+
+# Plantilla para `--print-to-file`: una línea JSON por vídeo tras moverlo a su destino final
+FINAL_PATH_TEMPLATE = "after_move:%(.{id,extractor_key,filepath})j"
+
+
+def index_key(extractor, video_id):
+    raw = json.dumps([extractor or "", str(video_id)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def path_key(path):
+    return hashlib.sha256(os.path.abspath(str(path)).encode("utf-8")).hexdigest()
+
+
+def read_final_paths(report_path):
+    """Lee las líneas escritas por `FINAL_PATH_TEMPLATE` (una por vídeo descargado)."""
+    records = []
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and record.get("filepath"):
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+class OutputIndex:
+    """Índice persistente `(extractor, id) -> [ruta, tamaño, mtime]` (una entrada por archivo).
+
+    `root` es el directorio de salida del nodo (un `Path`).
+    """
+
+    def __init__(self, root):
+        self.index_dir = root / INDEX_DIRNAME
+
+    def _video_dir(self, extractor, video_id):
+        return self.index_dir / index_key(extractor, video_id)
+
+    def _entry_path(self, extractor, video_id, path):
+        return self._video_dir(extractor, video_id) / f"{path_key(path)}.json"
+
+    def record(self, extractor, video_id, path):
+        """Registra la ruta final de un vídeo y devuelve la entrada guardada."""
+        path = str(path)
+        stat = os.stat(path)
+        entry = {
+            "id": str(video_id),
+            "extractor": extractor,
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "recorded": time.time(),
+            "accessed": time.time(),
+        }
+        self._write(entry)
+        return entry
+
+    def _write(self, entry):
+        entry_path = self._entry_path(entry["extractor"], entry["id"], entry["path"])
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, entry_path)
+
+    def touch(self, extractor, video_id, path):
+        """Marca el archivo `path` como usado ahora (orden LRU del gestor de almacenamiento)."""
+        entry = self.lookup(extractor, video_id, path)
+        if entry is not None:
+            entry["accessed"] = time.time()
+            self._write(entry)
+        return entry
+
+    def _read_valid(self, entry_path):
+        """Entrada de `entry_path` si su archivo sigue en disco sin cambios; si no, la descarta."""
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            stat = os.stat(entry["path"])
+            intact = stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]
+        except (OSError, KeyError):
+            intact = False
+
+        if not intact:
+            _remove(entry_path)
+            return None
+        return entry
+
+    def lookup(self, extractor, video_id, path=None):
+        """Entrada de `path` o, sin ruta, la variante registrada más recientemente del vídeo."""
+        if path is not None:
+            return self._read_valid(self._entry_path(extractor, video_id, path))
+        try:
+            names = os.listdir(self._video_dir(extractor, video_id))
+        except OSError:
+            return None
+        entries = [self._read_valid(self._video_dir(extractor, video_id) / name)
+                   for name in names if name.endswith(".json")]
+        entries = [e for e in entries if e is not None]
+        return max(entries, key=lambda e: e.get("recorded") or 0, default=None)
+
+    def discard(self, extractor, video_id, path):
+        _remove(self._entry_path(extractor, video_id, path))
+
+    def entries(self):
+        """Itera todas las entradas registradas (sin validar contra el disco)."""
+        if not self.index_dir.is_dir():
+            return
+        for entry_path in self.index_dir.glob("*/*.json"):
+            try:
+                with open(entry_path, "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
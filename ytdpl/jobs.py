@@ -0,0 +1,161 @@
+"""Cola de descargas en segundo plano (prefetch), desacoplada de la ejecución del grafo.
+
+El nodo de prefetch o la ruta HTTP `POST /ytdpl/prefetch` encolan descargas
+por adelantado; unos pocos hilos las ejecutan mientras ComfyUI sigue con el
+trabajo actual (p. ej. la difusión del elemento anterior). Cuando el nodo
+descargador llega a esa petición reclama su trabajo: si ya terminó devuelve
+el resultado al instante y si sigue en curso espera a su futuro en lugar de
+descargar otra vez.
+
+Los hilos son daemon (como el mantenimiento de almacenamiento y el
+actualizador): cerrar ComfyUI no espera a las descargas pendientes. Su
+progreso no mueve la barra de ningún nodo: sólo se publica en `/ytdpl/jobs`.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+PREFETCH_WORKERS = 2
+PREFETCH_PER_HOST = 1
+# Trabajos terminados que se conservan a la espera de ser reclamados
+KEEP_FINISHED = 64
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """Una descarga encolada; `future` se resuelve con la tupla de salidas del nodo."""
+
+    def __init__(self, key, url, fn):
+        self.key = key
+        self.url = url
+        self.fn = fn
+        self.future = Future()
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        # Porcentaje de la descarga en curso (ver progress.background)
+        self.progress = None
+
+    def report_progress(self, percent):
+        self.progress = percent
+
+    @property
+    def state(self):
+        if not self.future.done():
+            return RUNNING if self.started else PENDING
+        return FAILED if self.future.exception() is not None else DONE
+
+    def summary(self):
+        entry = {"key": self.key, "url": self.url, "state": self.state, "submitted": self.submitted,
+                 "started": self.started, "finished": self.finished}
+        if entry["state"] == RUNNING and self.progress is not None:
+            entry["progress"] = round(self.progress, 1)
+        if entry["state"] == DONE:
+            entry["path"] = self.future.result()[0]
+        elif entry["state"] == FAILED:
+            entry["error"] = str(self.future.exception())
+        return entry
+
+
+class DownloadService:
+    """Pool de hilos daemon que ejecuta los trabajos en orden de llegada con límite por host."""
+
+    def __init__(self, max_workers=PREFETCH_WORKERS, per_host_limit=PREFETCH_PER_HOST, keep_finished=KEEP_FINISHED):
+        from .batch import HostLimiter
+
+        self.max_workers = max(1, int(max_workers))
+        self.keep_finished = keep_finished
+        self._limiter = HostLimiter(per_host_limit)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._threads = []
+
+    def submit(self, key, url, fn):
+        """Encola `fn()` bajo `key`. Devuelve `(trabajo, nuevo)`.
+
+        Una clave pendiente, en curso o ya terminada bien no se vuelve a
+        encolar; una fallida sí.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != FAILED:
+                return job, False
+            job = self._jobs[key] = Job(key, url, fn)
+            self._prune()
+            self._start_workers()
+        self._queue.put(job)
+        return job, True
+
+    def claim(self, key):
+        """Retira y devuelve el trabajo de `key` (o None); quien lo reclama espera su futuro."""
+        with self._lock:
+            return self._jobs.pop(key, None)
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def jobs(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.summary() for job in jobs]
+
+    def _prune(self):
+        finished = [k for k, job in self._jobs.items() if job.future.done()]
+        for key in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[key]
+
+    def _start_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name=f"ytdpl-prefetch-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        from .progress import background
+
+        while True:
+            job = self._queue.get()
+            try:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                with self._limiter.slot(job.url):
+                    job.started = time.time()
+                    try:
+                        with background(job.report_progress):
+                            result = job.fn()
+                    except BaseException as e:
+                        job.finished = time.time()
+                        print(f"❌ [PREFETCH] Falló {job.url}: {e}")
+                        job.future.set_exception(e)
+                    else:
+                        job.finished = time.time()
+                        print(f"✅ [PREFETCH] Listo en {job.finished - job.started:.1f} s: {job.url}")
+                        job.future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Servicio compartido del proceso (`YTDPL_PREFETCH_WORKERS` hilos, por defecto 2)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            try:
+                workers = int(os.environ.get("YTDPL_PREFETCH_WORKERS", PREFETCH_WORKERS))
+            except ValueError:
+                workers = PREFETCH_WORKERS
+            _service = DownloadService(workers)
+        return _service
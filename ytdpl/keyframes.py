@@ -0,0 +1,345 @@
+"""Keyframes y cambios de escena sin decodificar el vídeo completo.
+
+Dos modos, ambos devuelven un lote compacto `[N, H, W, 3]` uint8 y los
+instantes de cada frame:
+
+- `keyframes`: `ffmpeg -skip_frame nokey` sólo decodifica los I-frames (los
+  P/B ni se tocan), `showinfo` da el `pts_time` de cada uno y los frames
+  llegan en PPM por tubería. Con `min_interval` se descartan los keyframes
+  demasiado seguidos y, si hay más de `max_frames`, se diezma sobre la marcha
+  (nunca hay más de `2 * max_frames` en memoria) y se reparte uniformemente.
+- `scenes`: decodifica un proxy diminuto en grises (`PROXY_WIDTH` px de ancho
+  a `analysis_fps`), puntúa cada transición con la diferencia absoluta media
+  entre frames consecutivos (numpy vectorizado sobre todo el proxy) y sólo
+  vuelve al archivo para leer, con un seek, los frames de los cortes
+  elegidos. Con ffmpeg el proxy sale de un único proceso (`fps`, `scale`,
+  `format=gray`); sin él, de OpenCV saltando frames con `grab()`.
+
+El resultado se guarda en `<carpeta>/_keyframes` (un `.npz` por archivo y
+parámetros, validado por tamaño + mtime como `ytdpl.probe`), así que volver a
+pedir lo mismo no decodifica nada.
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+
+KEYFRAMES_DIRNAME = "_keyframes"
+KEYFRAMES = "keyframes"
+SCENES = "scenes"
+MODES = (KEYFRAMES, SCENES)
+
+PROXY_WIDTH = 64
+PROXY_FPS = 4.0
+DECODE_TIMEOUT = 3600
+MEMO_SIZE = 8
+
+_PTS_TIME = re.compile(rb"pts_time:\s*(-?[\d.]+)")
+
+# Caché en memoria (acotada) de los últimos lotes: `(frames, timestamps)`
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def has_ffmpeg():
+    return shutil.which("ffmpeg") is not None
+
+
+def keyframe_command(path, width=0, height=0):
+    """`ffmpeg` que decodifica sólo los I-frames y los emite en PPM; `showinfo` registra su `pts_time`."""
+    filters = ["showinfo"]
+    if width or height:
+        filters.append(f"scale={int(width) or -2}:{int(height) or -2}")
+    return ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "info", "-skip_frame", "nokey", "-i", str(path),
+            "-map", "0:v:0", "-an", "-sn", "-dn", "-vf", ",".join(filters), "-vsync", "passthrough",
+            "-f", "image2pipe", "-vcodec", "ppm", "pipe:1"]
+
+
+def proxy_command(path, fps, width, height):
+    """`ffmpeg` que emite el proxy en grises (`rawvideo`, un byte por píxel) a `fps`."""
+    return ["ffmpeg", "-nostdin", "-v", "error", "-i", str(path), "-map", "0:v:0", "-an", "-sn", "-dn",
+            "-vf", f"fps={fps:g},scale={int(width)}:{int(height)}:flags=area,format=gray",
+            "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"]
+
+
+def spread(count, limit):
+    """Índices repartidos uniformemente para quedarse con `limit` de `count` (todos si caben)."""
+    import numpy as np
+
+    if not limit or count <= limit:
+        return list(range(count))
+    return sorted(set(np.linspace(0, count - 1, limit).round().astype(int).tolist()))
+
+
+def extract_keyframes(path, max_frames=0, min_interval=0.0, width=0, height=0):
+    """I-frames de `path` como `(frames uint8 [N, H, W, 3], timestamps)`."""
+    import numpy as np
+
+    from .stream import read_exact, read_ppm_header
+
+    if not has_ffmpeg():
+        raise Exception("❌ [KEYFRAMES] El modo keyframes necesita ffmpeg en el PATH (el modo scenes funciona sin él).")
+
+    proc = subprocess.Popen(keyframe_command(path, width, height), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    times = []
+    tail = deque(maxlen=20)
+    parsed = threading.Condition()
+    done = []
+
+    def drain():
+        # showinfo escribe la línea de cada frame antes de que el frame salga por stdout
+        for line in proc.stderr:
+            match = _PTS_TIME.search(line)
+            with parsed:
+                if match:
+                    times.append(float(match.group(1)))
+                    parsed.notify_all()
+                else:
+                    tail.append(line)
+        with parsed:
+            done.append(True)
+            parsed.notify_all()
+
+    reader = threading.Thread(target=drain, name="ytdpl-keyframes-log", daemon=True)
+    reader.start()
+
+    kept_frames, kept_times = [], []
+    step = 1
+    accepted = 0
+    last_time = None
+    index = 0
+    try:
+        while True:
+            size = read_ppm_header(proc.stdout)
+            if size is None:
+                break
+            width_out, height_out = size
+            frame = np.empty((height_out, width_out, 3), dtype=np.uint8)
+            if read_exact(proc.stdout, memoryview(frame).cast("B")) < frame.nbytes:
+                break
+            with parsed:
+                parsed.wait_for(lambda: len(times) > index or done, timeout=DECODE_TIMEOUT)
+                ts = times[index] if len(times) > index else None
+            index += 1
+            if ts is None:
+                continue
+            if last_time is not None and ts - last_time < min_interval:
+                continue
+            last_time = ts
+            accepted += 1
+            if (accepted - 1) % step:
+                continue
+            kept_frames.append(frame)
+            kept_times.append(ts)
+            if max_frames and len(kept_frames) > 2 * max_frames:
+                # Diezmado: se queda uno de cada dos y a partir de ahora se acepta la mitad
+                kept_frames, kept_times = kept_frames[::2], kept_times[::2]
+                step *= 2
+        proc.wait(timeout=DECODE_TIMEOUT)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        reader.join(timeout=5)
+
+    if not kept_frames:
+        detail = b"".join(tail).decode("utf-8", "replace").strip()[-300:]
+        raise Exception(f"❌ [KEYFRAMES] ffmpeg no devolvió ningún keyframe: {detail}")
+    chosen = spread(len(kept_frames), max_frames)
+    return np.stack([kept_frames[i] for i in chosen]), [round(kept_times[i], 3) for i in chosen]
+
+
+def proxy_frames(path, fps=PROXY_FPS, width=PROXY_WIDTH):
+    """Proxy en grises `[N, h, w]` uint8 y sus timestamps, decodificado a `fps` y `width` px de ancho."""
+    import numpy as np
+
+    from .frames import iter_frames, probe_stream, target_size
+
+    src_fps, _, src_w, src_h = probe_stream(path)
+    out_w, out_h = target_size(src_w, src_h, width=min(width, src_w))
+
+    if has_ffmpeg():
+        res = subprocess.run(proxy_command(path, fps, out_w, out_h), capture_output=True, timeout=DECODE_TIMEOUT)
+        if res.returncode == 0 and res.stdout:
+            count = len(res.stdout) // (out_w * out_h)
+            proxy = np.frombuffer(res.stdout, dtype=np.uint8, count=count * out_w * out_h)
+            return proxy.reshape(count, out_h, out_w), [i / fps for i in range(count)]
+        print(f"⚠️ [ESCENAS] ffmpeg no pudo generar el proxy, se usa OpenCV: "
+              f"{res.stderr.decode('utf-8', 'replace').strip()[-200:]}")
+
+    import cv2
+
+    stride = max(1, round(src_fps / fps)) if src_fps else 1
+    grays, timestamps = [], []
+    for ts, frame in iter_frames(path, stride=stride, width=out_w, height=out_h):
+        grays.append(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY))
+        timestamps.append(ts)
+    if not grays:
+        raise Exception(f"❌ [ESCENAS] No se decodificó ningún frame de {path}")
+    return np.stack(grays), timestamps
+
+
+def scene_scores(proxy):
+    """Diferencia absoluta media (0-1) entre cada frame del proxy y el anterior: `N - 1` valores."""
+    import numpy as np
+
+    if len(proxy) < 2:
+        return np.zeros(0, dtype=np.float32)
+    diff = np.abs(np.diff(proxy.astype(np.int16), axis=0))
+    return diff.mean(axis=(1, 2), dtype=np.float32) / np.float32(255.0)
+
+
+def select_scenes(timestamps, scores, threshold=0.1, min_interval=1.0, max_frames=0):
+    """Índices del proxy donde empieza cada escena (el primero siempre).
+
+    Dos cortes a menos de `min_interval` segundos se quedan en el de mayor
+    puntuación; con más de `max_frames` escenas se conservan las de cortes
+    más marcados.
+    """
+    import numpy as np
+
+    cuts = np.flatnonzero(np.asarray(scores) >= threshold) + 1
+    kept = [(0, float("inf"))]
+    for i in cuts.tolist():
+        score = float(scores[i - 1])
+        if timestamps[i] - timestamps[kept[-1][0]] >= min_interval:
+            kept.append((i, score))
+        elif score > kept[-1][1] and (len(kept) < 2 or timestamps[i] - timestamps[kept[-2][0]] >= min_interval):
+            kept[-1] = (i, score)
+    if max_frames and len(kept) > max_frames:
+        kept = [kept[0]] + sorted(kept[1:], key=lambda item: -item[1])[:max_frames - 1]
+    return sorted(i for i, _ in kept)
+
+
+def frames_at(path, timestamps, width=0, height=0):
+    """Lee sólo los frames de `timestamps` (seek + una decodificación cada uno), RGB uint8."""
+    import cv2
+    import numpy as np
+
+    from .frames import target_size
+
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise Exception(f"❌ OpenCV no pudo abrir el vídeo: {path}")
+    try:
+        src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out_w, out_h = target_size(src_w, src_h, width, height)
+        batch = np.empty((len(timestamps), out_h, out_w, 3), dtype=np.uint8)
+        n = 0
+        for ts in timestamps:
+            cap.set(cv2.CAP_PROP_POS_MSEC, ts * 1000.0)
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            if (out_w, out_h) != (frame.shape[1], frame.shape[0]):
+                interpolation = cv2.INTER_AREA if out_w < frame.shape[1] else cv2.INTER_LINEAR
+                frame = cv2.resize(frame, (out_w, out_h), interpolation=interpolation)
+            batch[n] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            n += 1
+    finally:
+        cap.release()
+    if n == 0:
+        raise Exception(f"❌ [ESCENAS] No se pudo leer ningún frame de {path}")
+    return batch[:n]
+
+
+def extract_scenes(path, max_frames=0, min_interval=1.0, threshold=0.1, width=0, height=0, analysis_fps=PROXY_FPS):
+    """Primer frame de cada escena como `(frames uint8 [N, H, W, 3], timestamps)`."""
+    proxy, proxy_times = proxy_frames(path, analysis_fps)
+    chosen = select_scenes(proxy_times, scene_scores(proxy), threshold, min_interval, max_frames)
+    timestamps = [round(proxy_times[i], 3) for i in chosen]
+    return frames_at(path, timestamps, width, height), timestamps
+
+
+def _params(mode, max_frames, min_interval, threshold, width, height, analysis_fps):
+    # El umbral y el proxy no afectan a los keyframes: cambiarlos no invalida su caché
+    params = {"mode": mode, "max_frames": int(max_frames), "min_interval": float(min_interval),
+              "width": int(width), "height": int(height)}
+    if mode == SCENES:
+        params.update(threshold=float(threshold), analysis_fps=float(analysis_fps))
+    return params
+
+
+def _file_digest(path):
+    return hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+
+
+def _cache_path(path, params):
+    params_digest = hashlib.sha256(repr(sorted(params.items())).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), KEYFRAMES_DIRNAME,
+                        f"{_file_digest(path)}-{params_digest}.npz")
+
+
+def discard(path):
+    """Borra los resultados cacheados de `path` (todas las combinaciones de parámetros)."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), KEYFRAMES_DIRNAME)
+    prefix = _file_digest(path) + "-"
+    try:
+        names = [name for name in os.listdir(directory) if name.startswith(prefix)]
+    except OSError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def _remember(key, result):
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > MEMO_SIZE:
+            _memo.pop(next(iter(_memo)))
+
+
+def extract(path, mode=KEYFRAMES, max_frames=32, min_interval=1.0, threshold=0.1, width=0, height=0,
+            analysis_fps=PROXY_FPS):
+    """Keyframes o escenas de `path`, desde caché si el archivo no cambió.
+
+    Devuelve `(frames uint8 [N, H, W, 3], timestamps, cacheado)`; el array
+    puede estar compartido con la caché en memoria y no debe modificarse.
+    """
+    import numpy as np
+
+    if mode not in MODES:
+        raise Exception(f"❌ Modo desconocido: {mode} (usa {' o '.join(MODES)})")
+    path = str(path)
+    stat = os.stat(path)
+    params = _params(mode, max_frames, min_interval, threshold, width, height, analysis_fps)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime, tuple(sorted(params.items())))
+
+    with _memo_lock:
+        if key in _memo:
+            return (*_memo[key], True)
+
+    cache_path = _cache_path(path, params)
+    try:
+        with np.load(cache_path) as data:
+            if int(data["size"]) == stat.st_size and float(data["mtime"]) == stat.st_mtime:
+                result = (data["frames"], data["timestamps"].tolist())
+                _remember(key, result)
+                return (*result, True)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if mode == KEYFRAMES:
+        frames, timestamps = extract_keyframes(path, max_frames, min_interval, width, height)
+    else:
+        frames, timestamps = extract_scenes(path, max_frames, min_interval, threshold, width, height, analysis_fps)
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, frames=frames, timestamps=np.asarray(timestamps, dtype=np.float64),
+                     size=stat.st_size, mtime=stat.st_mtime)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠️ [KEYFRAMES] No se pudo guardar el resultado en caché: {e}")
+
+    _remember(key, (frames, timestamps))
+    return frames, timestamps, False
@@ -0,0 +1,254 @@
+"""Metadatos, capítulos y subtítulos sin descargar el medio.
+
+Una única extracción de yt-dlp en proceso (`download=False`) da el título, la
+descripción, el canal, la miniatura y los capítulos; los subtítulos (manuales
+o automáticos) se piden directamente a su URL con la misma sesión de yt-dlp
+(cookies, proxy) y se convierten a cues `{start, end, text}`, sin escribir
+archivos `.vtt` ni tocar el vídeo.
+
+El resultado se guarda como un JSON por vídeo en `output/ytdpl/_metadata`
+con la fecha de creación, y se reutiliza mientras no supere su TTL: repetir la
+consulta es abrir un archivo.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+
+METADATA_DIRNAME = "_metadata"
+
+# Campos del info dict que se conservan en el resultado
+META_KEYS = (
+    "id", "extractor_key", "title", "description", "thumbnail", "uploader", "channel",
+    "duration", "upload_date", "webpage_url", "tags", "view_count",
+)
+
+# Preferencia de formato de subtítulo: json3 (YouTube) y vtt traen tiempos exactos y sin estilo
+SUBTITLE_EXTS = ("json3", "vtt", "srt")
+
+_TIMING_RE = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def metadata_key(extractor, video_id, langs, auto_captions):
+    raw = json.dumps([extractor or "", str(video_id), langs, bool(auto_captions)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def parse_langs(text):
+    """`"en.*, es"` -> patrones de idioma en orden de prioridad (como `--sub-langs`)."""
+    return [part.strip() for part in (text or "").split(",") if part.strip()]
+
+
+def _seconds(h, m, s, ms):
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms.ljust(3, "0")) / 1000
+
+
+def parse_timed_text(text):
+    """Cues `[{start, end, text}]` de un WebVTT o SRT (sin etiquetas de estilo)."""
+    cues, current = [], None
+    for line in text.splitlines():
+        line = line.strip()
+        timing = _TIMING_RE.search(line)
+        if timing:
+            g = timing.groups()
+            current = {"start": _seconds(*g[:4]), "end": _seconds(*g[4:]), "lines": []}
+            cues.append(current)
+        elif not line:
+            current = None
+        elif current is not None:
+            clean = html.unescape(_TAG_RE.sub("", line)).strip()
+            if clean:
+                current["lines"].append(clean)
+    return [{"start": c["start"], "end": c["end"], "text": "\n".join(c["lines"])} for c in cues if c["lines"]]
+
+
+def parse_json3(text):
+    """Cues del formato `json3` de YouTube."""
+    cues = []
+    for event in json.loads(text).get("events") or []:
+        line = "".join(seg.get("utf8", "") for seg in event.get("segs") or []).strip()
+        if line:
+            start = event.get("tStartMs", 0) / 1000
+            cues.append({"start": start, "end": start + event.get("dDurationMs", 0) / 1000, "text": line})
+    return cues
+
+
+def transcript(cues):
+    """Texto corrido; omite las líneas repetidas de los subtítulos automáticos "rodantes"."""
+    lines = []
+    for cue in cues:
+        for line in cue["text"].splitlines():
+            if not lines or lines[-1] != line:
+                lines.append(line)
+    return "\n".join(lines)
+
+
+def select_tracks(info, langs, auto_captions=True):
+    """`[(idioma, formatos, automático)]` en el orden de `langs`; los manuales ganan."""
+    manual = info.get("subtitles") or {}
+    automatic = (info.get("automatic_captions") or {}) if auto_captions else {}
+    selected, seen = [], set()
+    for pattern in langs:
+        for source, is_auto in ((manual, False), (automatic, True)):
+            for lang, formats in source.items():
+                if lang in seen or lang == "live_chat" or not formats:
+                    continue
+                if pattern == "all" or re.fullmatch(pattern, lang):
+                    seen.add(lang)
+                    selected.append((lang, formats, is_auto))
+    return selected
+
+
+def _pick_format(formats):
+    by_ext = {f.get("ext"): f for f in formats}
+    for ext in SUBTITLE_EXTS:
+        if ext in by_ext:
+            return by_ext[ext]
+    return None
+
+
+def build_result(info, subtitles):
+    result = {k: info.get(k) for k in META_KEYS if info.get(k) is not None}
+    result["channel"] = info.get("channel") or info.get("uploader") or ""
+    result["chapters"] = [
+        {"start": c.get("start_time"), "end": c.get("end_time"), "title": c.get("title") or ""}
+        for c in info.get("chapters") or []
+    ]
+    result["thumbnails"] = [
+        {k: t[k] for k in ("url", "width", "height") if t.get(k)}
+        for t in info.get("thumbnails") or [] if t.get("url")
+    ]
+    result["subtitles"] = subtitles
+    return result
+
+
+def extract(url, langs=("en.*",), auto_captions=True, cookie_path=None):
+    """Extrae metadatos y subtítulos de `url` sin descargar el medio."""
+    import yt_dlp
+    from yt_dlp.utils import DownloadError, ExtractorError
+
+    from .engine import YtdlpLogger
+
+    logger = YtdlpLogger()
+    ydl_opts = {
+        "skip_download": True, "quiet": True, "no_warnings": True, "logger": logger,
+        # `watch?v=X&list=Y` resuelve sólo el vídeo y una playlist sólo su primera entrada:
+        # una extracción por consulta en lugar de una por elemento de la lista
+        "noplaylist": True, "playlist_items": "1",
+        # Sin formatos descargables (directos programados, DRM...) los metadatos siguen sirviendo
+        "ignore_no_formats_error": True,
+    }
+    if cookie_path:
+        ydl_opts["cookiefile"] = str(cookie_path)
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                raise Exception("YT_DLP_ERROR: " + "\n".join(logger.errors))
+            if info.get("_type") in ("playlist", "multi_video"):
+                entries = [e for e in info.get("entries") or [] if e]
+                if not entries:
+                    raise Exception("YT_DLP_ERROR: la playlist no tiene entradas.")
+                info = entries[0]
+
+            subtitles = {}
+            for lang, formats, is_auto in select_tracks(info, list(langs), auto_captions):
+                fmt = _pick_format(formats)
+                if fmt is None:
+                    continue
+                try:
+                    data = fmt.get("data")
+                    if data is None:
+                        data = ydl.urlopen(fmt["url"]).read().decode("utf-8", "replace")
+                    cues = parse_json3(data) if fmt["ext"] == "json3" else parse_timed_text(data)
+                except Exception as e:
+                    print(f"⚠️ [METADATOS] No se pudieron leer los subtítulos '{lang}': {e}")
+                    continue
+                subtitles[lang] = {"auto": is_auto, "ext": fmt["ext"], "cues": cues}
+    except (DownloadError, ExtractorError) as e:
+        raise Exception(f"YT_DLP_ERROR: {e}")
+
+    return build_result(info, subtitles)
+
+
+def lookup(root, url, langs=(), auto_captions=False, ttl_hours=24.0, cookie_path=None):
+    """`(resultado, cacheado)` de `url`: de `_metadata` si no ha caducado, si no `extract`.
+
+    `ttl_hours` a 0 consulta siempre y no guarda nada.
+    """
+    from .canonical import AliasIndex, identify
+
+    langs = list(langs)
+    metadata_cache = MetadataCache(root)
+    # Sin extractor específico la URL canónica identifica el vídeo
+    original_url = url.strip()
+    url, identity = identify(original_url, root)
+    keys = [metadata_key(*(identity or ("url", url)), langs, auto_captions)]
+    if ttl_hours > 0:
+        result = metadata_cache.get(keys[0], ttl_hours * 3600)
+        if result is not None:
+            return result, True
+
+    result = extract(url, langs, auto_captions, cookie_path)
+    if result.get("extractor_key") and result.get("id") and tuple(identity or ()) != (result["extractor_key"], str(result["id"])):
+        try:
+            AliasIndex(root).record([original_url, url], result["extractor_key"], result["id"], url)
+        except Exception as e:
+            print(f"⚠️ [ALIAS] No se pudo registrar la URL: {e}")
+    if ttl_hours > 0:
+        if result.get("extractor_key") and result.get("id"):
+            keys.append(metadata_key(result["extractor_key"], result["id"], langs, auto_captions))
+        try:
+            metadata_cache.put(keys, result)
+        except Exception as e:
+            print(f"⚠️ [METADATOS] No se pudo guardar en caché: {e}")
+    return result, False
+
+
+class MetadataCache:
+    """Resultados de `extract` por vídeo con caducidad.
+
+    `root` es el directorio de salida del nodo (un `Path`).
+    """
+
+    def __init__(self, root):
+        self.cache_dir = root / METADATA_DIRNAME
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key, ttl_seconds):
+        """Devuelve el resultado si existe y no ha caducado; si caducó, lo descarta."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > ttl_seconds:
+            self.discard(key)
+            return None
+        return entry.get("result")
+
+    def put(self, keys, result):
+        entry = {"created": time.time(), "result": result}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for key in dict.fromkeys(keys):
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        return entry
+
+    def discard(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
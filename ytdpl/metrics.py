@@ -0,0 +1,256 @@
+"""Métricas por etapa de cada descarga.
+
+Cada ejecución de `download_video` acumula tramos de tiempo por etapa
+(consulta de caché, predicción del nombre, extracción, descarga de
+fragmentos, postprocesado, ffprobe, metadatos, reintento con cookies...),
+los bytes descargados y el throughput efectivo. Al terminar se añade una
+línea a `output/ytdpl/_metrics/downloads.jsonl` y, si se define
+`YTDPL_METRICS_PROM`, se reescribe ese archivo en formato de texto de
+Prometheus (apto para el textfile collector de node_exporter).
+
+Variables de entorno:
+- `YTDPL_METRICS=0` desactiva el registro.
+- `YTDPL_METRICS_FILE` cambia la ruta del JSONL.
+- `YTDPL_METRICS_PROM` ruta del archivo Prometheus (desactivado si no se define).
+- `YTDPL_PROFILE=1` (o `pyinstrument`) perfila la siguiente ejecución del proceso.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIRNAME = "_metrics"
+METRICS_FILENAME = "downloads.jsonl"
+# Al superar este tamaño el JSONL se rota a `.1` (se conserva una sola generación)
+MAX_METRICS_BYTES = 20 * 1024 * 1024
+PROFILE_TOP = 25
+
+_write_lock = threading.Lock()
+_profile_lock = threading.Lock()
+_profiled = False
+
+# Agregados del proceso para el archivo Prometheus
+_totals = {"runs": {}, "stage_sum": {}, "stage_count": {}, "bytes": {}, "throughput": {}}
+
+
+def enabled():
+    return os.environ.get("YTDPL_METRICS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def metrics_path(root):
+    override = os.environ.get("YTDPL_METRICS_FILE")
+    if override:
+        return override
+    return os.path.join(str(root), METRICS_DIRNAME, METRICS_FILENAME)
+
+
+def _yt_dlp_version():
+    try:
+        from importlib.metadata import version
+        return version("yt-dlp")
+    except Exception:
+        return None
+
+
+class RunMetrics:
+    """Tramos de tiempo, bytes y resultado de una ejecución de descarga."""
+
+    def __init__(self, url, engine=None):
+        self.url = url
+        self.engine = engine
+        self.extractor = None
+        self.started = time.monotonic()
+        self.stages = {}
+        self.bytes = 0
+
+    @contextmanager
+    def span(self, stage):
+        """Cronometra un bloque; si la etapa se repite (reintentos) se acumula."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic() - t0)
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + max(0.0, seconds)
+
+    def record_transfer(self, tracker, started, ended):
+        """Reparte el tramo de un motor en extracción / descarga / postprocesado.
+
+        Usa el instante del primer evento de cada fase del `ProgressTracker`;
+        sin eventos de descarga (p. ej. archivo ya presente) todo cuenta como extracción.
+        """
+        download_at = tracker.phase_started.get("download")
+        postprocess_at = tracker.phase_started.get("postprocess")
+        first = download_at or postprocess_at or ended
+        self.add("extraction", first - started)
+        if download_at:
+            self.add("download", (postprocess_at or ended) - download_at)
+        if postprocess_at:
+            self.add("postprocess", ended - postprocess_at)
+        self.bytes += tracker.downloaded_bytes
+
+    def record(self, status, error=None):
+        total = time.monotonic() - self.started
+        download_seconds = self.stages.get("download", 0.0)
+        entry = {
+            "ts": time.time(),
+            "url": self.url,
+            "extractor": self.extractor,
+            "engine": self.engine,
+            "status": status,
+            "total_seconds": round(total, 4),
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "bytes": self.bytes,
+            "throughput_bps": round(self.bytes / download_seconds, 1) if download_seconds > 0 and self.bytes else None,
+            "yt_dlp_version": _yt_dlp_version(),
+        }
+        if error:
+            entry["error"] = str(error)[-300:]
+        return entry
+
+    def finish(self, root, status, error=None):
+        """Persiste la ejecución (JSONL + Prometheus opcional); nunca lanza."""
+        if not enabled():
+            return None
+        entry = self.record(status, error)
+        try:
+            append_jsonl(metrics_path(root), entry)
+            _aggregate(entry)
+            prom_path = os.environ.get("YTDPL_METRICS_PROM")
+            if prom_path:
+                write_prometheus(prom_path)
+        except OSError as e:
+            print(f"⚠️ [MÉTRICAS] No se pudieron guardar: {e}")
+        return entry
+
+
+def append_jsonl(path, entry):
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _write_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            if os.path.getsize(path) > MAX_METRICS_BYTES:
+                os.replace(path, f"{path}.1")
+        except OSError:
+            pass
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _aggregate(entry):
+    extractor = entry.get("extractor") or "unknown"
+    with _write_lock:
+        run_key = (entry["status"], extractor)
+        _totals["runs"][run_key] = _totals["runs"].get(run_key, 0) + 1
+        for stage, seconds in entry["stages"].items():
+            _totals["stage_sum"][stage] = _totals["stage_sum"].get(stage, 0.0) + seconds
+            _totals["stage_count"][stage] = _totals["stage_count"].get(stage, 0) + 1
+        _totals["bytes"][extractor] = _totals["bytes"].get(extractor, 0) + entry["bytes"]
+        if entry.get("throughput_bps"):
+            _totals["throughput"][extractor] = entry["throughput_bps"]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", " ")
+
+
+def render_prometheus():
+    """Agregados del proceso en formato de texto de Prometheus."""
+    with _write_lock:
+        totals = {k: dict(v) for k, v in _totals.items()}
+    lines = [
+        "# HELP ytdpl_downloads_total Ejecuciones de descarga por resultado y extractor.",
+        "# TYPE ytdpl_downloads_total counter",
+    ]
+    for (status, extractor), count in sorted(totals["runs"].items()):
+        lines.append(f'ytdpl_downloads_total{{status="{_label(status)}",extractor="{_label(extractor)}"}} {count}')
+    lines += [
+        "# HELP ytdpl_stage_seconds Tiempo acumulado por etapa de descarga.",
+        "# TYPE ytdpl_stage_seconds summary",
+    ]
+    for stage in sorted(totals["stage_sum"]):
+        lines.append(f'ytdpl_stage_seconds_sum{{stage="{_label(stage)}"}} {totals["stage_sum"][stage]:.6f}')
+        lines.append(f'ytdpl_stage_seconds_count{{stage="{_label(stage)}"}} {totals["stage_count"][stage]}')
+    lines += [
+        "# HELP ytdpl_downloaded_bytes_total Bytes descargados por extractor.",
+        "# TYPE ytdpl_downloaded_bytes_total counter",
+    ]
+    for extractor, value in sorted(totals["bytes"].items()):
+        lines.append(f'ytdpl_downloaded_bytes_total{{extractor="{_label(extractor)}"}} {value}')
+    lines += [
+        "# HELP ytdpl_last_throughput_bytes_per_second Throughput de la última descarga por extractor.",
+        "# TYPE ytdpl_last_throughput_bytes_per_second gauge",
+    ]
+    for extractor, value in sorted(totals["throughput"].items()):
+        lines.append(f'ytdpl_last_throughput_bytes_per_second{{extractor="{_label(extractor)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    text = render_prometheus()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _claim_profile():
+    """True sólo para la primera ejecución del proceso cuando YTDPL_PROFILE está activo."""
+    global _profiled
+    mode = os.environ.get("YTDPL_PROFILE", "").strip().lower()
+    if not mode or mode in ("0", "false", "no", "off"):
+        return None
+    with _profile_lock:
+        if _profiled:
+            return None
+        _profiled = True
+    return mode
+
+
+@contextmanager
+def maybe_profile(root):
+    """Perfila el bloque una única vez por proceso si `YTDPL_PROFILE` está definido."""
+    mode = _claim_profile()
+    if mode is None:
+        yield
+        return
+
+    out_dir = os.path.join(str(root), METRICS_DIRNAME)
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ [PERFIL] pyinstrument no está instalado. Usando cProfile.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                out_path = os.path.join(out_dir, f"profile-{stamp}.html")
+                with open(out_path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                print(f"🔬 [PERFIL] Guardado en {out_path}")
+            return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out_path = os.path.join(out_dir, f"profile-{stamp}.prof")
+        profiler.dump_stats(out_path)
+        print(f"🔬 [PERFIL] Guardado en {out_path} (ver con `python -m pstats`). Funciones más costosas:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
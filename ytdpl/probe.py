@@ -0,0 +1,130 @@
+"""Sondeo de medios con un único `ffprobe` JSON por archivo.
+
+El resultado se resume (duración, fps, frames, códecs, bitrate, pistas) y se
+guarda junto al archivo en `<carpeta>/_probe`, nombrado con el hash de la
+ruta y validado por tamaño + mtime. Cualquier nodo que vuelva a pedir el
+mismo archivo lo lee de ahí sin lanzar otro proceso.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import threading
+
+PROBE_DIRNAME = "_probe"
+PROBE_TIMEOUT = 30
+MEMO_SIZE = 256
+
+FFPROBE_ARGS = ["-v", "error", "-print_format", "json", "-show_format", "-show_streams"]
+
+# Caché en memoria (acotada) para no releer el JSON dentro del mismo proceso
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _rate(value):
+    """Convierte `"30000/1001"` (o `"25"`) en float; 0.0 si no es válido."""
+    try:
+        num, _, den = str(value).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize(raw):
+    """Resume la salida JSON de ffprobe en los campos que consumen los nodos."""
+    streams = raw.get("streams") or []
+    fmt = raw.get("format") or {}
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not (s.get("disposition") or {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    duration = _number(fmt.get("duration")) or _number((video or audio or {}).get("duration"))
+    fps = (_rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate"))) if video else 0.0
+    frame_count = _number((video or {}).get("nb_frames"), int)
+    if not frame_count and fps and duration:
+        frame_count = int(round(duration * fps))
+
+    return {
+        "duration": duration or 0.0,
+        "fps": fps,
+        "frame_count": frame_count or 0,
+        "width": (video or {}).get("width") or 0,
+        "height": (video or {}).get("height") or 0,
+        "video_codec": (video or {}).get("codec_name") or "",
+        "audio_codec": (audio or {}).get("codec_name") or "",
+        "bitrate": _number(fmt.get("bit_rate"), int) or 0,
+        "has_audio": audio is not None,
+        "container": fmt.get("format_name") or "",
+        "streams": [
+            {
+                "index": s.get("index"),
+                "type": s.get("codec_type"),
+                "codec": s.get("codec_name"),
+                **({"width": s.get("width"), "height": s.get("height")} if s.get("codec_type") == "video" else {}),
+                **({"channels": s.get("channels"), "sample_rate": s.get("sample_rate")} if s.get("codec_type") == "audio" else {}),
+            }
+            for s in streams
+        ],
+    }
+
+
+def run_ffprobe(path):
+    """Lanza ffprobe una vez y devuelve su JSON sin procesar."""
+    res = subprocess.run(["ffprobe", *FFPROBE_ARGS, str(path)], capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    if res.returncode != 0:
+        raise Exception(f"ffprobe falló: {res.stderr.strip()[-200:]}")
+    return json.loads(res.stdout or "{}")
+
+
+def _remember(key, result):
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > MEMO_SIZE:
+            _memo.pop(next(iter(_memo)))
+
+
+def _sidecar_path(path):
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(os.path.dirname(os.path.abspath(path)), PROBE_DIRNAME, f"{digest}.json")
+
+
+def probe(path):
+    """Resumen de `path`, desde caché si el archivo no cambió (tamaño + mtime)."""
+    path = str(path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+
+    sidecar = _sidecar_path(path)
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            _remember(key, entry["result"])
+            return entry["result"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    result = summarize(run_ffprobe(path))
+    try:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        tmp_path = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"path": key[0], "size": stat.st_size, "mtime": stat.st_mtime, "result": result}, f)
+        os.replace(tmp_path, sidecar)
+    except OSError as e:
+        print(f"⚠️ [PROBE] No se pudo guardar el resultado en caché: {e}")
+
+    _remember(key, result)
+    return result
@@ -0,0 +1,170 @@
+"""Progreso estructurado de yt-dlp, barra de progreso de ComfyUI y registro acotado.
+
+Ambos motores producen los mismos eventos: el motor en proceso mediante los
+`progress_hooks`/`postprocessor_hooks` de YoutubeDL y el motor por subprocess
+mediante `--progress-template`, que imprime cada actualización como una línea
+JSON. Del registro de texto sólo se conservan las últimas líneas para los
+mensajes de error.
+
+Las descargas en segundo plano (prefetch) no tienen un nodo en ejecución:
+la barra de ComfyUI acabaría en el nodo que esté corriendo en ese momento.
+Dentro de `background(sink)` los trackers del hilo no crean barra y envían
+el porcentaje a `sink` (el trabajo, visible en `/ytdpl/jobs`).
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DOWNLOAD_MARKER = "[ytdpl-progress] "
+POSTPROCESS_MARKER = "[ytdpl-postprocess] "
+
+# Flags para el motor por subprocess: una línea JSON por actualización
+PROGRESS_ARGS = [
+    "--newline",
+    "--progress-template", f"download:{DOWNLOAD_MARKER}%(progress)j",
+    "--progress-template", f"postprocess:{POSTPROCESS_MARKER}%(progress)j",
+]
+
+LOG_LINES = 200
+PRINT_INTERVAL = 2.0
+
+_EVENT_KEYS = (
+    "status", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta",
+    "elapsed", "fragment_index", "fragment_count", "filename", "postprocessor",
+)
+
+
+_local = threading.local()
+
+
+@contextmanager
+def background(sink):
+    """Los trackers creados en este hilo no usan la barra de ComfyUI: llaman a `sink(porcentaje)`."""
+    previous = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
+
+
+def _comfy_progress_bar(total):
+    try:
+        from comfy.utils import ProgressBar
+    except ImportError:
+        return None
+    return ProgressBar(total)
+
+
+def _format_bytes(num):
+    if num is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if num < 1024 or unit == "GiB":
+            return f"{num:.1f}{unit}"
+        num /= 1024
+
+
+class ProgressTracker:
+    """Normaliza los eventos de progreso y los envía a la barra de ComfyUI y a la consola."""
+
+    def __init__(self, log_lines=LOG_LINES, print_interval=PRINT_INTERVAL):
+        self.log = deque(maxlen=log_lines)
+        self.events = 0
+        self.last_event = None
+        self.phase = "extract"
+        self.file_bytes = {}
+        # Instante (monotonic) del primer evento de cada fase, para las métricas por etapa
+        self.phase_started = {}
+        self.print_interval = print_interval
+        self._last_print = 0.0
+        self._sink = getattr(_local, "sink", None)
+        self._pbar = _comfy_progress_bar(100) if self._sink is None else None
+
+    # --- Entradas ---
+    def download_hook(self, d):
+        """`progress_hooks` de YoutubeDL."""
+        self.handle("download", d)
+
+    def postprocessor_hook(self, d):
+        """`postprocessor_hooks` de YoutubeDL."""
+        self.handle("postprocess", d)
+
+    def feed_line(self, line):
+        """Procesa una línea del motor por subprocess.
+
+        Devuelve True si era una línea de progreso (ya gestionada); el resto se
+        guarda en el registro acotado y el llamante decide si la imprime.
+        """
+        for marker, phase in ((DOWNLOAD_MARKER, "download"), (POSTPROCESS_MARKER, "postprocess")):
+            if line.startswith(marker):
+                try:
+                    self.handle(phase, json.loads(line[len(marker):]))
+                    return True
+                except ValueError:
+                    break
+        self.log.append(line.rstrip("\n"))
+        return False
+
+    # --- Lógica común ---
+    def handle(self, phase, data):
+        event = {k: data.get(k) for k in _EVENT_KEYS if data.get(k) is not None}
+        event["phase"] = phase
+        self.events += 1
+        self.last_event = event
+        self.phase = phase
+        self.phase_started.setdefault(phase, time.monotonic())
+
+        if phase == "download":
+            if event.get("filename") and event.get("downloaded_bytes") is not None:
+                self.file_bytes[event["filename"]] = event["downloaded_bytes"]
+            percent = self.percent(event)
+            if percent is not None and self._pbar is not None:
+                self._pbar.update_absolute(int(percent), 100)
+            if percent is not None and self._sink is not None:
+                self._sink(percent)
+            self._maybe_print(event, percent, force=event.get("status") == "finished")
+        else:
+            if event.get("status") == "started":
+                print(f"⚙️ [POSTPROCESADO] {event.get('postprocessor', '?')}...")
+            self.log.append(f"[postprocess] {event.get('postprocessor')} {event.get('status')}")
+        return event
+
+    @staticmethod
+    def percent(event):
+        total = event.get("total_bytes") or event.get("total_bytes_estimate")
+        if total and event.get("downloaded_bytes") is not None:
+            return min(100.0, 100.0 * event["downloaded_bytes"] / total)
+        if event.get("fragment_count") and event.get("fragment_index") is not None:
+            return min(100.0, 100.0 * event["fragment_index"] / event["fragment_count"])
+        if event.get("status") == "finished":
+            return 100.0
+        return None
+
+    def _maybe_print(self, event, percent, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_print < self.print_interval:
+            return
+        self._last_print = now
+        parts = [f"{percent:5.1f}%" if percent is not None else "  ?  %"]
+        parts.append(f"{_format_bytes(event.get('downloaded_bytes'))}/"
+                     f"{_format_bytes(event.get('total_bytes') or event.get('total_bytes_estimate'))}")
+        if event.get("speed"):
+            parts.append(f"{_format_bytes(event['speed'])}/s")
+        if event.get("eta") is not None:
+            parts.append(f"ETA {int(event['eta'])}s")
+        if event.get("fragment_count"):
+            parts.append(f"frag {event.get('fragment_index', 0)}/{event['fragment_count']}")
+        print(f"📶 [PROGRESO] {' | '.join(parts)}")
+
+    # --- Salidas ---
+    @property
+    def downloaded_bytes(self):
+        """Bytes descargados en total (suma del último valor de cada archivo)."""
+        return sum(self.file_bytes.values())
+
+    def tail(self, lines=40):
+        """Últimas líneas del registro, para mensajes de error."""
+        return "\n".join(list(self.log)[-lines:])
@@ -0,0 +1,119 @@
+"""Descarga de fragmentos temporales (clips) en lugar del vídeo completo.
+
+Traduce rangos como `10-25, 1:02:00-1:02:15` a `--download-sections` de
+yt-dlp, que sólo pide al servidor los bytes de cada rango. yt-dlp escribe un
+archivo por rango; con varios rangos `join_clips` los une (concat de ffmpeg,
+sin recodificar) en el único archivo que devuelve el nodo.
+"""
+import os
+import re
+import subprocess
+import tempfile
+
+_TIMESTAMP_RE = re.compile(r"^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)$")
+
+# Plantilla de salida con el rango: un clip nunca pisa la descarga completa del mismo vídeo
+SECTION_OUTTMPL = "%(title)s [%(id)s] %(section_start)s-%(section_end)s.%(ext)s"
+JOIN_TIMEOUT = 1800
+
+
+def parse_timestamp(text):
+    """`SS`, `MM:SS` o `HH:MM:SS(.ms)` -> segundos; vacío o `inf` -> None."""
+    text = text.strip().lower()
+    if text in ("", "inf", "end"):
+        return None
+    m = _TIMESTAMP_RE.match(text)
+    if not m:
+        raise Exception(f"❌ Marca de tiempo no válida: '{text}'")
+    parts = [float(p) for p in m.groups() if p is not None]
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def parse_sections(text="", start_time=0.0, end_time=0.0):
+    """Lista ordenada de rangos `(inicio, fin|None)` en segundos.
+
+    `text` admite varios rangos separados por comas o saltos de línea y tiene
+    prioridad sobre `start_time`/`end_time` (0 = sin límite).
+    """
+    ranges = []
+    for chunk in re.split(r"[,\n;]+", text or ""):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        if "-" not in chunk:
+            raise Exception(f"❌ Rango no válido: '{chunk}'. Usa inicio-fin, p. ej. 1:30-1:45")
+        start, end = chunk.split("-", 1)
+        ranges.append((parse_timestamp(start) or 0.0, parse_timestamp(end)))
+
+    if not ranges and (start_time > 0 or end_time > 0):
+        ranges.append((float(start_time), float(end_time) if end_time > 0 else None))
+
+    for start, end in ranges:
+        if end is not None and end <= start:
+            raise Exception(f"❌ El rango {start}-{end} termina antes de empezar.")
+    return sorted(ranges, key=lambda r: r[0])
+
+
+def describe(ranges):
+    """Forma canónica de los rangos para claves de caché e IS_CHANGED."""
+    return ";".join(f"{start:.3f}-{'inf' if end is None else f'{end:.3f}'}" for start, end in ranges)
+
+
+def build_args(ranges, exact_cuts=False):
+    """Flags de yt-dlp para descargar sólo `ranges`."""
+    if not ranges:
+        return []
+    args = []
+    for start, end in ranges:
+        args.extend(["--download-sections", f"*{start:.3f}-{'inf' if end is None else f'{end:.3f}'}"])
+    # Por defecto se corta en el keyframe más cercano (copia sin recodificar);
+    # el corte exacto fuerza keyframes en los bordes y recodifica esos tramos
+    if exact_cuts:
+        args.append("--force-keyframes-at-cuts")
+    args.extend(["-o", SECTION_OUTTMPL])
+    return args
+
+
+def joined_path(paths):
+    """`Título [id] 10-25+60-75.mp4` a partir de las piezas `Título [id] 10-25.mp4`, `Título [id] 60-75.mp4`."""
+    first = str(paths[0])
+    directory, name = os.path.split(first)
+    stem, ext = os.path.splitext(name)
+    prefix, _, _ = stem.rpartition(" ")
+    labels = [os.path.splitext(os.path.basename(str(p)))[0].rpartition(" ")[2] for p in paths]
+    return os.path.join(directory, f"{prefix or stem} {'+'.join(labels)}{ext}")
+
+
+def join_clips(paths):
+    """Une las piezas (una por rango, en orden) en un solo archivo y las borra. Devuelve su ruta."""
+    paths = [str(p) for p in paths]
+    output = joined_path(paths)
+    stem, ext = os.path.splitext(output)
+    partial = f"{stem}.joining{ext}"
+    list_fd, list_path = tempfile.mkstemp(prefix="ytdpl-concat-", suffix=".txt")
+    try:
+        with os.fdopen(list_fd, "w", encoding="utf-8") as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        res = subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+                              "-map", "0", "-c", "copy", partial], capture_output=True, text=True, timeout=JOIN_TIMEOUT)
+        if res.returncode != 0:
+            raise Exception(f"❌ [CLIP] ffmpeg no pudo unir los {len(paths)} rangos: {res.stderr.strip()[-300:]}")
+        os.replace(partial, output)
+    finally:
+        for leftover in (list_path, partial):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+    for path in paths:
+        if os.path.abspath(path) != os.path.abspath(output):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return output
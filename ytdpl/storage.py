@@ -0,0 +1,220 @@
+"""Cuotas de almacenamiento y desalojo LRU de `output/ytdpl`.
+
+Los archivos descargados se conocen por el índice de salida (`_index`), que
+guarda su tamaño y la fecha del último uso; los archivos antiguos que no están
+en el índice (descargas previas) cuentan con su mtime. Con una cuota de bytes
+se borran los menos usados recientemente hasta quedar por debajo; con una
+cuota de edad, los que llevan más de ese tiempo sin usarse.
+
+Nunca se borra un archivo en uso: los usados en la última hora, los fijados
+por un nodo de este proceso (`pin`) y los vídeos cuyo bloqueo de descarga
+(`ytdpl.flight`) tiene otro trabajo, de este o de otro proceso.
+
+Además se limpian los restos de descargas fallidas (`.part`, `.ytdl`,
+`.info.json`, fragmentos y temporales) que llevan horas sin modificarse. Todo
+ello corre en un hilo en segundo plano, como mucho una vez cada
+`MAINTENANCE_INTERVAL` segundos por directorio.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from . import flight, index
+
+# Margen durante el que un archivo recién usado no se desaloja (lo leen los nodos siguientes)
+ACCESS_GRACE = 3600
+# Antigüedad mínima (sin modificarse) para considerar huérfano un archivo parcial
+PARTIAL_GRACE = 6 * 3600
+MAINTENANCE_INTERVAL = 600
+
+PARTIAL_PATTERN = re.compile(r"(\.part(-Frag\d+)?(\.part)?|\.ytdl|\.temp|\.info\.json|\.tmp)$", re.IGNORECASE)
+# Carpetas internas del nodo en output/ytdpl donde pueden quedar temporales de escrituras atómicas
+INTERNAL_DIRS = ("_cache", "_index", "_probe", "_metadata", "_thumbnails", "_aliases", "_keyframes")
+
+_pinned = Counter()
+_pinned_lock = threading.Lock()
+_last_run = {}
+_running = set()
+_schedule_lock = threading.Lock()
+
+
+def quotas(quota_gb=0.0, max_age_days=0.0):
+    """Cuotas efectivas `(bytes, segundos)`; 0 en el nodo usa las variables de entorno."""
+    quota_gb = quota_gb or float(os.environ.get("YTDPL_STORAGE_QUOTA_GB") or 0)
+    max_age_days = max_age_days or float(os.environ.get("YTDPL_MAX_AGE_DAYS") or 0)
+    return int(quota_gb * 1024 ** 3), max_age_days * 86400
+
+
+@contextmanager
+def pin(path):
+    """Protege `path` del desalojo mientras dure el bloque (p. ej. mientras se decodifica)."""
+    key = os.path.abspath(str(path))
+    with _pinned_lock:
+        _pinned[key] += 1
+    try:
+        yield
+    finally:
+        with _pinned_lock:
+            _pinned[key] -= 1
+            if _pinned[key] <= 0:
+                del _pinned[key]
+
+
+def _is_pinned(path):
+    with _pinned_lock:
+        return _pinned.get(os.path.abspath(path), 0) > 0
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+class StorageManager:
+    """Aplica las cuotas sobre `root` (el directorio de salida del nodo, un `Path`)."""
+
+    def __init__(self, root, quota_bytes=0, max_age_seconds=0):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.max_age_seconds = max_age_seconds
+        self.index = index.OutputIndex(root)
+
+    def files(self):
+        """Archivos descargados: `[{path, size, accessed, extractor, id}]`."""
+        tracked = {}
+        for entry in self.index.entries():
+            try:
+                stat = os.stat(entry["path"])
+            except (OSError, KeyError):
+                # El archivo ya no existe: la entrada sobra
+                if entry.get("id") is not None and entry.get("path"):
+                    self.index.discard(entry.get("extractor"), entry["id"], entry["path"])
+                continue
+            tracked[os.path.abspath(entry["path"])] = {
+                "path": entry["path"],
+                "size": stat.st_size,
+                "accessed": entry.get("accessed") or entry.get("recorded") or stat.st_mtime,
+                "extractor": entry.get("extractor"),
+                "id": entry.get("id"),
+            }
+
+        files = list(tracked.values())
+        with os.scandir(self.root) as it:
+            for item in it:
+                if not item.is_file() or item.name.startswith(".") or PARTIAL_PATTERN.search(item.name):
+                    continue
+                if os.path.abspath(item.path) in tracked:
+                    continue
+                stat = item.stat()
+                files.append({"path": item.path, "size": stat.st_size, "accessed": stat.st_mtime,
+                              "extractor": None, "id": None})
+        return files
+
+    def in_use(self, item, now):
+        if now - item["accessed"] < ACCESS_GRACE:
+            return True
+        if _is_pinned(item["path"]):
+            return True
+        if item["id"] is not None:
+            # Misma clave que usa el nodo para el bloqueo de descarga del vídeo
+            video_key = flight.flight_key([item["extractor"], item["id"]])
+            if flight.is_locked(self.root, video_key):
+                return True
+        return False
+
+    def evict(self, item):
+        """Borra el archivo y lo que cuelga de él (índice, sondeo, keyframes, info.json)."""
+        path = item["path"]
+        if not _remove(path):
+            return False
+        if item["id"] is not None:
+            self.index.discard(item["extractor"], item["id"], path)
+        from . import keyframes, probe
+        _remove(probe._sidecar_path(path))
+        keyframes.discard(path)
+        _remove(os.path.splitext(path)[0] + ".info.json")
+        return True
+
+    def enforce(self, now=None):
+        """Aplica las cuotas de edad y de bytes. Devuelve un resumen."""
+        now = time.time() if now is None else now
+        files = self.files()
+        total = sum(f["size"] for f in files)
+        evicted, freed = [], 0
+
+        # Más antiguos primero
+        for item in sorted(files, key=lambda f: f["accessed"]):
+            expired = self.max_age_seconds and now - item["accessed"] > self.max_age_seconds
+            over_quota = self.quota_bytes and total - freed > self.quota_bytes
+            if not (expired or over_quota):
+                continue
+            if self.in_use(item, now):
+                continue
+            if self.evict(item):
+                evicted.append(item["path"])
+                freed += item["size"]
+
+        return {"files": len(files), "bytes": total, "evicted": evicted, "freed": freed,
+                "remaining": total - freed}
+
+    def clean_partials(self, now=None):
+        """Borra restos de descargas fallidas que llevan `PARTIAL_GRACE` sin modificarse."""
+        now = time.time() if now is None else now
+        removed = []
+        dirs = [self.root] + [self.root / name for name in INTERNAL_DIRS]
+        for directory in dirs:
+            try:
+                it = os.scandir(directory)
+            except OSError:
+                continue
+            with it:
+                for item in it:
+                    if not item.is_file() or not PARTIAL_PATTERN.search(item.name):
+                        continue
+                    try:
+                        stale = now - item.stat().st_mtime > PARTIAL_GRACE
+                    except OSError:
+                        continue
+                    if stale and _remove(item.path):
+                        removed.append(item.path)
+        return removed
+
+    def run(self):
+        removed = self.clean_partials()
+        report = {"partials": removed}
+        if self.quota_bytes or self.max_age_seconds:
+            report.update(self.enforce())
+        if removed or report.get("evicted"):
+            print(f"🧹 [ALMACENAMIENTO] {len(removed)} parciales huérfanos y {len(report.get('evicted', []))} "
+                  f"descargas desalojadas ({report.get('freed', 0) / 1024 ** 2:.1f} MiB liberados).")
+        return report
+
+
+def schedule_maintenance(root, quota_bytes=0, max_age_seconds=0, interval=MAINTENANCE_INTERVAL):
+    """Lanza el mantenimiento en segundo plano si toca (uno a la vez por directorio)."""
+    key = os.path.abspath(str(root))
+    now = time.monotonic()
+    with _schedule_lock:
+        if key in _running or now - _last_run.get(key, -interval) < interval:
+            return None
+        _running.add(key)
+        _last_run[key] = now
+
+    def worker():
+        try:
+            StorageManager(root, quota_bytes, max_age_seconds).run()
+        except Exception as e:
+            print(f"⚠️ [ALMACENAMIENTO] Mantenimiento fallido: {e}")
+        finally:
+            with _schedule_lock:
+                _running.discard(key)
+
+    thread = threading.Thread(target=worker, name="ytdpl-storage", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,352 @@
+"""Modo progresivo: procesar mientras se descarga (VOD largos y directos).
+
+`yt-dlp -o -` escribe el medio por stdout en un contenedor que se puede leer
+mientras crece (HLS como MPEG-TS), y un `ffmpeg` encadenado por tubería lo
+decodifica a frames PPM (vídeo, con su tamaño en la cabecera) o a PCM
+float32 (audio). Un hilo lector agrupa lo decodificado en trozos de
+`chunk_seconds` y los deja en una cola acotada: si el consumidor va más
+lento, la cola se llena, el hilo se bloquea, las tuberías se llenan y
+yt-dlp deja de leer de la red. La memoria queda acotada por
+`max_chunks` trozos.
+
+Los consumidores pueden empezar tras los primeros `start_after` segundos
+(`wait_for`) en lugar de esperar a la descarga y fusión completas.
+"""
+import itertools
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+VIDEO = "video"
+AUDIO = "audio"
+
+MAX_CHUNKS = 4
+MAX_STREAMS = 4
+# Espera máxima por el siguiente trozo de un directo
+CHUNK_TIMEOUT = 600
+_PUT_POLL = 0.2
+
+Chunk = namedtuple("Chunk", "index start end data")
+
+
+def source_command(url, kind=VIDEO, quality="best", cookie_path=None):
+    """`yt-dlp` que escribe el medio por stdout; prefiere HLS, que se lee mientras crece."""
+    if kind == AUDIO:
+        fmt = "bestaudio/best"
+    else:
+        h = "" if quality == "best" else f"[height<={quality.replace('p', '')}]"
+        # Formatos combinados (con stdout no hay fusión de pistas separadas)
+        fmt = f"best{h}[protocol^=m3u8]/best{h}/best"
+    cmd = [sys.executable, "-m", "yt_dlp", "-q", "--no-warnings", "--no-part", "--no-playlist",
+           "--hls-use-mpegts", "-f", fmt, "-o", "-"]
+    if cookie_path:
+        cmd += ["--cookies", str(cookie_path)]
+    return cmd + [url]
+
+
+def decode_command(kind=VIDEO, fps=0.0, width=0, height=0, sample_rate=44100, channels=2):
+    """`ffmpeg` que lee el contenedor por stdin y emite frames PPM o PCM f32le por stdout."""
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", "pipe:0"]
+    if kind == AUDIO:
+        return cmd + ["-map", "0:a:0", "-vn", "-sn", "-dn", "-ac", str(int(channels)), "-ar", str(int(sample_rate)),
+                      "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"]
+    filters = [f"fps={fps:g}"] if fps else []
+    if width or height:
+        filters.append(f"scale={int(width) or -2}:{int(height) or -2}")
+    cmd += ["-map", "0:v:0", "-an", "-sn", "-dn"]
+    if filters:
+        cmd += ["-vf", ",".join(filters)]
+    return cmd + ["-f", "image2pipe", "-vcodec", "ppm", "pipe:1"]
+
+
+def read_exact(f, view):
+    """Llena `view` desde `f`; devuelve los bytes leídos (menos sólo al final del stream)."""
+    filled = 0
+    while filled < len(view):
+        n = f.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _read_token(f):
+    token = bytearray()
+    while True:
+        c = f.read(1)
+        if not c:
+            return bytes(token) or None
+        if c == b"#" and not token:
+            # Comentario hasta fin de línea
+            while c and c != b"\n":
+                c = f.read(1)
+            continue
+        if c.isspace():
+            if token:
+                return bytes(token)
+            continue
+        token += c
+
+
+def read_ppm_header(f):
+    """`(ancho, alto)` del siguiente frame PPM (P6, 8 bits), o None al final del stream."""
+    magic = _read_token(f)
+    if magic is None:
+        return None
+    if magic != b"P6":
+        raise Exception(f"❌ [STREAM] Frame PPM inválido (cabecera {magic[:8]!r}).")
+    width, height, maxval = (int(_read_token(f) or 0) for _ in range(3))
+    if not width or not height or maxval != 255:
+        raise Exception("❌ [STREAM] Cabecera PPM incompleta o con más de 8 bits.")
+    return width, height
+
+
+class MediaStream:
+    """Trozos de un medio que se está descargando, con una cola acotada (contrapresión).
+
+    `decode_cmd` a None lee directamente la salida de `source_cmd` (ya en
+    PPM o PCM f32le).
+    """
+
+    def __init__(self, source_cmd, decode_cmd=None, kind=VIDEO, chunk_seconds=5.0, rate=1.0, channels=2,
+                 max_chunks=MAX_CHUNKS):
+        self.source_cmd = source_cmd
+        self.decode_cmd = decode_cmd
+        self.kind = kind
+        self.rate = float(rate)
+        self.channels = int(channels)
+        # Frames (vídeo) o muestras por canal (audio) por trozo
+        self.chunk_units = max(1, int(round(chunk_seconds * self.rate)))
+        self.chunk_seconds = self.chunk_units / self.rate
+        self.max_chunks = max(1, int(max_chunks))
+        self._queue = queue.Queue(maxsize=self.max_chunks)
+        self._closed = threading.Event()
+        self._finished = threading.Event()
+        self._ready = threading.Condition()
+        self._error = None
+        self._procs = []
+        self._stderr = deque(maxlen=20)
+        self._thread = None
+        self.produced = 0
+        self.consumed = 0
+        self.blocked_seconds = 0.0
+        self.started = None
+        self.first_chunk_at = None
+
+    # === PRODUCTOR ===
+
+    def start(self):
+        self.started = time.monotonic()
+        source = subprocess.Popen(self.source_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._procs.append(source)
+        output = source.stdout
+        if self.decode_cmd:
+            try:
+                decoder = subprocess.Popen(self.decode_cmd, stdin=source.stdout, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE)
+            except OSError as e:
+                self.close()
+                raise Exception(f"❌ [STREAM] No se pudo lanzar ffmpeg ({e}). El modo progresivo lo necesita.")
+            # Sólo ffmpeg lee de yt-dlp: si ffmpeg muere, yt-dlp recibe SIGPIPE
+            source.stdout.close()
+            self._procs.append(decoder)
+            output = decoder.stdout
+        for proc in self._procs:
+            threading.Thread(target=self._drain_stderr, args=(proc,), daemon=True).start()
+        self._thread = threading.Thread(target=self._produce, args=(output,), name="ytdpl-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _drain_stderr(self, proc):
+        for line in proc.stderr:
+            line = line.decode("utf-8", "replace").strip()
+            if line:
+                self._stderr.append(line)
+
+    def _produce(self, output):
+        try:
+            chunks = self._video_chunks(output) if self.kind == VIDEO else self._audio_chunks(output)
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+            codes = [proc.wait() for proc in self._procs]
+            if not self._closed.is_set() and any(codes):
+                raise Exception("YT_DLP_ERROR: " + ("\n".join(self._stderr) or f"códigos de salida {codes}"))
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._finished.set()
+            with self._ready:
+                self._ready.notify_all()
+
+    def _put(self, chunk):
+        """Encola el trozo; bloquea mientras la cola esté llena (contrapresión). False si se cerró."""
+        waited = time.monotonic()
+        while not self._closed.is_set():
+            try:
+                self._queue.put(chunk, timeout=_PUT_POLL)
+            except queue.Full:
+                continue
+            self.blocked_seconds += time.monotonic() - waited
+            self.produced += 1
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.monotonic()
+            with self._ready:
+                self._ready.notify_all()
+            return True
+        return False
+
+    def _video_chunks(self, output):
+        import numpy as np
+
+        buffer, filled, index = None, 0, 0
+        for frame_number in itertools.count():
+            header = read_ppm_header(output)
+            if header is None:
+                break
+            width, height = header
+            if buffer is None or buffer.shape[1:3] != (height, width):
+                if filled:
+                    yield self._chunk(index, buffer[:filled].copy(), frame_number - filled)
+                    index += 1
+                buffer, filled = np.empty((self.chunk_units, height, width, 3), dtype=np.uint8), 0
+            if read_exact(output, memoryview(buffer[filled]).cast("B")) < width * height * 3:
+                break
+            filled += 1
+            if filled == self.chunk_units:
+                yield self._chunk(index, buffer, frame_number + 1 - filled)
+                # El trozo entregado es del consumidor: el siguiente usa un buffer nuevo
+                buffer, filled, index = np.empty_like(buffer), 0, index + 1
+        if filled:
+            yield self._chunk(index, buffer[:filled], frame_number - filled)
+
+    def _audio_chunks(self, output):
+        import numpy as np
+
+        frame_bytes = 4 * self.channels
+        for index in itertools.count():
+            samples = np.empty(self.chunk_units * self.channels, dtype=np.float32)
+            n = read_exact(output, memoryview(samples).cast("B")) // frame_bytes
+            if n:
+                # [canales, muestras] contiguo, como el tipo AUDIO de ComfyUI
+                data = np.ascontiguousarray(samples[:n * self.channels].reshape(n, self.channels).T)
+                yield self._chunk(index, data, index * self.chunk_units)
+            if n < self.chunk_units:
+                return
+
+    def _chunk(self, index, data, first_unit):
+        units = data.shape[0] if self.kind == VIDEO else data.shape[1]
+        return Chunk(index, first_unit / self.rate, (first_unit + units) / self.rate, data)
+
+    # === CONSUMIDOR ===
+
+    @property
+    def finished(self):
+        """True cuando ya no llegarán más trozos (queden o no en la cola)."""
+        return self._finished.is_set() and self._queue.empty()
+
+    def buffered_seconds(self):
+        return self._queue.qsize() * self.chunk_seconds
+
+    def wait_for(self, seconds, timeout=CHUNK_TIMEOUT):
+        """Espera a tener `seconds` de medio en cola (o al final). Devuelve lo que hay en cola."""
+        # La cola nunca pasa de max_chunks trozos: esperar más bloquearía para siempre
+        seconds = min(seconds, self.max_chunks * self.chunk_seconds)
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while self.buffered_seconds() < seconds and not self._finished.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+        return self.buffered_seconds()
+
+    def next_chunk(self, timeout=CHUNK_TIMEOUT):
+        """Siguiente trozo, o None si el medio terminó. Relanza el error del productor."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                chunk = self._queue.get(timeout=_PUT_POLL)
+            except queue.Empty:
+                if self._finished.is_set() and self._queue.empty():
+                    if self._error is not None:
+                        raise self._error
+                    return None
+                if time.monotonic() > deadline:
+                    raise Exception(f"❌ [STREAM] Sin datos nuevos en {int(timeout)} s.")
+                continue
+            self.consumed += 1
+            return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.next_chunk()
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self):
+        self._closed.set()
+        for proc in self._procs:
+            if proc.poll() is None:
+                proc.kill()
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+        # Libera el hilo productor si estaba bloqueado en la cola
+        while not self._queue.empty():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "produced": self.produced,
+            "consumed": self.consumed,
+            "buffered_seconds": self.buffered_seconds(),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "time_to_first_chunk": (round(self.first_chunk_at - self.started, 3)
+                                    if self.first_chunk_at and self.started else None),
+            "finished": self.finished,
+        }
+
+
+_streams = OrderedDict()
+_streams_lock = threading.Lock()
+
+
+def open_stream(key, factory):
+    """Stream abierto bajo `key` (lo crea con `factory()` si no existe o ya terminó).
+
+    Como mucho `MAX_STREAMS` a la vez: se cierra el más antiguo.
+    """
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is not None and not stream.finished:
+            _streams.move_to_end(key)
+            return stream, False
+        stream = factory().start()
+        _streams[key] = stream
+        while len(_streams) > MAX_STREAMS:
+            _, oldest = _streams.popitem(last=False)
+            oldest.close()
+        return stream, True
+
+
+def get_stream(key):
+    with _streams_lock:
+        return _streams.get(key)
+
+
+def close_stream(key):
+    with _streams_lock:
+        stream = _streams.pop(key, None)
+    if stream is not None:
+        stream.close()
@@ -0,0 +1,174 @@
+"""Miniaturas: selección por resolución, descarga con conexiones reutilizadas y caché LRU.
+
+De la lista `thumbnails` del info dict se elige la más pequeña que cubre la
+resolución pedida (no siempre la mayor). Se descarga con una sesión HTTP por
+hilo que mantiene las conexiones abiertas (`curl_cffi` si está instalado, el
+mismo cliente que usa yt-dlp para `--impersonate`), así que una galería de
+miles de elementos contra el mismo CDN no negocia TLS en cada imagen.
+
+Los bytes y las imágenes decodificadas se guardan en dos cachés LRU en
+memoria acotadas por bytes, por vídeo y miniatura; los bytes además se
+persisten en `output/ytdpl/_thumbnails` para sobrevivir a reinicios.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+THUMBNAILS_DIRNAME = "_thumbnails"
+FETCH_TIMEOUT = 30
+BYTES_CACHE_SIZE = 64 * 1024 ** 2
+IMAGE_CACHE_SIZE = 256 * 1024 ** 2
+
+
+class LRUCache:
+    """Caché LRU segura entre hilos acotada por el tamaño total de sus valores."""
+
+    def __init__(self, max_bytes, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.used = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.used -= self.sizeof(old)
+            self._items[key] = value
+            self.used += size
+            while self.used > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.used -= self.sizeof(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_bytes_cache = LRUCache(BYTES_CACHE_SIZE)
+_image_cache = LRUCache(IMAGE_CACHE_SIZE, sizeof=lambda array: array.nbytes)
+_local = threading.local()
+
+
+def thumbnail_key(extractor, video_id, thumbnail_url):
+    return hashlib.sha256(f"{extractor or ''}\0{video_id}\0{thumbnail_url}".encode("utf-8")).hexdigest()
+
+
+def select_thumbnail(thumbnails, width=0, height=0):
+    """La miniatura más pequeña que cubre `width`x`height`; si ninguna, la mayor.
+
+    Las entradas sin dimensiones sólo se usan si ninguna las tiene (entonces
+    gana la última, que yt-dlp ordena como preferida). 0 = sin mínimo.
+    """
+    thumbnails = [t for t in thumbnails or [] if t.get("url")]
+    if not thumbnails:
+        return None
+    sized = [t for t in thumbnails if t.get("width") and t.get("height")]
+    if not sized:
+        return thumbnails[-1]
+
+    def area(t):
+        return t["width"] * t["height"]
+
+    covering = [t for t in sized if t["width"] >= width and t["height"] >= height]
+    if width or height:
+        if covering:
+            return min(covering, key=area)
+    return max(sized, key=area)
+
+
+def _session():
+    """Sesión HTTP de este hilo; reutiliza conexiones entre peticiones."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        try:
+            from curl_cffi import requests as curl_requests
+            session = curl_requests.Session(timeout=FETCH_TIMEOUT)
+        except ImportError:
+            session = False
+        _local.session = session
+    return session
+
+
+def fetch(url):
+    """Bytes de `url` a través de la sesión compartida del hilo."""
+    session = _session()
+    if session:
+        response = session.get(url, allow_redirects=True)
+        if response.status_code >= 400:
+            raise Exception(f"❌ HTTP {response.status_code} al descargar la miniatura: {url}")
+        return response.content
+
+    # Sin curl_cffi: urllib (conexión nueva por petición)
+    import urllib.request
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+        return response.read()
+
+
+def decode(data):
+    """Imagen RGB float32 `[alto, ancho, 3]` en [0, 1]."""
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise Exception("❌ No se pudo decodificar la miniatura.")
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    out = rgb.astype(np.float32)
+    out *= 1.0 / 255.0
+    return out
+
+
+def load_bytes(key, url, root=None):
+    """Bytes de la miniatura: LRU en memoria -> disco -> red."""
+    data = _bytes_cache.get(key)
+    if data is not None:
+        return data, "memoria"
+
+    disk_path = root / THUMBNAILS_DIRNAME / f"{key}.bin" if root is not None else None
+    if disk_path is not None:
+        try:
+            with open(disk_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data:
+            _bytes_cache.put(key, data)
+            return data, "disco"
+
+    data = fetch(url)
+    _bytes_cache.put(key, data)
+    if disk_path is not None:
+        try:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = disk_path.with_name(f"{disk_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, disk_path)
+        except OSError as e:
+            print(f"⚠️ [MINIATURA] No se pudo guardar en disco: {e}")
+    return data, "red"
+
+
+def load_image(extractor, video_id, url, root=None):
+    """`(imagen, origen)` de la miniatura `url` del vídeo; el array devuelto es compartido (sólo lectura)."""
+    key = thumbnail_key(extractor, video_id, url)
+    image = _image_cache.get(key)
+    if image is not None:
+        return image, "memoria"
+    data, source = load_bytes(key, url, root)
+    image = decode(data)
+    image.flags.writeable = False
+    _image_cache.put(key, image)
+    return image, source
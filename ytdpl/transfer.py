@@ -0,0 +1,86 @@
+"""Ajustes de transferencia: fragmentos concurrentes, troceado HTTP y descargador externo.
+
+Los valores salen de tres capas, de menor a mayor prioridad:
+los predeterminados por extractor de este módulo, el archivo opcional
+`download_settings.json` en la carpeta del nodo y las entradas del nodo.
+"""
+import json
+import shutil
+from pathlib import Path
+
+SETTINGS_FILE = Path(__file__).parent.parent / "download_settings.json"
+
+EXTERNAL_DOWNLOADERS = ["auto", "native", "aria2c", "axel", "curl", "wget", "ffmpeg"]
+
+# Claves = ie_key de yt-dlp en minúsculas; "default" aplica a todo lo demás
+EXTRACTOR_DEFAULTS = {
+    "default": {
+        "concurrent_fragments": 4,
+        "http_chunk_size": "",
+        "buffer_size": "1M",
+        "throttled_rate": "",
+        "external_downloader": "native",
+        "downloader_args": "",
+    },
+    # DASH de YouTube: bloques de 10M evitan el throttling y se re-extrae si baja de 100K/s
+    "youtube": {"concurrent_fragments": 8, "http_chunk_size": "10M", "throttled_rate": "100K"},
+    # HLS con cientos de fragmentos cortos
+    "twitchvod": {"concurrent_fragments": 8},
+    "twitchstream": {"concurrent_fragments": 1},
+    # Progresivo en un único archivo: los fragmentos no aplican
+    "tiktok": {"concurrent_fragments": 1},
+}
+
+
+def _load_file_settings():
+    try:
+        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ [TRANSFERENCIA] Ignorando {SETTINGS_FILE.name} inválido: {e}")
+        return {}
+    return {str(k).lower(): v for k, v in data.items() if isinstance(v, dict)}
+
+
+def resolve(extractor=None, overrides=None):
+    """Fusiona predeterminados, archivo de configuración y entradas del nodo.
+
+    En `overrides` los valores `0`, `""` y `"auto"` significan "no tocar".
+    """
+    key = (extractor or "").lower()
+    file_settings = _load_file_settings()
+
+    settings = dict(EXTRACTOR_DEFAULTS["default"])
+    for layer in (EXTRACTOR_DEFAULTS.get(key), file_settings.get("default"), file_settings.get(key)):
+        if layer:
+            settings.update(layer)
+    for name, value in (overrides or {}).items():
+        if value not in (None, 0, "", "auto"):
+            settings[name] = value
+    return settings
+
+
+def build_args(settings):
+    """Traduce los ajustes a flags de yt-dlp."""
+    args = []
+    fragments = int(settings.get("concurrent_fragments") or 1)
+    if fragments > 1:
+        args.extend(["--concurrent-fragments", str(fragments)])
+    if settings.get("http_chunk_size"):
+        args.extend(["--http-chunk-size", str(settings["http_chunk_size"])])
+    if settings.get("buffer_size"):
+        args.extend(["--buffer-size", str(settings["buffer_size"])])
+    if settings.get("throttled_rate"):
+        args.extend(["--throttled-rate", str(settings["throttled_rate"])])
+
+    downloader = settings.get("external_downloader") or "native"
+    if downloader != "native":
+        if shutil.which(downloader):
+            args.extend(["--downloader", downloader])
+            if settings.get("downloader_args"):
+                args.extend(["--downloader-args", f"{downloader}:{settings['downloader_args']}"])
+        else:
+            print(f"⚠️ [TRANSFERENCIA] '{downloader}' no está instalado. Usando el descargador nativo.")
+    return args
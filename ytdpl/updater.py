@@ -0,0 +1,223 @@
+"""Actualización de yt-dlp cacheada, limitada en frecuencia y aplicada entre trabajos.
+
+- La comprobación se hace como mucho una vez por intervalo (estado en
+  `.ytdpl_update.json`, compartido entre procesos).
+- La parte lenta (resolver y descargar wheels) corre en un hilo en segundo
+  plano con `pip download`, sin bloquear la descarga en curso.
+- La instalación, local y sin red, sólo se aplica cuando no hay ningún trabajo
+  activo, y después se descargan los módulos `yt_dlp` para que el siguiente
+  trabajo importe la versión nueva.
+- Tras cada descarga correcta se registran las versiones como "known good".
+  Al aplicar una actualización esas versiones quedan fijadas en "pinned",
+  que es el destino de un rollback si la versión nueva falla.
+"""
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# (nombre pip, especificador a instalar)
+PACKAGES = [
+    ("yt-dlp", "yt-dlp[default]"),
+    ("yt-dlp-ejs", "yt-dlp-ejs"),
+    ("curl-cffi", "curl_cffi"),
+    ("websockets", "websockets"),
+]
+
+STATE_FILE = Path(__file__).parent.parent / ".ytdpl_update.json"
+WHEELHOUSE = Path(__file__).parent.parent / ".ytdpl_wheels"
+
+_WHEEL_RE = re.compile(r"^(?P<name>[^-]+)-(?P<version>[^-]+)-")
+
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def installed_versions():
+    from importlib import metadata
+
+    versions = {}
+    for pkg, _ in PACKAGES:
+        try:
+            versions[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            versions[pkg] = None
+    return versions
+
+
+def wheel_versions(directory):
+    """Versiones de los paquetes vigilados presentes en un directorio de wheels."""
+    wanted = {_normalize(pkg): pkg for pkg, _ in PACKAGES}
+    found = {}
+    for wheel in Path(directory).glob("*.whl"):
+        m = _WHEEL_RE.match(wheel.name)
+        if m and _normalize(m.group("name")) in wanted:
+            found[wanted[_normalize(m.group("name"))]] = m.group("version")
+    return found
+
+
+def unload_yt_dlp():
+    """Quita yt-dlp de `sys.modules` para que el próximo import cargue la versión instalada."""
+    import importlib
+
+    for name in list(sys.modules):
+        if name.split(".")[0] in ("yt_dlp", "yt_dlp_plugins", "yt_dlp_ejs"):
+            del sys.modules[name]
+    importlib.invalidate_caches()
+
+
+class UpdateManager:
+    def __init__(self, state_file=STATE_FILE, wheelhouse=WHEELHOUSE):
+        self.state_file = Path(state_file)
+        self.wheelhouse = Path(wheelhouse)
+        self._lock = threading.Lock()
+        self._active_jobs = 0
+        self._check_thread = None
+        self._pending = None  # "update" | "rollback" | None
+        self._good_recorded = False
+
+    # --- Estado persistente ---
+    def load_state(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, **changes):
+        state = self.load_state()
+        state.update(changes)
+        try:
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+        except OSError as e:
+            print(f"⚠️ [UPDATER] No se pudo guardar el estado: {e}")
+        return state
+
+    # --- Peticiones desde el nodo ---
+    def request_update(self, interval_hours=24):
+        """Lanza la comprobación en segundo plano si ha pasado el intervalo."""
+        state = self.load_state()
+        elapsed = time.time() - state.get("last_check", 0)
+        if elapsed < interval_hours * 3600:
+            remaining = (interval_hours * 3600 - elapsed) / 3600
+            print(f"🔄 [UPDATER] yt-dlp comprobado hace {elapsed / 3600:.1f} h. Próxima comprobación en {remaining:.1f} h.")
+            return False
+        with self._lock:
+            if self._check_thread is not None and self._check_thread.is_alive():
+                return False
+            # Se marca antes de terminar: otros procesos no lanzan una comprobación duplicada
+            self._save_state(last_check=time.time())
+            self._check_thread = threading.Thread(target=self._check_for_update, name="ytdpl-updater", daemon=True)
+            self._check_thread.start()
+        print("🔄 [UPDATER] Buscando actualizaciones de yt-dlp (NIGHTLY + EJS) en segundo plano...")
+        return True
+
+    def request_rollback(self):
+        """Programa la reinstalación de las versiones fijadas antes de la última actualización."""
+        pinned = self.load_state().get("pinned")
+        if not pinned:
+            print("⚠️ [UPDATER] No hay ninguna versión fijada a la que volver todavía.")
+            return False
+        if installed_versions() == pinned:
+            return False
+        with self._lock:
+            self._pending = "rollback"
+        return True
+
+    def _check_for_update(self):
+        self.wheelhouse.mkdir(parents=True, exist_ok=True)
+        # Sólo deben quedar los wheels de esta comprobación; pip reutiliza su propia caché HTTP
+        for old in self.wheelhouse.iterdir():
+            if old.is_file():
+                old.unlink()
+        cmd = [
+            sys.executable, "-m", "pip", "download", "--quiet", "--pre",
+            "--dest", str(self.wheelhouse), *[spec for _, spec in PACKAGES],
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=900)
+        except Exception as e:
+            print(f"⚠️ [UPDATER] La comprobación de actualizaciones falló: {e}")
+            return
+
+        current = installed_versions()
+        available = wheel_versions(self.wheelhouse)
+        newer = {pkg: v for pkg, v in available.items() if v != current.get(pkg)}
+        self._save_state(available=available)
+        if newer:
+            print(f"📦 [UPDATER] Actualización lista, se aplicará entre trabajos: {newer}")
+            with self._lock:
+                if self._pending is None:
+                    self._pending = "update"
+        else:
+            print("✅ [UPDATER] yt-dlp ya está en la última versión.")
+
+    # --- Aplicación entre trabajos ---
+    def _pip_install(self, args):
+        cmd = [sys.executable, "-m", "pip", "install", "--quiet", *args, "--break-system-packages"]
+        subprocess.check_call(cmd)
+
+    def _apply_pending(self):
+        """Instala lo pendiente. Se llama con el lock tomado y sin trabajos activos."""
+        action, self._pending = self._pending, None
+        try:
+            if action == "update":
+                print("🔄 [UPDATER] Aplicando actualización de yt-dlp desde la caché local...")
+                state = self.load_state()
+                self._save_state(pinned=state.get("known_good") or installed_versions())
+                self._pip_install(["--no-index", "--find-links", str(self.wheelhouse), "-U", "--pre",
+                                   *[spec for _, spec in PACKAGES]])
+            elif action == "rollback":
+                pinned = self.load_state().get("pinned", {})
+                pins = [f"{pkg}=={v}" for pkg, v in pinned.items() if v]
+                print(f"⏪ [UPDATER] Volviendo a las versiones 'known good': {pins}")
+                self._pip_install(pins)
+            else:
+                return
+        except Exception as e:
+            print(f"❌ [UPDATER] No se pudo aplicar '{action}': {e}")
+            return
+        unload_yt_dlp()
+        self._good_recorded = False
+        self._save_state(installed=installed_versions(), applied_at=time.time())
+        print(f"✅ [UPDATER] Versiones activas: {installed_versions()}")
+
+    @contextmanager
+    def job(self):
+        """Marca un trabajo activo; lo pendiente se instala sólo si no había ninguno en curso."""
+        with self._lock:
+            if self._active_jobs == 0 and self._pending:
+                self._apply_pending()
+            self._active_jobs += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_jobs -= 1
+
+    def mark_good(self):
+        """Registra las versiones actuales como 'known good' tras una descarga correcta."""
+        if self._good_recorded:
+            return
+        versions = installed_versions()
+        if self.load_state().get("known_good") != versions:
+            self._save_state(known_good=versions)
+        self._good_recorded = True
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_updater():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = UpdateManager()
+        return _manager